@@ -24,6 +24,14 @@ DROP TABLE IF EXISTS Trip_Component;
 
 DROP TABLE IF EXISTS Trip;
 
+DROP TABLE IF EXISTS Confirmation_Sequence;
+
+DROP TABLE IF EXISTS Change_Log;
+
+DROP TABLE IF EXISTS Park_Rating_Summary;
+
+DROP TABLE IF EXISTS Lodging_Inventory;
+
 DROP TABLE IF EXISTS Lodging_Reservation;
 
 DROP TABLE IF EXISTS Lodging;
@@ -60,9 +68,33 @@ DROP PROCEDURE IF EXISTS sp_get_park_details;
 
 DROP PROCEDURE IF EXISTS sp_get_user_dashboard;
 
+DROP PROCEDURE IF EXISTS sp_rebuild_lodging_inventory;
+
+DROP PROCEDURE IF EXISTS sp_purge_change_log;
+
+DROP PROCEDURE IF EXISTS sp_rebuild_park_rating_summary;
+
 -- Drop triggers if they exist
 DROP TRIGGER IF EXISTS trg_update_trip_cost;
 
+DROP TRIGGER IF EXISTS trg_log_review_insert;
+
+DROP TRIGGER IF EXISTS trg_log_review_update;
+
+DROP TRIGGER IF EXISTS trg_log_review_delete;
+
+DROP TRIGGER IF EXISTS trg_log_lodging_insert;
+
+DROP TRIGGER IF EXISTS trg_log_lodging_update;
+
+DROP TRIGGER IF EXISTS trg_log_lodging_delete;
+
+DROP TRIGGER IF EXISTS trg_review_summary_insert;
+
+DROP TRIGGER IF EXISTS trg_review_summary_update;
+
+DROP TRIGGER IF EXISTS trg_review_summary_delete;
+
 SET FOREIGN_KEY_CHECKS = 1;
 
 -- ============================================
@@ -139,6 +171,10 @@ CREATE TABLE Lodging (
     Contact_Email VARCHAR(255),
     Distance_From_Park_Miles DECIMAL(10, 2),
     Star_Rating DECIMAL(2, 1),
+    Total_Rooms INT NOT NULL DEFAULT 20,
+    -- Where the lodging is; NULL until geocoded (the app then uses the park's location)
+    Latitude DECIMAL(10, 8),
+    Longitude DECIMAL(11, 8),
     PRIMARY KEY (Lodging_ID),
     INDEX idx_park_id (Park_ID),
     INDEX idx_lodging_type (Lodging_Type),
@@ -198,6 +234,115 @@ CREATE TABLE Park_Review (
     CONSTRAINT chk_rating CHECK (Rating BETWEEN 1 AND 5)
 ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = 'User reviews and ratings for national parks';
 
+-- --------------------------------------------
+-- Table: Lodging_Inventory
+-- Description: Rooms booked per lodging per night
+-- One row per lodging and night that has (or had) bookings; nights without
+-- a row have all Total_Rooms free. Park_ID is denormalized from Lodging so
+-- that park-wide availability for a date range is a single range scan on
+-- idx_park_stay_date. Kept in step with Lodging_Reservation by the app,
+-- which locks the rows for the stay with SELECT ... FOR UPDATE in the same
+-- transaction as the reservation insert, update or delete.
+-- --------------------------------------------
+CREATE TABLE Lodging_Inventory (
+    Lodging_ID INT NOT NULL,
+    Stay_Date DATE NOT NULL,
+    Park_ID INT NOT NULL,
+    Rooms_Booked INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Lodging_ID, Stay_Date),
+    INDEX idx_park_stay_date (
+        Park_ID,
+        Stay_Date,
+        Lodging_ID,
+        Rooms_Booked
+    ),
+    CONSTRAINT fk_inventory_lodging FOREIGN KEY (Lodging_ID) REFERENCES Lodging (Lodging_ID) ON DELETE CASCADE ON UPDATE CASCADE,
+    CONSTRAINT chk_rooms_booked CHECK (Rooms_Booked >= 0)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = 'Nightly booked-room counts per lodging';
+
+-- --------------------------------------------
+-- Table: Confirmation_Sequence
+-- Description: Counters for reservation confirmation numbers
+-- The app claims numbers in blocks with
+--   UPDATE ... SET Next_Value = LAST_INSERT_ID(Next_Value) + block_size
+-- which is atomic, so concurrent bookings never share a number.
+-- --------------------------------------------
+CREATE TABLE Confirmation_Sequence (
+    Sequence_Name VARCHAR(50) NOT NULL,
+    Next_Value BIGINT NOT NULL DEFAULT 1,
+    PRIMARY KEY (Sequence_Name)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = 'Block-allocated counters for confirmation numbers';
+
+INSERT INTO
+    Confirmation_Sequence (Sequence_Name, Next_Value)
+VALUES ('reservation', 1);
+
+-- --------------------------------------------
+-- Table: Park_Rating_Summary
+-- Description: Review count and rating histogram per park
+-- Maintained by the trg_review_summary_* triggers in the same transaction
+-- as every Park_Review insert, update and delete, so reading a park's
+-- rating is a primary-key lookup however many reviews exist. Parks
+-- without reviews may have no row. sp_rebuild_park_rating_summary
+-- recomputes it from Park_Review.
+-- --------------------------------------------
+CREATE TABLE Park_Rating_Summary (
+    Park_ID INT NOT NULL,
+    Review_Count INT NOT NULL DEFAULT 0,
+    Rating_Sum INT NOT NULL DEFAULT 0,
+    Rating_1_Count INT NOT NULL DEFAULT 0,
+    Rating_2_Count INT NOT NULL DEFAULT 0,
+    Rating_3_Count INT NOT NULL DEFAULT 0,
+    Rating_4_Count INT NOT NULL DEFAULT 0,
+    Rating_5_Count INT NOT NULL DEFAULT 0,
+    Average_Rating DECIMAL(3, 2) GENERATED ALWAYS AS (
+        IF(Review_Count = 0, NULL, ROUND(Rating_Sum / Review_Count, 2))
+    ) VIRTUAL,
+    Min_Rating TINYINT GENERATED ALWAYS AS (
+        CASE
+            WHEN Rating_1_Count > 0 THEN 1
+            WHEN Rating_2_Count > 0 THEN 2
+            WHEN Rating_3_Count > 0 THEN 3
+            WHEN Rating_4_Count > 0 THEN 4
+            WHEN Rating_5_Count > 0 THEN 5
+        END
+    ) VIRTUAL,
+    Max_Rating TINYINT GENERATED ALWAYS AS (
+        CASE
+            WHEN Rating_5_Count > 0 THEN 5
+            WHEN Rating_4_Count > 0 THEN 4
+            WHEN Rating_3_Count > 0 THEN 3
+            WHEN Rating_2_Count > 0 THEN 2
+            WHEN Rating_1_Count > 0 THEN 1
+        END
+    ) VIRTUAL,
+    Updated_At TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (Park_ID),
+    CONSTRAINT fk_rating_summary_park FOREIGN KEY (Park_ID) REFERENCES National_Park (Park_ID) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = 'Trigger-maintained rating aggregates per park';
+
+-- --------------------------------------------
+-- Table: Change_Log
+-- Description: Row changes to Park_Review and Lodging, written by triggers
+-- The app polls rows past the last Change_ID it applied and updates its
+-- in-memory per-park aggregates (rating counts, lodging counts) by the
+-- old/new values, instead of re-running COUNT/AVG over the base tables.
+-- Old rows are removed with sp_purge_change_log.
+-- --------------------------------------------
+CREATE TABLE Change_Log (
+    Change_ID BIGINT AUTO_INCREMENT,
+    Table_Name VARCHAR(30) NOT NULL,
+    Operation ENUM('insert', 'update', 'delete') NOT NULL,
+    Row_ID INT NOT NULL,
+    Old_Park_ID INT NULL,
+    New_Park_ID INT NULL,
+    Old_Rating TINYINT NULL,
+    New_Rating TINYINT NULL,
+    Changed_At TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    PRIMARY KEY (Change_ID),
+    INDEX idx_changed_at (Changed_At)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = 'Trigger-fed change feed for incremental aggregates';
+
 -- ============================================
 -- VIEWS (For common queries and reporting)
 -- ============================================
@@ -211,23 +356,19 @@ FROM
     INNER JOIN National_Park np ON pr.Park_ID = np.Park_ID
 ORDER BY pr.Review_Date DESC;
 
--- View: Park Average Ratings
+-- View: Park Average Ratings (read from Park_Rating_Summary)
 CREATE VIEW v_park_ratings AS
 SELECT
     np.Park_ID,
     np.Park_Name,
     np.State,
-    COUNT(pr.Review_ID) AS Total_Reviews,
-    ROUND(AVG(pr.Rating), 2) AS Average_Rating,
-    MIN(pr.Rating) AS Min_Rating,
-    MAX(pr.Rating) AS Max_Rating
+    COALESCE(s.Review_Count, 0) AS Total_Reviews,
+    s.Average_Rating,
+    s.Min_Rating,
+    s.Max_Rating
 FROM
     National_Park np
-    LEFT JOIN Park_Review pr ON np.Park_ID = pr.Park_ID
-GROUP BY
-    np.Park_ID,
-    np.Park_Name,
-    np.State;
+    LEFT JOIN Park_Rating_Summary s ON np.Park_ID = s.Park_ID;
 
 -- View: Lodging with Park Information and Average Ratings
 CREATE VIEW v_lodging_by_park AS
@@ -288,8 +429,15 @@ BEGIN
     -- Get park basic information
     SELECT * FROM National_Park WHERE Park_ID = p_park_id;
     
-    -- Get park ratings summary
-    SELECT * FROM v_park_ratings WHERE Park_ID = p_park_id;
+    -- Get park ratings summary (primary-key lookup, no Park_Review scan)
+    SELECT
+        p_park_id AS Park_ID,
+        COALESCE(s.Review_Count, 0) AS Total_Reviews,
+        s.Average_Rating,
+        s.Min_Rating,
+        s.Max_Rating
+    FROM (SELECT 1) AS one
+        LEFT JOIN Park_Rating_Summary s ON s.Park_ID = p_park_id;
     
     -- Get available lodging near this park
     SELECT * FROM Lodging WHERE Park_ID = p_park_id ORDER BY Price_Per_Night;
@@ -325,6 +473,60 @@ BEGIN
     LIMIT 10;
 END //
 
+-- Procedure: Rebuild nightly lodging inventory from reservations
+-- Use after bulk-loading reservations or to repair drift.
+CREATE PROCEDURE sp_rebuild_lodging_inventory()
+BEGIN
+    DELETE FROM Lodging_Inventory;
+
+    INSERT INTO Lodging_Inventory (Lodging_ID, Stay_Date, Park_ID, Rooms_Booked)
+    WITH RECURSIVE nights AS (
+        SELECT Lodging_ID, Check_In_Date AS Stay_Date, Check_Out_Date, Number_Of_Rooms
+        FROM Lodging_Reservation
+        WHERE Reservation_Status IN ('confirmed', 'pending')
+        UNION ALL
+        SELECT Lodging_ID, Stay_Date + INTERVAL 1 DAY, Check_Out_Date, Number_Of_Rooms
+        FROM nights
+        WHERE Stay_Date + INTERVAL 1 DAY < Check_Out_Date
+    )
+    SELECT n.Lodging_ID, n.Stay_Date, l.Park_ID, SUM(n.Number_Of_Rooms)
+    FROM nights n
+        INNER JOIN Lodging l ON n.Lodging_ID = l.Lodging_ID
+    GROUP BY n.Lodging_ID, n.Stay_Date, l.Park_ID;
+END //
+
+-- Procedure: Rebuild the per-park rating summary from Park_Review
+-- Use after bulk-loading reviews or to repair drift.
+CREATE PROCEDURE sp_rebuild_park_rating_summary()
+BEGIN
+    DELETE FROM Park_Rating_Summary;
+
+    INSERT INTO Park_Rating_Summary (
+        Park_ID, Review_Count, Rating_Sum,
+        Rating_1_Count, Rating_2_Count, Rating_3_Count, Rating_4_Count, Rating_5_Count
+    )
+    SELECT
+        Park_ID,
+        COUNT(*),
+        SUM(Rating),
+        SUM(Rating = 1),
+        SUM(Rating = 2),
+        SUM(Rating = 3),
+        SUM(Rating = 4),
+        SUM(Rating = 5)
+    FROM Park_Review
+    GROUP BY Park_ID;
+END //
+
+-- Procedure: Remove change log rows older than p_keep_hours
+-- Every app replica must have polled past them; keep well beyond the
+-- longest expected replica downtime (replicas reload in full on restart).
+CREATE PROCEDURE sp_purge_change_log(IN p_keep_hours INT)
+BEGIN
+    DELETE FROM Change_Log
+    WHERE Changed_At < NOW(6) - INTERVAL p_keep_hours HOUR;
+END //
+
 DELIMITER;
 
 -- ============================================
@@ -343,7 +545,9 @@ BEGIN
         SET MESSAGE_TEXT = 'Check-out date must be after check-in date';
     END IF;
     
-    IF NEW.Check_In_Date < CURDATE() THEN
+    -- Bulk loads of past stays (load_data.py --history, generate_data.py)
+    -- set @parkpal_loading_history for their session
+    IF NEW.Check_In_Date < CURDATE() AND @parkpal_loading_history IS NULL THEN
         SIGNAL SQLSTATE '45000'
         SET MESSAGE_TEXT = 'Check-in date cannot be in the past';
     END IF;
@@ -359,6 +563,131 @@ BEGIN
     END IF;
 END //
 
+-- Triggers: Keep Park_Rating_Summary in step with Park_Review
+CREATE TRIGGER trg_review_summary_insert
+AFTER INSERT ON Park_Review
+FOR EACH ROW
+BEGIN
+    INSERT INTO Park_Rating_Summary (
+        Park_ID, Review_Count, Rating_Sum,
+        Rating_1_Count, Rating_2_Count, Rating_3_Count, Rating_4_Count, Rating_5_Count
+    )
+    VALUES (
+        NEW.Park_ID, 1, NEW.Rating,
+        NEW.Rating = 1, NEW.Rating = 2, NEW.Rating = 3, NEW.Rating = 4, NEW.Rating = 5
+    )
+    ON DUPLICATE KEY UPDATE
+        Review_Count = Review_Count + 1,
+        Rating_Sum = Rating_Sum + NEW.Rating,
+        Rating_1_Count = Rating_1_Count + (NEW.Rating = 1),
+        Rating_2_Count = Rating_2_Count + (NEW.Rating = 2),
+        Rating_3_Count = Rating_3_Count + (NEW.Rating = 3),
+        Rating_4_Count = Rating_4_Count + (NEW.Rating = 4),
+        Rating_5_Count = Rating_5_Count + (NEW.Rating = 5);
+END //
+
+CREATE TRIGGER trg_review_summary_update
+AFTER UPDATE ON Park_Review
+FOR EACH ROW
+BEGIN
+    IF NEW.Park_ID <> OLD.Park_ID OR NEW.Rating <> OLD.Rating THEN
+        UPDATE Park_Rating_Summary
+        SET Review_Count = Review_Count - 1,
+            Rating_Sum = Rating_Sum - OLD.Rating,
+            Rating_1_Count = Rating_1_Count - (OLD.Rating = 1),
+            Rating_2_Count = Rating_2_Count - (OLD.Rating = 2),
+            Rating_3_Count = Rating_3_Count - (OLD.Rating = 3),
+            Rating_4_Count = Rating_4_Count - (OLD.Rating = 4),
+            Rating_5_Count = Rating_5_Count - (OLD.Rating = 5)
+        WHERE Park_ID = OLD.Park_ID;
+
+        INSERT INTO Park_Rating_Summary (
+            Park_ID, Review_Count, Rating_Sum,
+            Rating_1_Count, Rating_2_Count, Rating_3_Count, Rating_4_Count, Rating_5_Count
+        )
+        VALUES (
+            NEW.Park_ID, 1, NEW.Rating,
+            NEW.Rating = 1, NEW.Rating = 2, NEW.Rating = 3, NEW.Rating = 4, NEW.Rating = 5
+        )
+        ON DUPLICATE KEY UPDATE
+            Review_Count = Review_Count + 1,
+            Rating_Sum = Rating_Sum + NEW.Rating,
+            Rating_1_Count = Rating_1_Count + (NEW.Rating = 1),
+            Rating_2_Count = Rating_2_Count + (NEW.Rating = 2),
+            Rating_3_Count = Rating_3_Count + (NEW.Rating = 3),
+            Rating_4_Count = Rating_4_Count + (NEW.Rating = 4),
+            Rating_5_Count = Rating_5_Count + (NEW.Rating = 5);
+    END IF;
+END //
+
+CREATE TRIGGER trg_review_summary_delete
+AFTER DELETE ON Park_Review
+FOR EACH ROW
+BEGIN
+    UPDATE Park_Rating_Summary
+    SET Review_Count = Review_Count - 1,
+        Rating_Sum = Rating_Sum - OLD.Rating,
+        Rating_1_Count = Rating_1_Count - (OLD.Rating = 1),
+        Rating_2_Count = Rating_2_Count - (OLD.Rating = 2),
+        Rating_3_Count = Rating_3_Count - (OLD.Rating = 3),
+        Rating_4_Count = Rating_4_Count - (OLD.Rating = 4),
+        Rating_5_Count = Rating_5_Count - (OLD.Rating = 5)
+    WHERE Park_ID = OLD.Park_ID;
+END //
+
+-- Triggers: Feed Change_Log from Park_Review and Lodging
+CREATE TRIGGER trg_log_review_insert
+AFTER INSERT ON Park_Review
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Operation, Row_ID, New_Park_ID, New_Rating)
+    VALUES ('Park_Review', 'insert', NEW.Review_ID, NEW.Park_ID, NEW.Rating);
+END //
+
+CREATE TRIGGER trg_log_review_update
+AFTER UPDATE ON Park_Review
+FOR EACH ROW
+BEGIN
+    IF NEW.Park_ID <> OLD.Park_ID OR NEW.Rating <> OLD.Rating THEN
+        INSERT INTO Change_Log (Table_Name, Operation, Row_ID, Old_Park_ID, New_Park_ID, Old_Rating, New_Rating)
+        VALUES ('Park_Review', 'update', NEW.Review_ID, OLD.Park_ID, NEW.Park_ID, OLD.Rating, NEW.Rating);
+    END IF;
+END //
+
+CREATE TRIGGER trg_log_review_delete
+AFTER DELETE ON Park_Review
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Operation, Row_ID, Old_Park_ID, Old_Rating)
+    VALUES ('Park_Review', 'delete', OLD.Review_ID, OLD.Park_ID, OLD.Rating);
+END //
+
+CREATE TRIGGER trg_log_lodging_insert
+AFTER INSERT ON Lodging
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Operation, Row_ID, New_Park_ID)
+    VALUES ('Lodging', 'insert', NEW.Lodging_ID, NEW.Park_ID);
+END //
+
+CREATE TRIGGER trg_log_lodging_update
+AFTER UPDATE ON Lodging
+FOR EACH ROW
+BEGIN
+    IF NEW.Park_ID <> OLD.Park_ID THEN
+        INSERT INTO Change_Log (Table_Name, Operation, Row_ID, Old_Park_ID, New_Park_ID)
+        VALUES ('Lodging', 'update', NEW.Lodging_ID, OLD.Park_ID, NEW.Park_ID);
+    END IF;
+END //
+
+CREATE TRIGGER trg_log_lodging_delete
+AFTER DELETE ON Lodging
+FOR EACH ROW
+BEGIN
+    INSERT INTO Change_Log (Table_Name, Operation, Row_ID, Old_Park_ID)
+    VALUES ('Lodging', 'delete', OLD.Lodging_ID, OLD.Park_ID);
+END //
+
 DELIMITER;
 
 -- ============================================
@@ -386,7 +715,7 @@ WHERE
 -- ============================================
 
 -- Script execution completed successfully
--- Tables Created: 5
+-- Tables Created: 9
 -- Views Created: 4
--- Stored Procedures Created: 2
--- Triggers Created: 2
\ No newline at end of file
+-- Stored Procedures Created: 5
+-- Triggers Created: 11
\ No newline at end of file
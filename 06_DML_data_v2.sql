@@ -18,6 +18,12 @@ SET FOREIGN_KEY_CHECKS = 0;
 
 TRUNCATE TABLE Park_Review;
 
+TRUNCATE TABLE Lodging_Inventory;
+
+TRUNCATE TABLE Change_Log;
+
+TRUNCATE TABLE Park_Rating_Summary;
+
 TRUNCATE TABLE Lodging_Reservation;
 
 TRUNCATE TABLE Lodging;
@@ -0,0 +1,174 @@
+"""
+Concurrency benchmark for reservation confirmation numbers.
+
+Fires thousands of parallel bookings at a local MySQL from several worker
+processes (each with its own connection pool and allocator, like separate
+Streamlit replicas) and checks that no two bookings received the same
+confirmation number.
+
+    DB_HOST=127.0.0.1 DB_USER=root DB_PASSWORD=... DB_NAME=group12 \
+    DB_SSL_MODE=DISABLED python benchmarks/bench_confirmation_numbers.py \
+        --bookings 5000 --processes 4 --threads 16
+
+Pass --legacy to run the same load against the old SELECT MAX(Reservation_ID)
+scheme for comparison. Inserted rows are deleted afterwards.
+"""
+
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import harness  # noqa: F401  (puts the repo root on sys.path)
+from harness import print_table, summarize
+
+BENCH_EMAIL = "confirmation-bench@parkpal.invalid"
+DUPLICATE_KEY_ERRNO = 1062
+
+
+def legacy_confirmation_number(parkpal_app) -> str:
+    """The pre-allocator scheme: next number from SELECT MAX(Reservation_ID)"""
+    date_part = datetime.now().strftime("%Y%m%d")
+    result = parkpal_app.execute_query(
+        "SELECT MAX(Reservation_ID) as max_id FROM Lodging_Reservation", fetch="one"
+    )
+    next_id = (result["max_id"] or 0) + 1 if result else 1
+    return f"RES-{date_part}-{next_id:06d}"
+
+
+def run_worker(args) -> dict:
+    """Make ``bookings`` reservations from one process using ``threads`` threads"""
+    worker_id, bookings, threads, user_id, lodging_id, legacy = args
+    import parkpal_app
+    from mysql.connector import Error
+
+    insert_query = """
+        INSERT INTO Lodging_Reservation
+        (User_ID, Lodging_ID, Check_In_Date, Check_Out_Date, Number_Of_Guests,
+         Number_Of_Rooms, Guest_Name, Guest_Phone, Guest_Email, Confirmation_Number,
+         Reservation_Status, Total_Cost)
+        VALUES (%s, %s, %s, %s, 1, 1, %s, '000-000-0000', %s, %s, 'pending', 0)
+    """
+
+    def book(i: int):
+        started = time.perf_counter()
+        if legacy:
+            number = legacy_confirmation_number(parkpal_app)
+        else:
+            number = parkpal_app.generate_confirmation_number()
+        allocated = time.perf_counter()
+
+        check_in = date.today() + timedelta(days=400 + i % 300)
+        try:
+            parkpal_app._execute_write(
+                insert_query,
+                (
+                    user_id,
+                    lodging_id,
+                    check_in,
+                    check_in + timedelta(days=1),
+                    f"Bench {worker_id}-{i}",
+                    BENCH_EMAIL,
+                    number,
+                ),
+            )
+            collided = False
+        except Error as e:
+            if e.errno != DUPLICATE_KEY_ERRNO:
+                raise
+            collided = True
+        return number, allocated - started, time.perf_counter() - started, collided
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(book, range(bookings)))
+
+    return {
+        "numbers": [r[0] for r in results],
+        "allocation": [r[1] for r in results],
+        "booking": [r[2] for r in results],
+        "collisions": sum(r[3] for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--bookings", type=int, default=5000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--legacy", action="store_true")
+    args = parser.parse_args()
+
+    # Spawn so no worker inherits a connection from this process
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as setup_pool:
+        user_id, lodging_id = setup_pool.apply(pick_booking_targets)
+
+    per_process = args.bookings // args.processes
+    jobs = [
+        (worker, per_process, args.threads, user_id, lodging_id, args.legacy)
+        for worker in range(args.processes)
+    ]
+
+    started = time.perf_counter()
+    with context.Pool(args.processes) as pool:
+        results = pool.map(run_worker, jobs)
+    elapsed = time.perf_counter() - started
+
+    numbers = [n for r in results for n in r["numbers"]]
+    duplicates = len(numbers) - len(set(numbers))
+    collisions = sum(r["collisions"] for r in results)
+    allocation = [t for r in results for t in r["allocation"]]
+    booking = [t for r in results for t in r["booking"]]
+
+    with context.Pool(1) as cleanup_pool:
+        removed = cleanup_pool.apply(delete_bench_rows)
+
+    scheme = "SELECT MAX (legacy)" if args.legacy else "block allocator"
+    print(f"Scheme: {scheme}")
+    print(
+        f"{len(numbers):,} bookings from {args.processes} processes x "
+        f"{args.threads} threads in {elapsed:.2f}s "
+        f"({len(numbers) / elapsed:,.0f} bookings/s); {removed:,} rows cleaned up"
+    )
+    print_table(
+        [
+            {"step": "allocate number", **summarize(allocation)},
+            {"step": "allocate + insert", **summarize(booking)},
+        ]
+    )
+    print(f"Duplicate numbers handed out: {duplicates}")
+    print(f"Inserts rejected by unique_confirmation: {collisions}")
+
+    if duplicates or collisions:
+        raise SystemExit(1)
+
+
+def pick_booking_targets():
+    import parkpal_app
+
+    user = parkpal_app.execute_query("SELECT MIN(User_ID) AS id FROM User", fetch="one")
+    lodging = parkpal_app.execute_query(
+        "SELECT MIN(Lodging_ID) AS id FROM Lodging", fetch="one"
+    )
+    if not user or not user["id"] or not lodging or not lodging["id"]:
+        raise SystemExit("Load the ParkPal schema and sample data first")
+    return user["id"], lodging["id"]
+
+
+def delete_bench_rows() -> int:
+    import parkpal_app
+
+    count = parkpal_app.execute_query(
+        "SELECT COUNT(*) AS n FROM Lodging_Reservation WHERE Guest_Email = %s",
+        (BENCH_EMAIL,),
+        fetch="one",
+    )
+    parkpal_app.execute_delete(
+        "DELETE FROM Lodging_Reservation WHERE Guest_Email = %s", (BENCH_EMAIL,)
+    )
+    return count["n"] if count else 0
+
+
+if __name__ == "__main__":
+    main()
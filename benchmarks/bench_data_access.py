@@ -0,0 +1,324 @@
+"""
+Benchmark for every parkpal_app data-access function.
+
+Times the read loaders cold (their query cache entries dropped before each
+call) and warm (served from the query cache), and the write helpers, against
+the configured MySQL database. Reports p50/p99 latency and rows per second,
+and compares p50s with a stored baseline so regressions show up in review.
+Load a scale-factored dataset first, e.g. ``generate_data.py --scale 1``.
+
+    DB_HOST=127.0.0.1 DB_USER=root DB_PASSWORD=... DB_NAME=group12 \
+    DB_SSL_MODE=DISABLED python benchmarks/bench_data_access.py --runs 20
+
+    python benchmarks/bench_data_access.py --save-baseline   # after an intended change
+
+A p50 more than --tolerance slower than the baseline (and at least
+--min-delta-ms slower) is a regression and makes the run exit non-zero.
+Rows written by the write benchmarks are deleted as they go.
+"""
+
+import argparse
+import json
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import harness  # noqa: F401  (puts the repo root on sys.path)
+from harness import print_table, summarize, time_calls
+
+import pandas as pd
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "bench_data_access.json"
+BENCH_EMAIL = "data-access-bench@parkpal.invalid"
+DATASET_TABLES = ["National_Park", "Lodging", "User", "Park_Review", "Lodging_Reservation"]
+
+
+def row_count(result: Any) -> int:
+    """Rows a loader returned: DataFrame/list length, or 1 for a single record"""
+    if result is None:
+        return 0
+    if isinstance(result, (pd.DataFrame, list, tuple)):
+        return len(result)
+    return 1
+
+
+class ReadCase:
+    """A read loader called with fixed arguments, cold and warm"""
+
+    def __init__(self, name: str, call: Callable[[], Any], clear: Callable[[], None], heavy=False):
+        self.name = name
+        self.call = call
+        self.clear = clear
+        self.heavy = heavy
+
+    def run(self, runs: int) -> Dict[str, Any]:
+        if self.heavy:
+            runs = max(3, runs // 5)
+
+        cold = []
+        rows = 0
+        for _ in range(runs):
+            self.clear()
+            started = time.perf_counter()
+            rows = row_count(self.call())
+            cold.append(time.perf_counter() - started)
+
+        self.call()  # make sure the entry is cached
+        warm = time_calls(self.call, runs)
+
+        cold_summary, warm_summary = summarize(cold), summarize(warm)
+        return {
+            "function": self.name,
+            "rows": rows,
+            "cold_p50_ms": cold_summary["p50_ms"],
+            "cold_p99_ms": cold_summary["p99_ms"],
+            "warm_p50_ms": warm_summary["p50_ms"],
+            "warm_p99_ms": warm_summary["p99_ms"],
+            "cold_rows_per_s": rows / cold_summary["p50_ms"] * 1000 if cold_summary["p50_ms"] else 0.0,
+        }
+
+
+def pick_targets(app) -> Dict[str, int]:
+    """The busiest park and user, so every loader returns a realistic amount"""
+    park = app.execute_query(
+        "SELECT Park_ID FROM National_Park ORDER BY Annual_Visitors DESC LIMIT 1", fetch="one"
+    )
+    user = app.execute_query(
+        """
+        SELECT User_ID FROM Lodging_Reservation
+        GROUP BY User_ID ORDER BY COUNT(*) DESC LIMIT 1
+        """,
+        fetch="one",
+    )
+    reviewer = app.execute_query(
+        "SELECT User_ID FROM Park_Review GROUP BY User_ID ORDER BY COUNT(*) DESC LIMIT 1",
+        fetch="one",
+    )
+    lodging = park and app.execute_query(
+        "SELECT MIN(Lodging_ID) AS Lodging_ID FROM Lodging WHERE Park_ID = %s",
+        (park["Park_ID"],),
+        fetch="one",
+    )
+    if not (park and user and reviewer and lodging and lodging["Lodging_ID"]):
+        raise SystemExit("Load a ParkPal dataset first (generate_data.py)")
+    return {
+        "park_id": park["Park_ID"],
+        "user_id": user["User_ID"],
+        "reviewer_id": reviewer["User_ID"],
+        "lodging_id": lodging["Lodging_ID"],
+    }
+
+
+def read_cases(app, targets: Dict[str, int]) -> List[ReadCase]:
+    park_id, user_id = targets["park_id"], targets["user_id"]
+    cases = [
+        ReadCase("get_all_parks", app.get_all_parks, app.get_park_catalog.clear),
+        ReadCase(
+            "get_park_with_rating",
+            lambda: app.get_park_with_rating(park_id),
+            app.get_park.clear,
+        ),
+        ReadCase(
+            "get_lodging_by_park",
+            lambda: app.get_lodging_by_park(park_id),
+            app.get_lodging_by_park.clear,
+        ),
+    ]
+    for status in ("all", "upcoming", "past", "cancelled"):
+        cases.append(
+            ReadCase(
+                f"get_user_reservations[{status}]",
+                lambda status=status: app.get_user_reservations(user_id, status),
+                app.get_user_reservations.clear,
+            )
+        )
+    cases += [
+        ReadCase("get_all_reviews", app.get_all_reviews, app.get_all_reviews.clear, heavy=True),
+        ReadCase(
+            "get_user_reviews",
+            lambda: app.get_user_reviews(targets["reviewer_id"]),
+            app.get_user_reviews.clear,
+        ),
+        ReadCase(
+            "get_reviews_page",
+            lambda: app.get_reviews_page(park_id)[0],
+            app.get_reviews_page.clear,
+        ),
+    ]
+    return cases
+
+
+def write_results(app, targets: Dict[str, int], runs: int) -> List[Dict[str, Any]]:
+    """Time the write helpers on rows that are removed again"""
+    park_id, user_id = targets["park_id"], targets["user_id"]
+    tags = app.review_tags(None, user_id, park_id)
+    timings: Dict[str, List[float]] = {
+        "generate_confirmation_number": time_calls(app.generate_confirmation_number, runs),
+        "execute_insert": [],
+        "execute_update": [],
+        "execute_delete": [],
+        "create_reservation": [],
+        "delete_reservation": [],
+    }
+
+    def timed(name: str, func: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        result = func()
+        timings[name].append(time.perf_counter() - started)
+        return result
+
+    for i in range(runs):
+        review_id = timed(
+            "execute_insert",
+            lambda: app.execute_insert(
+                """
+                INSERT INTO Park_Review (User_ID, Park_ID, Rating, Review_Text, Visit_Date)
+                VALUES (%s, %s, 4, 'Data access benchmark review', %s)
+                """,
+                (user_id, park_id, date.today()),
+                invalidates=tags,
+            ),
+        )
+        timed(
+            "execute_update",
+            lambda: app.execute_update(
+                "UPDATE Park_Review SET Rating = 5 WHERE Review_ID = %s",
+                (review_id,),
+                invalidates=tags,
+            ),
+        )
+        timed(
+            "execute_delete",
+            lambda: app.execute_delete(
+                "DELETE FROM Park_Review WHERE Review_ID = %s", (review_id,), invalidates=tags
+            ),
+        )
+
+        # Far in the future so the benchmark never competes with real stays
+        check_in = date.today() + timedelta(days=3000 + i)
+        reservation_id = timed(
+            "create_reservation",
+            lambda: app.create_reservation(
+                {
+                    "User_ID": user_id,
+                    "Lodging_ID": targets["lodging_id"],
+                    "Check_In_Date": check_in,
+                    "Check_Out_Date": check_in + timedelta(days=2),
+                    "Number_Of_Guests": 2,
+                    "Number_Of_Rooms": 1,
+                    "Guest_Name": "Data Access Bench",
+                    "Guest_Phone": "000-000-0000",
+                    "Guest_Email": BENCH_EMAIL,
+                    "Confirmation_Number": f"BENCH-{time.time_ns()}",
+                    "Reservation_Status": "confirmed",
+                    "Total_Cost": 0,
+                }
+            ),
+        )
+        if reservation_id:
+            timed("delete_reservation", lambda: app.delete_reservation(reservation_id))
+
+    return [
+        {"function": name, "p50_ms": summarize(t)["p50_ms"], "p99_ms": summarize(t)["p99_ms"]}
+        for name, t in timings.items()
+    ]
+
+
+def dataset_counts(app) -> Dict[str, int]:
+    return {
+        table: app.execute_query(f"SELECT COUNT(*) AS n FROM `{table}`", fetch="one")["n"]
+        for table in DATASET_TABLES
+    }
+
+
+def compare(
+    results: List[Dict[str, Any]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+    min_delta_ms: float,
+) -> List[str]:
+    """Add baseline ratios to ``results`` and return the regressions found"""
+    regressions = []
+    for row in results:
+        previous = baseline.get(row["function"], {})
+        for metric in ("cold_p50_ms", "warm_p50_ms", "p50_ms"):
+            if metric not in row:
+                continue
+            before: Optional[float] = previous.get(metric)
+            ratio_column = metric.replace("_p50_ms", "_vs_base").replace("p50_ms", "vs_base")
+            if not before:
+                row[ratio_column] = "new"
+                continue
+            row[ratio_column] = f"{row[metric] / before:.2f}x"
+            if row[metric] > before * (1 + tolerance) and row[metric] - before >= min_delta_ms:
+                regressions.append(
+                    f"{row['function']} {metric}: {before:.2f} -> {row[metric]:.2f} ms"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--min-delta-ms", type=float, default=0.5)
+    parser.add_argument("--skip-writes", action="store_true")
+    args = parser.parse_args()
+
+    import parkpal_app
+
+    targets = pick_targets(parkpal_app)
+    dataset = dataset_counts(parkpal_app)
+    print("Dataset: " + ", ".join(f"{n:,} {table}" for table, n in dataset.items()))
+
+    reads = [case.run(args.runs) for case in read_cases(parkpal_app, targets)]
+    writes = [] if args.skip_writes else write_results(parkpal_app, targets, args.runs)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(
+            json.dumps(
+                {
+                    "dataset": dataset,
+                    "runs": args.runs,
+                    "results": {
+                        row["function"]: {k: v for k, v in row.items() if k.endswith("_ms")}
+                        for row in reads + writes
+                    },
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+        print_table(reads)
+        print()
+        print_table(writes)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    regressions = []
+    if args.baseline.exists():
+        stored = json.loads(args.baseline.read_text())
+        if stored.get("dataset") != dataset:
+            print(f"⚠️ Baseline was recorded on a different dataset: {stored.get('dataset')}")
+        regressions = compare(
+            reads + writes, stored["results"], args.tolerance, args.min_delta_ms
+        )
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+
+    print_table(reads)
+    print()
+    print_table(writes)
+    if regressions:
+        print(f"\nRegressions beyond {args.tolerance:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
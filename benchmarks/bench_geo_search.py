@@ -0,0 +1,123 @@
+"""
+Benchmark for the geospatial lookups behind nearest_parks() and lodging_within().
+
+Scatters a seeded set of synthetic lodgings around the generate_data.py parks
+(busier parks get more, at exponentially distributed distances), then times
+building the grid index, radius searches around parks and k-nearest searches
+from random points, next to a vectorized haversine scan of every lodging.
+No database server is needed.
+
+    python benchmarks/bench_geo_search.py --lodgings 1000000
+"""
+
+import argparse
+import random
+import time
+
+import harness  # noqa: F401  (puts the repo root on sys.path)
+from harness import print_table, summarize
+
+import numpy as np
+
+import parkpal_app
+from generate_data import SyntheticData
+
+
+def scatter_lodgings(parks, count: int, seed: int):
+    """Latitudes and longitudes of ``count`` lodgings around ``parks``"""
+    rng = np.random.default_rng(seed)
+    visitors = np.array([p["Annual_Visitors"] for p in parks], dtype=float)
+    chosen = rng.choice(len(parks), size=count, p=visitors / visitors.sum())
+    park_lats = np.radians([p["Latitude"] for p in parks])[chosen]
+    park_lons = np.radians([p["Longitude"] for p in parks])[chosen]
+    angles = rng.exponential(8.0, count) / parkpal_app.EARTH_RADIUS_MILES
+    bearings = rng.uniform(0, 2 * np.pi, count)
+    lats = np.arcsin(
+        np.sin(park_lats) * np.cos(angles)
+        + np.cos(park_lats) * np.sin(angles) * np.cos(bearings)
+    )
+    lons = park_lons + np.arctan2(
+        np.sin(bearings) * np.sin(angles) * np.cos(park_lats),
+        np.cos(angles) - np.sin(park_lats) * np.sin(lats),
+    )
+    return np.degrees(lats), (np.degrees(lons) + 540) % 360 - 180
+
+
+def timed(func, queries):
+    latencies = []
+    found = 0
+    for query in queries:
+        started = time.perf_counter()
+        ids, _ = func(*query)
+        latencies.append(time.perf_counter() - started)
+        found += len(ids)
+    return latencies, found / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--lodgings", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=22)
+    args = parser.parse_args()
+
+    parks = list(SyntheticData(seed=args.seed).parks())
+    lats, lons = scatter_lodgings(parks, args.lodgings, args.seed)
+    ids = np.arange(1, args.lodgings + 1)
+
+    started = time.perf_counter()
+    lodging_index = parkpal_app.GeoGridIndex(ids, lats, lons, cell_degrees=0.1)
+    build_seconds = time.perf_counter() - started
+    park_index = parkpal_app.GeoGridIndex(
+        [p["Park_ID"] for p in parks],
+        [p["Latitude"] for p in parks],
+        [p["Longitude"] for p in parks],
+        cell_degrees=1.0,
+    )
+    print(
+        f"Indexed {len(lodging_index):,} lodgings around {len(parks)} parks "
+        f"in {build_seconds:.2f}s"
+    )
+
+    rng = random.Random(args.seed)
+    near_parks = [
+        (p["Latitude"] + rng.uniform(-0.2, 0.2), p["Longitude"] + rng.uniform(-0.2, 0.2))
+        for p in rng.choices(parks, k=args.lookups)
+    ]
+    anywhere = [
+        (rng.uniform(25, 49), rng.uniform(-124, -67)) for _ in range(args.lookups)
+    ]
+
+    def scan_within(lat, lon, miles):
+        distances = parkpal_app.haversine_miles(lat, lon, lats, lons)
+        inside = np.nonzero(distances <= miles)[0]
+        return inside[np.argsort(distances[inside])], distances
+
+    rows = []
+    for miles in (1, 5, 25):
+        latencies, found = timed(
+            lambda lat, lon: lodging_index.within(lat, lon, miles), near_parks
+        )
+        rows.append(
+            {"lookup": f"lodging within {miles} mi", "avg_found": found, **summarize(latencies)}
+        )
+    latencies, found = timed(
+        lambda lat, lon: lodging_index.nearest(lat, lon, args.k), anywhere
+    )
+    rows.append(
+        {"lookup": f"{args.k} nearest lodgings", "avg_found": found, **summarize(latencies)}
+    )
+    latencies, found = timed(lambda lat, lon: park_index.nearest(lat, lon, 5), anywhere)
+    rows.append({"lookup": "5 nearest parks", "avg_found": found, **summarize(latencies)})
+    latencies, found = timed(
+        lambda lat, lon: scan_within(lat, lon, 5), near_parks[: max(1, args.lookups // 100)]
+    )
+    rows.append(
+        {"lookup": "full scan within 5 mi", "avg_found": found, **summarize(latencies)}
+    )
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
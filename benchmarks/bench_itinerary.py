@@ -0,0 +1,126 @@
+"""
+Benchmark for the Trip Planner route optimizer (optimize_route, plan_itinerary).
+
+Picks seeded random sets of generate_data.py parks and starting points for
+each trip size, then times the nearest-neighbor route alone, the optimized
+route (2-opt and Or-opt with double-bridge kicks) and a whole itinerary,
+with lodging availability answered from the synthetic lodging catalog in
+memory. Route lengths are compared with nearest-neighbor and, for small
+trips, with the exact shortest route. No database server is needed.
+
+    python benchmarks/bench_itinerary.py --trips 20
+"""
+
+import argparse
+import itertools
+import random
+import time
+from datetime import date, timedelta
+
+import harness  # noqa: F401  (puts the repo root on sys.path)
+from harness import print_table, summarize
+
+import numpy as np
+import pandas as pd
+
+import parkpal_app
+from generate_data import SyntheticData
+
+# Largest trip whose exact shortest route is found by trying every order
+EXACT_MAX_PARKS = 8
+
+
+def exact_route_miles(dist: np.ndarray, round_trip: bool) -> float:
+    """Length of the shortest route from point 0 through every other point"""
+    orders = np.array(list(itertools.permutations(range(1, len(dist)))))
+    miles = dist[0, orders[:, 0]] + dist[orders[:, :-1], orders[:, 1:]].sum(axis=1)
+    if round_trip:
+        miles += dist[orders[:, -1], 0]
+    return float(miles.min())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[5, 8, 15, 30, 63], help="parks per trip"
+    )
+    parser.add_argument("--trips", type=int, default=20, help="trips per size")
+    parser.add_argument("--round-trip", action="store_true")
+    parser.add_argument("--seed", type=int, default=23)
+    args = parser.parse_args()
+
+    data = SyntheticData(seed=args.seed)
+    parks_df = pd.DataFrame(list(data.parks()))
+    lodging_df = pd.DataFrame(list(data.lodging()))
+    lodging_by_park = {
+        park_id: rows.reset_index(drop=True)
+        for park_id, rows in lodging_df.groupby("Park_ID")
+    }
+    empty = lodging_df.iloc[:0]
+
+    def availability(park_id, check_in, check_out, num_rooms):
+        lodging = lodging_by_park.get(park_id, empty)
+        return lodging[lodging["Total_Rooms"] >= num_rooms]
+
+    rng = random.Random(args.seed)
+    start_date = date(2027, 6, 1)
+    rows = []
+    for size in args.sizes:
+        size = min(size, len(parks_df))
+        timings = {"nearest neighbor": [], "optimized": [], "whole itinerary": []}
+        versus_nn, versus_exact = [], []
+        for _ in range(args.trips):
+            chosen = parks_df.sample(size, random_state=rng.randrange(2**32))
+            start = (rng.uniform(25, 49), rng.uniform(-124, -67))
+            dist = parkpal_app.distance_matrix(
+                np.concatenate([[start[0]], chosen["Latitude"]]),
+                np.concatenate([[start[1]], chosen["Longitude"]]),
+            )
+
+            # Open routes end at a pinned point zero miles from every park,
+            # as optimize_route sets them up
+            end = 0 if args.round_trip else len(dist)
+            extended = dist if args.round_trip else np.pad(dist, (0, 1))
+            started = time.perf_counter()
+            nn_route = parkpal_app._nearest_neighbor_route(extended, end)
+            timings["nearest neighbor"].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            order = parkpal_app.optimize_route(dist, args.round_trip)
+            timings["optimized"].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            parkpal_app.plan_itinerary(
+                chosen["Park_ID"].tolist(),
+                start,
+                start_date,
+                start_date + timedelta(days=3 * size),
+                nights_per_park=2,
+                round_trip=args.round_trip,
+                parks_df=parks_df,
+                availability=availability,
+            )
+            timings["whole itinerary"].append(time.perf_counter() - started)
+
+            tail = [0] if args.round_trip else []
+            miles = parkpal_app.route_miles(np.array([0, *order, *tail]), dist)
+            nn_miles = parkpal_app.route_miles(nn_route, extended)
+            versus_nn.append(miles / nn_miles - 1 if nn_miles else 0.0)
+            if size <= EXACT_MAX_PARKS:
+                versus_exact.append(miles / exact_route_miles(dist, args.round_trip) - 1)
+
+        for step, latencies in timings.items():
+            row = {"parks": size, "step": step, **summarize(latencies)}
+            if step == "optimized":
+                row["vs_nn_pct"] = 100 * float(np.mean(versus_nn))
+                row["vs_exact_pct"] = (
+                    100 * float(np.mean(versus_exact)) if versus_exact else "-"
+                )
+            else:
+                row["vs_nn_pct"] = row["vs_exact_pct"] = "-"
+            rows.append(row)
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Benchmark for page rerun time per interaction, with and without fragments.
+
+Drives Browse Parks and My Reservations headlessly with Streamlit's AppTest
+against the configured MySQL database and times what each interaction
+reruns. Before: the whole page, with PARKPAL_FRAGMENTS=false and
+LIST_PAGE_SIZE=0 so every park and reservation is rendered in full. After:
+only the fragment the widget lives in, with lazy expanders and paging (or
+the whole page, for widgets outside any fragment). Also counts the SQL
+statements each rerun sends. Load a dataset first, e.g.
+``generate_data.py --scale 1``.
+
+    DB_SSL_MODE=DISABLED python benchmarks/bench_page_reruns.py --runs 20
+"""
+
+import argparse
+import os
+import time
+
+import harness  # noqa: F401  (puts the repo root on sys.path)
+from harness import print_table, summarize
+
+from streamlit.testing.v1 import AppTest
+
+import parkpal_app
+
+PAGE_SCRIPT = """
+import parkpal_app
+parkpal_app.{}()
+"""
+
+# A fragment rerun runs just the fragment function, with the arguments it
+# was last called with
+FRAGMENT_SCRIPT = """
+import streamlit as st
+import parkpal_app
+parkpal_app.{}(*st.session_state["bench_args"])
+"""
+
+
+def use_fragments(enabled: bool) -> None:
+    os.environ["PARKPAL_FRAGMENTS"] = "true" if enabled else "false"
+    if enabled:
+        os.environ.pop("LIST_PAGE_SIZE", None)
+    else:
+        os.environ["LIST_PAGE_SIZE"] = "0"
+
+
+def statements_sent() -> int:
+    return sum(q["Calls"] for q in parkpal_app.get_metrics().query_report())
+
+
+def app_test(script: str, name: str, *args, **session_state) -> AppTest:
+    """An AppTest of a page or fragment function, run once to warm up"""
+    at = AppTest.from_string(script.format(name), default_timeout=120)
+    at.session_state["bench_args"] = args
+    for key, value in session_state.items():
+        at.session_state[key] = value
+    return checked(at.run())
+
+
+def checked(at: AppTest) -> AppTest:
+    if at.exception:
+        raise SystemExit(at.exception[0].message)
+    return at
+
+
+def time_interaction(at: AppTest, interact, runs: int):
+    """Rerun latencies after ``interact(at, run)`` sets a widget, and statements"""
+    latencies = []
+    sent = statements_sent()
+    for run in range(runs):
+        interact(at, run)
+        started = time.perf_counter()
+        checked(at.run())
+        latencies.append(time.perf_counter() - started)
+    return latencies, (statements_sent() - sent) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    app = parkpal_app
+    catalog = app.get_park_catalog_source().current()
+    busiest = app.execute_query(
+        """
+        SELECT User_ID, COUNT(*) AS Reservations FROM Lodging_Reservation
+        WHERE User_ID IS NOT NULL
+        GROUP BY User_ID ORDER BY Reservations DESC LIMIT 1
+        """,
+        fetch="one",
+    )
+    if catalog is None or not busiest:
+        raise SystemExit("Load a ParkPal dataset first (generate_data.py)")
+    user_id = busiest["User_ID"]
+    user_label = next(
+        f"{u['First_Name']} {u['Last_Name']} ({u['Email']})"
+        for u in app.get_all_users()
+        if u["User_ID"] == user_id
+    )
+    reservations = app.get_user_reservations(user_id, "all")
+    confirmed = reservations[reservations["Reservation_Status"] == "confirmed"]
+    reservation = (confirmed if not confirmed.empty else reservations).iloc[0]
+    reservation_id = int(reservation["Reservation_ID"])
+    editable = reservation["Reservation_Status"] == "confirmed"
+    park = app.with_park_ratings(catalog.rows(catalog.select({})[:1])).iloc[0]
+    states = catalog.values("State")[:2]
+    print(
+        f"{len(catalog)} parks; user {user_id} has {len(reservations)} reservations"
+    )
+
+    def pick_state(at, run):
+        at.selectbox[0].set_value(states[run % 2])
+
+    def next_page(at, run):
+        at.number_input(key="directory_page::").set_value(1 + (run + 1) % 2)
+
+    def click_edit(at, run):
+        at.session_state[f"editing_{reservation_id}"] = False
+        at.button(key=f"edit_{reservation_id}").click()
+
+    def change_filter(at, run):
+        at.radio[0].set_value("Upcoming" if run % 2 == 0 else "All")
+
+    def rerun(at, run):
+        pass
+
+    rows = []
+
+    def record(interaction, version, at, interact):
+        latencies, statements = time_interaction(at, interact, args.runs)
+        rows.append(
+            {
+                "interaction": interaction,
+                "version": version,
+                "statements": statements,
+                **summarize(latencies),
+            }
+        )
+
+    use_fragments(False)
+    browse = app_test(PAGE_SCRIPT, "browse_parks_page")
+    record("filter parks by state", "before: page", browse, pick_state)
+    reservations_page = app_test(PAGE_SCRIPT, "my_reservations_page")
+    reservations_page.selectbox[0].set_value(user_label)
+    checked(reservations_page.run())
+    if editable:
+        record(
+            "click Edit on a reservation", "before: page", reservations_page, click_edit
+        )
+    record(
+        "switch reservation filter", "before: page", reservations_page, change_filter
+    )
+
+    use_fragments(True)
+    directory = app_test(FRAGMENT_SCRIPT, "park_directory")
+    record("filter parks by state", "after: directory fragment", directory, pick_state)
+    if len(catalog) > 20:
+        directory.selectbox[0].set_value("All")
+        checked(directory.run())
+        record("next page of parks", "after: directory fragment", directory, next_page)
+    card = app_test(
+        FRAGMENT_SCRIPT, "park_card", park, **{f"park_{park['Park_ID']}": True}
+    )
+    record("open a park", "after: park fragment", card, rerun)
+    reservation_card = app_test(
+        FRAGMENT_SCRIPT,
+        "reservation_card",
+        reservation,
+        **{f"reservation_{reservation_id}": True},
+    )
+    if editable:
+        record(
+            "click Edit on a reservation",
+            "after: reservation fragment",
+            reservation_card,
+            click_edit,
+        )
+    reservations_page = app_test(PAGE_SCRIPT, "my_reservations_page")
+    reservations_page.selectbox[0].set_value(user_label)
+    checked(reservations_page.run())
+    record(
+        "switch reservation filter",
+        "after: page (lazy, paged)",
+        reservations_page,
+        change_filter,
+    )
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
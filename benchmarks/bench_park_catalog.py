@@ -0,0 +1,125 @@
+"""
+Benchmark for the Browse Parks filters on the indexed ParkCatalog.
+
+Grows the generate_data.py parks into a seeded catalog of --parks
+destinations (some spanning several states), then times each filter
+combination the old way - copy the catalog DataFrame, then str.contains and
+equality masks - next to intersecting the catalog's position indexes and
+materializing only the matching rows. A rerun row also counts loading the
+catalog through the query cache, which the old page decoded every rerun.
+No database server is needed.
+
+    python benchmarks/bench_park_catalog.py --parks 100000
+"""
+
+import argparse
+import random
+import time
+
+import harness  # noqa: F401  (puts the repo root on sys.path)
+from harness import print_table, summarize, time_calls
+
+import pandas as pd
+
+import parkpal_app
+from generate_data import SyntheticData
+
+
+def make_catalog(count: int, seed: int) -> pd.DataFrame:
+    """``count`` parks copied from the synthetic 63, every tenth in three states"""
+    rng = random.Random(seed)
+    parks = list(SyntheticData(seed=seed).parks())
+    states = sorted({p["State"] for p in parks})
+    rows = []
+    for park_id in range(1, count + 1):
+        park = dict(rng.choice(parks), Park_ID=park_id)
+        park["Park_Name"] = f"{park['Park_Name']} {park_id}"
+        if park_id % 10 == 0:
+            park["State"] = ", ".join(rng.sample(states, 3))
+        rows.append(park)
+    return pd.DataFrame(rows).sort_values("Park_Name", ignore_index=True)
+
+
+def copy_and_mask(parks_df: pd.DataFrame, state, region, season) -> pd.DataFrame:
+    """The directory filters as browse_parks_page applied them before"""
+    filtered_df = parks_df.copy()
+    if state:
+        filtered_df = filtered_df[filtered_df["State"].str.contains(state, na=False)]
+    if region:
+        filtered_df = filtered_df[filtered_df["Region"] == region]
+    if season:
+        filtered_df = filtered_df[filtered_df["Best_Time_To_Visit"] == season]
+    return filtered_df
+
+
+def filter_current(source, filters) -> pd.DataFrame:
+    """The directory filters as browse_parks_page applies them now"""
+    catalog = source.current()
+    return catalog.rows(catalog.select(filters))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--parks", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=24)
+    args = parser.parse_args()
+
+    parks_df = make_catalog(args.parks, args.seed)
+
+    @parkpal_app.cached(ttl=3600, tags=lambda: ["parks"])
+    def load_catalog() -> pd.DataFrame:
+        return parks_df
+
+    started = time.perf_counter()
+    catalog = parkpal_app.ParkCatalog(parks_df)
+    print(f"Indexed {len(catalog):,} parks in {time.perf_counter() - started:.2f}s")
+    source = parkpal_app.ParkCatalogSource(load_catalog)
+    source.current()
+
+    # The busiest state, then its most common region and season
+    state = catalog.value_counts("State", catalog.select({})).index[0]
+    in_state = catalog.select({"State": state})
+    region = catalog.value_counts("Region", in_state).index[0]
+    season = catalog.value_counts("Best_Time_To_Visit", in_state).index[0]
+    combos = [
+        ("all parks", None, None, None),
+        ("state", state, None, None),
+        ("region", None, region, None),
+        ("state + season", state, None, season),
+        ("state + region + season", state, region, season),
+    ]
+    rows = []
+    for label, state, region, season in combos:
+        filters = {
+            column: value
+            for column, value in (
+                ("State", state),
+                ("Region", region),
+                ("Best_Time_To_Visit", season),
+            )
+            if value
+        }
+        matches = len(catalog.select(filters))
+        cases = {
+            "copy + masks": lambda: copy_and_mask(parks_df, state, region, season),
+            "catalog indexes": lambda: catalog.rows(catalog.select(filters)),
+            "rerun, copy + masks": lambda: copy_and_mask(
+                load_catalog(), state, region, season
+            ),
+            "rerun, catalog indexes": lambda: filter_current(source, filters),
+        }
+        for method, func in cases.items():
+            rows.append(
+                {
+                    "filters": label,
+                    "matches": matches,
+                    "method": method,
+                    **summarize(time_calls(func, args.runs)),
+                }
+            )
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark for the park keyword search (ParkSearchIndex, BM25).
+
+Builds a seeded synthetic park catalog with the generate_data.py vocabulary,
+then times indexing it, re-syncing it after a catalog reload (unchanged and
+with a share of parks edited) and ranked searches, next to an unranked
+pandas substring scan of the same columns. No database server is needed.
+
+    python benchmarks/bench_park_search.py --parks 100000
+"""
+
+import argparse
+import random
+import time
+
+import harness  # noqa: F401  (puts the repo root on sys.path)
+from harness import print_table, summarize, time_calls
+
+import pandas as pd
+
+import parkpal_app
+from generate_data import (
+    ACTIVITIES,
+    LANDSCAPES,
+    NAME_FIRST,
+    NAME_SECOND,
+    PLANTS,
+    TRAIL_NOUNS,
+    WILDLIFE,
+)
+
+QUERIES = [
+    "bison",
+    "kayaking",
+    "slot canyons",
+    "grizzly bears alpine lakes",
+    "stargazing sand dunes",
+    "tide pooling coral reefs sea turtles",
+]
+
+
+def make_park(park_id: int, rng: random.Random) -> dict:
+    name = f"{rng.choice(NAME_FIRST)} {rng.choice(NAME_SECOND)} {park_id}"
+    wildlife = rng.sample(WILDLIFE, 5)
+    activities = rng.sample(ACTIVITIES, 5)
+    landscapes = rng.sample(LANDSCAPES, 2)
+    return {
+        "Park_ID": park_id,
+        "Park_Name": name,
+        "Description": (
+            f"{name} protects {landscapes[0]} and {landscapes[1]}, home to "
+            f"{wildlife[0]} and {wildlife[1]}. Visitors come for "
+            f"{activities[0]}, {activities[1]} and {activities[2]}."
+        ),
+        "Wildlife_Information": ", ".join(w.capitalize() for w in wildlife),
+        "Plant_Information": ", ".join(p.capitalize() for p in rng.sample(PLANTS, 4)),
+        "Park_Activities_Events": ", ".join(a.capitalize() for a in activities),
+        "Popular_Park_Trails": ", ".join(
+            f"{rng.choice(NAME_FIRST)} {rng.choice(TRAIL_NOUNS)}" for _ in range(3)
+        ),
+    }
+
+
+def substring_scan(parks_df: pd.DataFrame, query: str) -> pd.DataFrame:
+    """Parks containing any query word in any searched column, unranked"""
+    mask = pd.Series(False, index=parks_df.index)
+    for word in query.split():
+        for column in parkpal_app.PARK_SEARCH_FIELDS:
+            mask |= parks_df[column].str.contains(word, case=False, regex=False)
+    return parks_df[mask]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--parks", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=20, help="searches per query")
+    parser.add_argument(
+        "--changed", type=float, default=0.01, help="share of parks edited per reload"
+    )
+    parser.add_argument("--seed", type=int, default=21)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    parks_df = pd.DataFrame([make_park(i, rng) for i in range(1, args.parks + 1)])
+
+    index = parkpal_app.ParkSearchIndex()
+    started = time.perf_counter()
+    index.sync(parks_df)
+    build_seconds = time.perf_counter() - started
+    print(
+        f"Indexed {len(index):,} parks in {build_seconds:.2f}s "
+        f"({len(index) / build_seconds:,.0f} parks/s)"
+    )
+
+    # A catalog reload hands over a new DataFrame with the same content
+    started = time.perf_counter()
+    unchanged = index.sync(parks_df.copy())
+    reload_seconds = time.perf_counter() - started
+
+    edited = parks_df.copy()
+    edited_rows = rng.sample(range(len(edited)), max(1, int(len(edited) * args.changed)))
+    edited.loc[edited_rows, "Description"] += " Newly reopened for kayaking."
+    started = time.perf_counter()
+    changes = index.sync(edited)
+    edit_seconds = time.perf_counter() - started
+    print_table(
+        [
+            {"sync": "full build", "seconds": build_seconds, "reindexed": len(index)},
+            {
+                "sync": "reload, unchanged",
+                "seconds": reload_seconds,
+                "reindexed": sum(unchanged.values()),
+            },
+            {
+                "sync": f"reload, {args.changed:.0%} edited",
+                "seconds": edit_seconds,
+                "reindexed": sum(changes.values()),
+            },
+        ]
+    )
+    print()
+
+    rows = []
+    for query in QUERIES:
+        matches = len(index.search(query))
+        rows.append(
+            {
+                "query": query,
+                "matches": matches,
+                "method": "bm25 all",
+                **summarize(time_calls(lambda: index.search(query), args.runs)),
+            }
+        )
+        rows.append(
+            {
+                "query": query,
+                "matches": matches,
+                "method": "bm25 top 20",
+                **summarize(time_calls(lambda: index.search(query, k=20), args.runs)),
+            }
+        )
+        scan_runs = max(1, args.runs // 10)
+        rows.append(
+            {
+                "query": query,
+                "matches": len(substring_scan(edited, query)),
+                "method": "substring scan",
+                **summarize(time_calls(lambda: substring_scan(edited, query), scan_runs)),
+            }
+        )
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
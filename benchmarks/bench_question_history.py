@@ -0,0 +1,156 @@
+"""
+Benchmark for the ParkBot question history index (QuestionHistory).
+
+Fills a temporary history database with a seeded set of synthetic ParkBot
+questions, then times loading and indexing them and looking up paraphrased
+and unrelated questions. Also counts how many paraphrases (which should)
+and questions with one number changed (which must not) would reuse stored
+SQL. No database server or model is needed.
+
+    python benchmarks/bench_question_history.py --questions 100000
+"""
+
+import argparse
+import os
+import random
+import re
+import sqlite3
+import tempfile
+import time
+
+import harness  # noqa: F401  (puts the repo root on sys.path)
+from harness import print_table, summarize
+
+import parkpal_app
+
+PARKS = [
+    "Yellowstone", "Yosemite", "Zion", "Acadia", "Arches", "Glacier",
+    "Grand Canyon", "Olympic", "Denali", "Everglades", "Joshua Tree", "Sequoia",
+    "Bryce Canyon", "Big Bend", "Redwood", "Shenandoah", "Badlands", "Saguaro",
+]
+STATES = [
+    "Utah", "California", "Wyoming", "Alaska", "Maine", "Montana", "Florida",
+    "Arizona", "Texas", "Colorado", "Washington", "Virginia",
+]
+MONTHS = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+]
+TEMPLATES = [
+    "Which lodges in {park} cost less than ${price} per night in {month}?",
+    "What is the average rating of {park} since {year}?",
+    "Show the top {n} parks in {state} by rating",
+    "How many reservations were made at {park} in {month} {year}?",
+    "List campgrounds near {park} with more than {n} rooms under ${price}",
+    "Which parks in {state} were established before {year}?",
+    "Who wrote the most reviews for {park} in {year}?",
+    "What are the cheapest hotels in {state} for {n} guests in {month}?",
+]
+
+
+def make_question(rng: random.Random) -> str:
+    return rng.choice(TEMPLATES).format(
+        park=rng.choice(PARKS),
+        state=rng.choice(STATES),
+        month=rng.choice(MONTHS),
+        price=rng.randrange(50, 1000, 5),
+        n=rng.randint(1, 50),
+        year=rng.randint(1890, 2025),
+    )
+
+
+def paraphrase(question: str, rng: random.Random) -> str:
+    words = question.split()
+    if rng.random() < 0.5:
+        words = [w.upper() if rng.random() < 0.2 else w for w in words]
+    else:
+        words.insert(rng.randrange(len(words)), "please")
+    return " ".join(words)
+
+
+def change_a_number(question: str) -> str:
+    return re.sub(r"\d+", lambda m: str(int(m.group()) + 1), question, count=1)
+
+
+def reuses(question: str, matches, threshold: float = 0.95) -> bool:
+    """Whether ParkBot would answer ``question`` with the best match's SQL"""
+    return bool(
+        matches
+        and matches[0]["score"] >= threshold
+        and parkpal_app.question_literals(matches[0]["question"])
+        == parkpal_app.question_literals(question)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--questions", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    path = os.path.join(tempfile.mkdtemp(), "history.sqlite3")
+    parkpal_app.QuestionHistory(path)  # creates the table
+
+    unique = {}
+    while len(unique) < args.questions:
+        question = make_question(rng)
+        unique[parkpal_app.normalize_question(question)] = question
+    questions = list(unique.values())
+    db = sqlite3.connect(path)
+    db.executemany(
+        """
+        INSERT INTO parkbot_history
+            (question, schema_version, generated_sql, row_count, execution_ms, last_asked_at)
+        VALUES (?, ?, 'SELECT 1', 1, 1.0, 0)
+        """,
+        (
+            (parkpal_app.normalize_question(q), parkpal_app.PARKBOT_SCHEMA_VERSION)
+            for q in questions
+        ),
+    )
+    db.commit()
+    db.close()
+
+    started = time.perf_counter()
+    history = parkpal_app.QuestionHistory(path)
+    build_seconds = time.perf_counter() - started
+    print(
+        f"Loaded and indexed {len(history.index):,} questions in {build_seconds:.2f}s "
+        f"({len(history.index) / build_seconds:,.0f} questions/s)"
+    )
+
+    samples = rng.sample(questions, min(args.lookups, len(questions)))
+    near, unrelated = [], []
+    found = reused = wrongly_reused = 0
+    for question in samples:
+        asked = paraphrase(question, rng)
+        started = time.perf_counter()
+        matches = history.similar(asked)
+        near.append(time.perf_counter() - started)
+        found += bool(
+            matches and matches[0]["question"] == parkpal_app.normalize_question(question)
+        )
+        reused += reuses(asked, matches)
+        changed = change_a_number(question)
+        if parkpal_app.normalize_question(changed) not in unique:
+            wrongly_reused += reuses(changed, history.similar(changed))
+
+        started = time.perf_counter()
+        history.similar(f"Tell me about wildlife photography tips {rng.randint(1, 999)}")
+        unrelated.append(time.perf_counter() - started)
+
+    print_table(
+        [
+            {"lookup": "paraphrased question", **summarize(near)},
+            {"lookup": "unrelated question", **summarize(unrelated)},
+        ]
+    )
+    print(f"Paraphrases whose best match is the original: {found}/{len(samples)}")
+    print(f"Paraphrases answered from history (score >= 0.95): {reused}/{len(samples)}")
+    print(f"Questions with a changed number answered from history: {wrongly_reused}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Benchmark for park rating reads: Park_Rating_Summary vs aggregating Park_Review.
+
+Grows Park_Review through each size in --sizes (default 1k to 10M reviews)
+with synthetic reviews spread over every park, and at each size times
+reading one park's rating and every park's ratings both from the
+trigger-maintained Park_Rating_Summary and by aggregating Park_Review the
+way v_park_ratings used to. Also checks the summary still matches the
+aggregate exactly.
+
+Run it against a scratch copy of the ParkPal schema with sample data:
+
+    DB_HOST=127.0.0.1 DB_USER=root DB_PASSWORD=... DB_NAME=parkpal_bench \
+    DB_SSL_MODE=DISABLED python benchmarks/bench_rating_summary.py
+
+The synthetic reviews (and the Change_Log rows their triggers wrote) are
+removed afterwards unless --keep is given.
+"""
+
+import argparse
+import random
+import time
+
+import harness  # noqa: F401  (puts the repo root on sys.path)
+from harness import print_table, summarize, time_calls
+
+import parkpal_app
+
+BENCH_EMAIL = "rating-bench@parkpal.invalid"
+
+SUMMARY_ONE_PARK = """
+    SELECT Review_Count, Average_Rating, Min_Rating, Max_Rating
+    FROM Park_Rating_Summary WHERE Park_ID = %s
+"""
+SUMMARY_ALL_PARKS = "SELECT * FROM v_park_ratings"
+AGGREGATE_ONE_PARK = """
+    SELECT COUNT(*) AS Review_Count, ROUND(AVG(Rating), 2) AS Average_Rating,
+           MIN(Rating) AS Min_Rating, MAX(Rating) AS Max_Rating
+    FROM Park_Review WHERE Park_ID = %s
+"""
+AGGREGATE_ALL_PARKS = """
+    SELECT np.Park_ID, np.Park_Name, np.State,
+           COUNT(pr.Review_ID) AS Total_Reviews,
+           ROUND(AVG(pr.Rating), 2) AS Average_Rating,
+           MIN(pr.Rating) AS Min_Rating, MAX(pr.Rating) AS Max_Rating
+    FROM National_Park np
+    LEFT JOIN Park_Review pr ON np.Park_ID = pr.Park_ID
+    GROUP BY np.Park_ID, np.Park_Name, np.State
+"""
+
+
+def insert_reviews(user_id: int, count: int, batch_size: int, seed: int) -> float:
+    """Insert ``count`` synthetic reviews in INSERT ... SELECT batches; returns seconds"""
+
+    def work(connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"SET SESSION cte_max_recursion_depth = {batch_size + 1}")
+            remaining = count
+            while remaining:
+                batch = min(batch_size, remaining)
+                cursor.execute(
+                    """
+                    INSERT INTO Park_Review (User_ID, Park_ID, Rating, Review_Text, Visit_Date)
+                    WITH RECURSIVE seq (n) AS (
+                        SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < %s
+                    ),
+                    parks AS (
+                        SELECT Park_ID, ROW_NUMBER() OVER (ORDER BY Park_ID) - 1 AS idx,
+                               COUNT(*) OVER () AS total
+                        FROM National_Park
+                    )
+                    SELECT %s, parks.Park_ID, 1 + (seq.n * 7 + %s) %% 5,
+                           'Synthetic review written by the rating summary benchmark.',
+                           CURDATE() - INTERVAL (seq.n %% 365) DAY
+                    FROM seq
+                    JOIN parks ON parks.idx = (seq.n + %s) %% parks.total
+                    """,
+                    (batch, user_id, seed, seed),
+                )
+                connection.commit()
+                remaining -= batch
+                seed += batch
+        finally:
+            cursor.close()
+
+    started = time.perf_counter()
+    parkpal_app.get_connection_pool().run(work)
+    return time.perf_counter() - started
+
+
+def review_count() -> int:
+    return parkpal_app.execute_query(
+        "SELECT COUNT(*) AS n FROM Park_Review", fetch="one"
+    )["n"]
+
+
+def summary_matches() -> bool:
+    """Whether every park's summary equals a fresh aggregate of Park_Review"""
+    expected = {
+        row["Park_ID"]: (row["Total_Reviews"], row["Average_Rating"], row["Min_Rating"], row["Max_Rating"])
+        for row in parkpal_app.execute_query(AGGREGATE_ALL_PARKS)
+    }
+    actual = {
+        row["Park_ID"]: (row["Total_Reviews"], row["Average_Rating"], row["Min_Rating"], row["Max_Rating"])
+        for row in parkpal_app.execute_query(SUMMARY_ALL_PARKS)
+    }
+    return expected == actual
+
+
+def cleanup(user_id: int, batch_size: int) -> None:
+    """Delete the synthetic reviews and user, then rebuild the summary"""
+
+    def work(connection):
+        cursor = connection.cursor()
+        try:
+            while True:
+                cursor.execute(
+                    "DELETE FROM Park_Review WHERE User_ID = %s LIMIT %s",
+                    (user_id, batch_size),
+                )
+                connection.commit()
+                if cursor.rowcount < batch_size:
+                    break
+            cursor.execute("DELETE FROM User WHERE User_ID = %s", (user_id,))
+            cursor.execute("CALL sp_rebuild_park_rating_summary()")
+            cursor.execute("CALL sp_purge_change_log(0)")
+            connection.commit()
+        finally:
+            cursor.close()
+
+    parkpal_app.get_connection_pool().run(work)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000,10000000")
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=15)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    parks = [row["Park_ID"] for row in parkpal_app.execute_query("SELECT Park_ID FROM National_Park")]
+    if not parks:
+        raise SystemExit("Load the ParkPal schema and sample data first")
+    user_id = parkpal_app._execute_write(
+        """
+        INSERT INTO User (Email, Password_Hash, First_Name, Last_Name)
+        VALUES (%s, 'x', 'Rating', 'Bench')
+        """,
+        (BENCH_EMAIL,),
+    )
+    rng = random.Random(args.seed)
+
+    rows = []
+    mismatches = 0
+    try:
+        for size in (int(s) for s in args.sizes.split(",")):
+            missing = size - review_count()
+            if missing > 0:
+                seconds = insert_reviews(user_id, missing, args.batch, rng.randrange(1000))
+                print(f"Inserted {missing:,} reviews in {seconds:.1f}s ({missing / seconds:,.0f} rows/s)")
+            if not summary_matches():
+                mismatches += 1
+                print(f"Park_Rating_Summary does not match Park_Review at {size:,} reviews")
+
+            reads = [
+                ("summary, one park", lambda: parkpal_app.execute_query(
+                    SUMMARY_ONE_PARK, (rng.choice(parks),), fetch="one")),
+                ("summary, all parks", lambda: parkpal_app.execute_query(SUMMARY_ALL_PARKS)),
+                ("aggregate, one park", lambda: parkpal_app.execute_query(
+                    AGGREGATE_ONE_PARK, (rng.choice(parks),), fetch="one")),
+                ("aggregate, all parks", lambda: parkpal_app.execute_query(AGGREGATE_ALL_PARKS)),
+            ]
+            for name, read in reads:
+                # Full aggregates get slow at large sizes; fewer runs keep it bounded
+                runs = args.reads if name.startswith("summary") else max(args.reads // 10, 5)
+                rows.append({"reviews": f"{size:,}", "read": name, **summarize(time_calls(read, runs))})
+    finally:
+        if not args.keep:
+            cleanup(user_id, args.batch)
+
+    print_table(rows)
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark for the ParkBot SQL validator (check_sql_safety).
+
+Generates a seeded corpus of a few thousand ParkBot-style queries, half
+legitimate and half unsafe (stacked statements, INTO OUTFILE, SLEEP(),
+BENCHMARK(), locking reads, disallowed tables and columns), then times the
+validator on every query with its memo cache bypassed and checks that each
+query is classified as expected. No database is needed.
+
+    python benchmarks/bench_sql_validator.py --queries 5000
+"""
+
+import argparse
+import random
+import time
+
+import harness  # noqa: F401  (puts the repo root on sys.path)
+from harness import print_table, summarize
+
+import parkpal_app
+
+AGGREGATES = ["COUNT", "AVG", "MIN", "MAX", "SUM"]
+
+
+def safe_query(rng: random.Random) -> str:
+    table = rng.choice(["National_Park", "Lodging", "Park_Review", "User"])
+    columns = parkpal_app.PARKBOT_SCHEMA[table]
+    picked = rng.sample(columns, k=min(len(columns), rng.randint(1, 4)))
+    shape = rng.randint(0, 4)
+
+    if shape == 0:
+        return (
+            f"SELECT {', '.join(picked)} FROM {table} "
+            f"ORDER BY {picked[0]} DESC LIMIT {rng.randint(1, 100)}"
+        )
+    if shape == 1:
+        aggregate = rng.choice(AGGREGATES)
+        return (
+            f"SELECT {picked[0]}, {aggregate}({rng.choice(columns)}) AS value_{rng.randint(1, 9)} "
+            f"FROM {table} GROUP BY {picked[0]} HAVING COUNT(*) > {rng.randint(0, 5)}"
+        )
+    if shape == 2:
+        return (
+            "SELECT np.Park_Name, l.Lodging_Name, l.Price_Per_Night "
+            "FROM National_Park np JOIN Lodging l ON np.Park_ID = l.Park_ID "
+            f"WHERE l.Price_Per_Night < {rng.randint(50, 400)} "
+            f"AND np.State LIKE '%{rng.choice(['Utah', 'California', 'Wyoming'])}%' "
+            "ORDER BY l.Price_Per_Night LIMIT 100"
+        )
+    if shape == 3:
+        return (
+            "WITH ratings AS (SELECT Park_ID, AVG(Rating) AS avg_rating, COUNT(*) reviews "
+            "FROM Park_Review GROUP BY Park_ID) "
+            "SELECT np.Park_Name, r.avg_rating, r.reviews FROM National_Park np "
+            f"JOIN ratings r ON r.Park_ID = np.Park_ID WHERE r.reviews >= {rng.randint(1, 10)} "
+            "ORDER BY r.avg_rating DESC LIMIT 10;"
+        )
+    return (
+        "SELECT u.First_Name, u.Last_Name, u.Created_At, u.Updated_At, "
+        "DATEDIFF(lr.Check_Out_Date, lr.Check_In_Date) AS nights "
+        "FROM User u JOIN Lodging_Reservation lr ON lr.User_ID = u.User_ID "
+        f"WHERE lr.Reservation_Status = 'confirmed' AND lr.Total_Cost > {rng.randint(100, 2000)}"
+    )
+
+
+def unsafe_query(rng: random.Random) -> str:
+    base = safe_query(rng).rstrip(";")
+    attack = rng.randint(0, 9)
+    if attack == 0:
+        return f"{base}; DROP TABLE User"
+    if attack == 1:
+        return f"SELECT * FROM Lodging INTO OUTFILE '/tmp/out{rng.randint(1, 99)}.csv'"
+    if attack == 2:
+        return f"SELECT Park_Name, SLEEP({rng.randint(1, 60)}) FROM National_Park"
+    if attack == 3:
+        return f"SELECT BENCHMARK({rng.randint(10**6, 10**8)}, MD5('parkpal'))"
+    if attack == 4:
+        return f"{base} FOR UPDATE"
+    if attack == 5:
+        return "SELECT Email, Password_Hash FROM User"
+    if attack == 6:
+        return "SELECT table_name FROM information_schema.tables"
+    if attack == 7:
+        return rng.choice(
+            [
+                "SELECT * FROM User",
+                "SELECT u.* FROM User u",
+                "WITH t AS (SELECT * FROM User) SELECT Email FROM t",
+            ]
+        )
+    if attack == 8:
+        return "SELECT x.Password_Hash FROM (SELECT User_ID, Email FROM User) x"
+    return f"UPDATE Lodging SET Price_Per_Night = {rng.randint(1, 9)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=12)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [(safe_query(rng), True) for _ in range(args.queries // 2)]
+    corpus += [(unsafe_query(rng), False) for _ in range(args.queries - len(corpus))]
+    rng.shuffle(corpus)
+
+    validate = parkpal_app.check_sql_safety.__wrapped__  # bypass the memo cache
+    latencies = []
+    false_rejects = []
+    missed = []
+    for query, expected_safe in corpus:
+        started = time.perf_counter()
+        reason = validate(query)
+        latencies.append(time.perf_counter() - started)
+        if expected_safe and reason:
+            false_rejects.append((query, reason))
+        elif not expected_safe and not reason:
+            missed.append(query)
+
+    elapsed = sum(latencies)
+    print(
+        f"{len(corpus):,} queries validated in {elapsed * 1000:.1f} ms "
+        f"({len(corpus) / elapsed:,.0f} queries/s)"
+    )
+    print_table([{"validator": "check_sql_safety", **summarize(latencies)}])
+    print(f"Legitimate queries rejected: {len(false_rejects)}")
+    for query, reason in false_rejects[:5]:
+        print(f"  {reason}: {query}")
+    print(f"Unsafe queries accepted: {len(missed)}")
+    for query in missed[:5]:
+        print(f"  {query}")
+
+    if false_rejects or missed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
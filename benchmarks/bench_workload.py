@@ -0,0 +1,276 @@
+"""
+Load test driving ParkPal's page query paths with concurrent virtual users.
+
+Each virtual user is a thread (as each Streamlit session is) that repeatedly
+picks a scenario - browse parks, make a reservation, list my reservations,
+page through reviews and post one, or ask ParkBot with a stubbed model -
+calls the same parkpal_app functions the page would, then pauses for a think
+time. Reports throughput, latency per scenario and failed actions. Load a
+dataset first, e.g. with generate_data.py.
+
+    DB_HOST=127.0.0.1 DB_USER=root DB_PASSWORD=... DB_NAME=group12 \
+    DB_SSL_MODE=DISABLED DB_POOL_SIZE=20 python benchmarks/bench_workload.py \
+        --virtual-users 50 --duration 60
+
+Reservations and reviews written by the run are deleted afterwards.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+import harness  # noqa: F401  (puts the repo root on sys.path)
+from harness import print_table, summarize
+
+BENCH_EMAIL = "workload-bench@parkpal.invalid"
+BENCH_REVIEW_PREFIX = "[workload-bench]"
+
+SCENARIO_WEIGHTS = {
+    "browse": 40,
+    "reviews": 25,
+    "my_reservations": 15,
+    "reserve": 10,
+    "parkbot": 10,
+}
+
+
+class Workload:
+    """Shared state for the virtual users: IDs to pick from and rows to clean up"""
+
+    def __init__(self, parkpal_app, model_latency: float, seed: int):
+        self.app = parkpal_app
+        self.seed = seed
+        users = parkpal_app.execute_query(
+            "SELECT MIN(User_ID) AS low, MAX(User_ID) AS high FROM User", fetch="one"
+        )
+        parks = parkpal_app.get_all_parks()
+        if not users or not users["low"] or parks.empty:
+            raise SystemExit("Load a ParkPal dataset first (generate_data.py)")
+        self.user_range = (users["low"], users["high"])
+        self.park_ids = [int(p) for p in parks["Park_ID"]]
+        # Visitors browse popular parks more often
+        self.park_weights = [max(int(v or 0), 1) for v in parks["Annual_Visitors"]]
+
+        self._tempdir = tempfile.TemporaryDirectory()
+        cache_path = os.path.join(self._tempdir.name, "parkbot.sqlite3")
+        self.parkbot = parkpal_app.ParkBot(
+            parkpal_app.StubModelClient(latency=model_latency),
+            parkpal_app.ParkBotCache(cache_path),
+            history=parkpal_app.QuestionHistory(cache_path),
+        )
+
+        self.lock = threading.Lock()
+        self.reservation_ids = []
+        self.review_ids = []
+
+    def pick_user(self, rng: random.Random) -> int:
+        return rng.randint(*self.user_range)
+
+    def pick_park(self, rng: random.Random) -> int:
+        return rng.choices(self.park_ids, weights=self.park_weights)[0]
+
+    # -------------------- scenarios --------------------
+
+    def browse(self, rng: random.Random) -> bool:
+        """Browse parks: directory, one park's details and its lodging"""
+        app = self.app
+        if app.get_all_parks().empty:
+            return False
+        park_id = self.pick_park(rng)
+        return app.get_park_with_rating(park_id) is not None and (
+            app.get_lodging_by_park(park_id) is not None
+        )
+
+    def reserve(self, rng: random.Random) -> bool:
+        """Make a reservation: search availability, allocate a number, book"""
+        app = self.app
+        park_id = self.pick_park(rng)
+        check_in = date.today() + timedelta(days=rng.randint(7, 180))
+        check_out = check_in + timedelta(days=rng.randint(1, 5))
+        rooms = rng.choice([1, 1, 1, 2])
+        available = app.get_available_lodging(park_id, check_in, check_out, rooms)
+        if available.empty:
+            return True  # sold out is a valid answer, not a failure
+        lodging = available.iloc[rng.randrange(len(available))]
+        confirmation_number = app.generate_confirmation_number()
+        if not confirmation_number:
+            return False
+        reservation_id = app.create_reservation(
+            {
+                "User_ID": self.pick_user(rng),
+                "Lodging_ID": int(lodging["Lodging_ID"]),
+                "Check_In_Date": check_in,
+                "Check_Out_Date": check_out,
+                "Number_Of_Guests": rooms * 2,
+                "Number_Of_Rooms": rooms,
+                "Guest_Name": "Workload Bench",
+                "Guest_Phone": "000-000-0000",
+                "Guest_Email": BENCH_EMAIL,
+                "Confirmation_Number": confirmation_number,
+                "Reservation_Status": "confirmed",
+                "Total_Cost": float(
+                    app.calculate_total_cost(
+                        float(lodging["Price_Per_Night"]), check_in, check_out, rooms
+                    )
+                ),
+            }
+        )
+        if reservation_id:
+            with self.lock:
+                self.reservation_ids.append(reservation_id)
+        # Losing a race for the last rooms is expected under load
+        return True
+
+    def my_reservations(self, rng: random.Random) -> bool:
+        """Open My Reservations and switch through the filters"""
+        user_id = self.pick_user(rng)
+        for status in ("all", "upcoming", "past", "cancelled"):
+            if self.app.get_user_reservations(user_id, status) is None:
+                return False
+        return True
+
+    def reviews(self, rng: random.Random) -> bool:
+        """Page through a park's reviews, expand one, sometimes post one"""
+        app = self.app
+        park_id = self.pick_park(rng) if rng.random() < 0.7 else None
+        sort = rng.choice(list(app.REVIEW_SORT_ORDERS))
+        after = None
+        for _ in range(rng.randint(1, 3)):
+            page, has_more = app.get_reviews_page(park_id, sort=sort, after=after)
+            if page.empty or not has_more:
+                break
+            # Same seek key as reviews_page
+            last = page.iloc[-1]
+            if sort == "recent":
+                after = (last["Review_Date"].to_pydatetime(), int(last["Review_ID"]))
+            else:
+                after = (int(last["Rating"]), int(last["Review_ID"]))
+            app.get_review_text(int(rng.choice(list(page["Review_ID"]))))
+
+        if rng.random() < 0.1:
+            user_id, park_id = self.pick_user(rng), self.pick_park(rng)
+            review_id = app.execute_insert(
+                """
+                INSERT INTO Park_Review (User_ID, Park_ID, Rating, Review_Text, Visit_Date)
+                VALUES (%s, %s, %s, %s, %s)
+                """,
+                (
+                    user_id,
+                    park_id,
+                    rng.randint(1, 5),
+                    f"{BENCH_REVIEW_PREFIX} Synthetic review from the workload benchmark.",
+                    date.today() - timedelta(days=rng.randint(1, 365)),
+                ),
+                invalidates=app.review_tags(None, user_id, park_id),
+            )
+            if not review_id:
+                return False
+            with self.lock:
+                self.review_ids.append((review_id, user_id, park_id))
+        return True
+
+    def parkbot(self, rng: random.Random) -> bool:
+        """Ask ParkBot an example question and run the generated SQL"""
+        app = self.app
+        question = rng.choice(app.PARKBOT_EXAMPLE_QUESTIONS)
+        generated_sql = self.parkbot.generate_sql(question)
+        if app.check_sql_safety(generated_sql):
+            return False
+        explanation = self.parkbot.start_explanation(question, generated_sql)
+        guarded = app.execute_guarded_query(generated_sql)
+        "".join(explanation)
+        return guarded is not None
+
+    # -------------------- driver --------------------
+
+    def virtual_user(self, index: int, deadline: float, think_time: float, results: list):
+        rng = random.Random(f"{self.seed}:{index}")
+        names = list(SCENARIO_WEIGHTS)
+        weights = list(SCENARIO_WEIGHTS.values())
+        while time.perf_counter() < deadline:
+            scenario = rng.choices(names, weights=weights)[0]
+            started = time.perf_counter()
+            try:
+                ok = getattr(self, scenario)(rng)
+            except Exception:
+                ok = False
+            results.append((scenario, time.perf_counter() - started, ok))
+            if think_time:
+                time.sleep(rng.expovariate(1 / think_time))
+
+    def cleanup(self) -> int:
+        app = self.app
+        for reservation_id in self.reservation_ids:
+            app.delete_reservation(reservation_id)
+        for review_id, user_id, park_id in self.review_ids:
+            app.execute_delete(
+                "DELETE FROM Park_Review WHERE Review_ID = %s",
+                (review_id,),
+                invalidates=app.review_tags(review_id, user_id, park_id),
+            )
+        self._tempdir.cleanup()
+        return len(self.reservation_ids) + len(self.review_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--virtual-users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument(
+        "--think-time", type=float, default=0.5, help="mean pause between actions (s)"
+    )
+    parser.add_argument(
+        "--model-latency", type=float, default=0.3, help="stub model seconds per call"
+    )
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    import parkpal_app
+
+    workload = Workload(parkpal_app, args.model_latency, args.seed)
+    results = []
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(
+            target=workload.virtual_user,
+            args=(i, deadline, args.think_time, results),
+            name=f"virtual-user-{i}",
+        )
+        for i in range(args.virtual_users)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    removed = workload.cleanup()
+
+    print(
+        f"{len(results):,} actions from {args.virtual_users} virtual users in "
+        f"{elapsed:.1f}s ({len(results) / elapsed:,.1f} actions/s); "
+        f"{removed:,} written rows cleaned up"
+    )
+    rows = []
+    for scenario in SCENARIO_WEIGHTS:
+        latencies = [t for name, t, _ in results if name == scenario]
+        failed = sum(1 for name, _, ok in results if name == scenario and not ok)
+        rows.append({"scenario": scenario, **summarize(latencies), "failed": failed})
+    rows.append(
+        {
+            "scenario": "all",
+            **summarize([t for _, t, _ in results]),
+            "failed": sum(1 for *_, ok in results if not ok),
+        }
+    )
+    print_table(rows)
+    print(f"Connection pool: {parkpal_app.get_connection_pool().stats()}")
+    print(f"Query cache: {parkpal_app.get_query_cache().stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Shared helpers for the ParkPal benchmark scripts.
+
+Benchmarks talk to a local MySQL configured through the same DB_* settings
+as the app (use DB_SSL_MODE=DISABLED for a local server).
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+# Make parkpal_app importable when a benchmark is run as a script
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Return the pct-th percentile (0-100) of values using nearest rank"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies: Sequence[float]) -> Dict[str, float]:
+    """Summarize latencies given in seconds as milliseconds"""
+    return {
+        "runs": len(latencies),
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def time_calls(func: Callable[[], object], runs: int) -> List[float]:
+    """Call func ``runs`` times and return each call's latency in seconds"""
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def print_table(rows: List[Dict[str, object]]) -> None:
+    """Print a list of result dicts as an aligned text table"""
+    if not rows:
+        return
+    columns = list(rows[0].keys())
+    cells = [
+        [f"{row[c]:.3f}" if isinstance(row[c], float) else str(row[c]) for c in columns]
+        for row in rows
+    ]
+    widths = [
+        max(len(column), *(len(line[i]) for line in cells))
+        for i, column in enumerate(columns)
+    ]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    print("  ".join("-" * width for width in widths))
+    for line in cells:
+        print("  ".join(cell.ljust(width) for cell, width in zip(line, widths)))
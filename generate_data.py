@@ -0,0 +1,658 @@
+"""
+ParkPal synthetic data generator.
+
+Generates a deterministic, seeded dataset for the whole ParkPal schema at a
+configurable scale and writes it to MySQL (through load_data.BulkLoader) or
+to a SQLite stand-in file for offline analysis:
+
+    python generate_data.py --scale 1 --truncate              # MySQL
+    python generate_data.py --scale 10 --target sqlite --sqlite-path big.sqlite3
+
+Scale 1 is 63 parks, 630 lodgings, 10,000 users, 100,000 reservations and
+500,000 reviews; everything but the parks grows linearly with the scale.
+Park popularity follows Annual_Visitors, check-in and visit dates follow each
+region's season, and ratings mix 1-5 stars around a per-park quality. The
+same seed, scale and anchor date always produce the same rows.
+"""
+
+import argparse
+import math
+import random
+import sqlite3
+import sys
+import time
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from itertools import accumulate, islice
+from typing import Any, Dict, Iterator, List
+
+from mysql.connector import Error
+
+ROWS_PER_SCALE = {
+    "National_Park": 63,
+    "Lodging": 630,
+    "User": 10_000,
+    "Lodging_Reservation": 100_000,
+    "Park_Review": 500_000,
+}
+
+# Parents before children, so foreign keys resolve as rows arrive
+LOAD_ORDER = ["National_Park", "User", "Lodging", "Park_Review", "Lodging_Reservation"]
+
+# Relative check-in / visit weight for each month, January first
+REGION_SEASONS = {
+    "Alaska": [0, 0, 1, 2, 6, 20, 26, 22, 10, 2, 0, 0],
+    "Southwest": [5, 7, 12, 14, 11, 6, 5, 5, 9, 13, 8, 5],
+    "Southeast": [6, 6, 10, 11, 10, 10, 10, 9, 8, 10, 6, 4],
+    "Pacific Islands": [9, 8, 8, 8, 8, 9, 10, 10, 8, 7, 7, 8],
+}
+DEFAULT_SEASON = [2, 2, 4, 6, 10, 16, 20, 18, 11, 6, 3, 2]
+
+REGION_STATES = {
+    "Alaska": ["Alaska"],
+    "Southwest": ["Arizona", "Utah", "New Mexico", "Nevada", "Texas"],
+    "Southeast": ["Florida", "Tennessee", "South Carolina", "Kentucky", "Arkansas"],
+    "Pacific Islands": ["Hawaii", "American Samoa"],
+    "West Coast": ["California", "Oregon", "Washington"],
+    "Rocky Mountains": ["Colorado", "Wyoming", "Montana", "Idaho"],
+    "Midwest": ["Michigan", "Minnesota", "Ohio", "Indiana", "South Dakota", "North Dakota"],
+    "Northeast": ["Maine", "West Virginia", "Virginia"],
+}
+REGION_WEIGHTS = {
+    "Alaska": 8,
+    "Southwest": 14,
+    "Southeast": 8,
+    "Pacific Islands": 3,
+    "West Coast": 11,
+    "Rocky Mountains": 8,
+    "Midwest": 8,
+    "Northeast": 3,
+}
+# Rough latitude / longitude box per region
+REGION_BOUNDS = {
+    "Alaska": ((58.0, 68.0), (-155.0, -141.0)),
+    "Southwest": ((29.0, 40.5), (-114.5, -103.0)),
+    "Southeast": ((25.0, 37.0), (-93.0, -80.0)),
+    "Pacific Islands": ((19.0, 21.0), (-157.0, -155.0)),
+    "West Coast": ((34.0, 48.5), (-124.0, -117.0)),
+    "Rocky Mountains": ((37.0, 48.5), (-114.0, -104.5)),
+    "Midwest": ((39.0, 48.5), (-104.0, -81.0)),
+    "Northeast": ((37.0, 45.5), (-81.0, -67.5)),
+}
+
+NAME_FIRST = [
+    "Granite", "Cedar", "Silver", "Red Rock", "Eagle", "Bear", "Thunder", "Crystal",
+    "Painted", "Hidden", "Lost", "Emerald", "Shadow", "Golden", "Misty", "Bison",
+]
+NAME_SECOND = [
+    "Canyon", "Peaks", "Lakes", "Falls", "Ridge", "Valley", "Mesa", "Glacier",
+    "Dunes", "Hollow", "Springs", "Basin",
+]
+WILDLIFE = [
+    "black bears", "grizzly bears", "elk", "moose", "bison", "mule deer", "bighorn sheep",
+    "mountain goats", "wolves", "coyotes", "bald eagles", "peregrine falcons", "river otters",
+    "alligators", "manatees", "sea turtles", "desert tortoises", "roadrunners", "pikas",
+    "marmots", "caribou", "humpback whales", "harbor seals", "prairie dogs",
+]
+PLANTS = [
+    "ponderosa pine", "giant sequoia", "quaking aspen", "saguaro cactus", "Joshua trees",
+    "sagebrush", "wildflower meadows", "mangroves", "sawgrass", "red spruce", "Douglas fir",
+    "bristlecone pine", "desert marigold", "ferns and mosses", "alpine tundra",
+]
+ACTIVITIES = [
+    "hiking", "backpacking", "camping", "fishing", "kayaking", "rafting", "rock climbing",
+    "stargazing", "wildlife viewing", "ranger-led programs", "scenic drives", "snowshoeing",
+    "cross-country skiing", "horseback riding", "photography", "boat tours", "tide pooling",
+]
+TRAIL_NOUNS = ["Loop", "Trail", "Overlook", "Rim Trail", "Lake Trail", "Falls Trail", "Summit"]
+LANDSCAPES = [
+    "sandstone arches", "glacier-carved valleys", "towering waterfalls", "geothermal basins",
+    "sand dunes", "old-growth forest", "coral reefs", "volcanic craters", "deep canyons",
+    "alpine lakes", "limestone caves", "coastal cliffs", "river gorges", "badlands",
+]
+DIFFICULTIES = ["Easy", "Easy to Moderate", "Moderate", "Moderate to Difficult", "Moderate to Strenuous"]
+BEST_TIMES = {
+    "Alaska": "Summer (June-August)",
+    "Southwest": "Spring and Fall",
+    "Southeast": "Winter and Spring",
+    "Pacific Islands": "Year-round",
+}
+
+LODGING_TYPES = ["Lodge", "Hotel", "Campground", "Cabin", "Motel", "RV Park"]
+LODGING_TYPE_WEIGHTS = [25, 20, 25, 12, 10, 8]
+LODGING_PRICES = {
+    "Lodge": (150, 450),
+    "Hotel": (110, 380),
+    "Campground": (20, 60),
+    "Cabin": (90, 260),
+    "Motel": (70, 160),
+    "RV Park": (35, 90),
+}
+AMENITIES = [
+    "WiFi", "Restaurant", "Parking", "Pet friendly", "Hot tub", "Laundry", "Fire pits",
+    "Showers", "Electric hookups", "Air conditioning", "Gift shop", "Shuttle to park",
+]
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David",
+    "Elizabeth", "William", "Barbara", "Maria", "Wei", "Aisha", "Carlos", "Priya", "Kenji",
+    "Fatima", "Diego", "Olga", "Samuel", "Grace", "Noah", "Emma", "Liam", "Ava", "Mateo",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez",
+    "Martinez", "Hernandez", "Lopez", "Nguyen", "Kim", "Patel", "Chen", "Singh", "Okafor",
+    "Andersen", "Rossi", "Kowalski", "Yamamoto", "Cohen", "Murphy", "Silva", "Haddad",
+]
+
+# Share of reviews with 1..5 stars for an average park
+RATING_MIX = [0.04, 0.06, 0.15, 0.35, 0.40]
+REVIEW_OPENERS = {
+    1: ["Very disappointing visit.", "Would not recommend.", "Not worth the trip."],
+    2: ["Below expectations.", "Some nice views but a frustrating visit.", "Just okay at best."],
+    3: ["A decent park.", "Mixed feelings about this one.", "Good but not great."],
+    4: ["Really enjoyed our visit!", "A beautiful park.", "Great trip overall."],
+    5: ["Absolutely breathtaking!", "One of the best parks we have visited!", "Unforgettable!"],
+}
+REVIEW_DETAILS = {
+    "low": [
+        "The crowds made it hard to enjoy the trails.",
+        "Parking was impossible and the shuttle lines were long.",
+        "Many trails were closed during our stay.",
+        "The facilities were dirty and poorly maintained.",
+    ],
+    "high": [
+        "The rangers were friendly and very helpful.",
+        "Sunrise from the overlook was worth the early alarm.",
+        "The scenery changed around every bend of the trail.",
+        "Campsites were clean and well spaced.",
+    ],
+}
+
+RESERVATION_STATUS_WEIGHTS = {"confirmed": 80, "pending": 8, "cancelled": 12}
+
+
+def _weighted_choice(rng: random.Random, cum_weights: List[float]) -> int:
+    """Return an index drawn with the given cumulative weights"""
+    return bisect_left(cum_weights, rng.random() * cum_weights[-1])
+
+
+def offset_point(lat: float, lon: float, miles: float, bearing: float) -> tuple:
+    """The point ``miles`` from (lat, lon) along ``bearing`` degrees, rounded like the DDL"""
+    radius = 3958.8
+    lat1, lon1, theta = math.radians(lat), math.radians(lon), math.radians(bearing)
+    angle = miles / radius
+    lat2 = math.asin(
+        math.sin(lat1) * math.cos(angle) + math.cos(lat1) * math.sin(angle) * math.cos(theta)
+    )
+    lon2 = lon1 + math.atan2(
+        math.sin(theta) * math.sin(angle) * math.cos(lat1),
+        math.cos(angle) - math.sin(lat1) * math.sin(lat2),
+    )
+    return round(math.degrees(lat2), 6), round((math.degrees(lon2) + 540) % 360 - 180, 6)
+
+
+class SyntheticData:
+    """Deterministic row generators for every ParkPal table.
+
+    Each table draws from its own random stream derived from ``seed``, so the
+    rows of one table do not depend on which other tables were generated.
+    Dates are placed around ``anchor`` (today by default): reservations from
+    a year before it to six months after, visits and reviews before it.
+    """
+
+    def __init__(self, scale: float = 1.0, seed: int = 7, anchor: date = None):
+        self.scale = scale
+        self.seed = seed
+        self.anchor = anchor or date.today()
+        self.counts = {
+            table: rows if table == "National_Park" else max(1, round(rows * scale))
+            for table, rows in ROWS_PER_SCALE.items()
+        }
+        self._parks = self._generate_parks()
+        self._lodging = self._generate_lodging()
+
+        # Popularity: parks are picked in proportion to Annual_Visitors
+        self.park_cum_weights = list(accumulate(p["Annual_Visitors"] for p in self._parks))
+        self.lodging_by_park: Dict[int, List[Dict]] = {}
+        for lodging in self._lodging:
+            self.lodging_by_park.setdefault(lodging["Park_ID"], []).append(lodging)
+
+    def _rng(self, table: str) -> random.Random:
+        return random.Random(f"{self.seed}:{table}")
+
+    # -------------------- parks and lodging --------------------
+
+    def _generate_parks(self) -> List[Dict[str, Any]]:
+        rng = self._rng("National_Park")
+        regions = list(REGION_WEIGHTS)
+        region_cum = list(accumulate(REGION_WEIGHTS.values()))
+        names = rng.sample(
+            [f"{a} {b}" for a in NAME_FIRST for b in NAME_SECOND], self.counts["National_Park"]
+        )
+        parks = []
+        for park_id, name in enumerate(names, start=1):
+            region = regions[_weighted_choice(rng, region_cum)]
+            (lat_lo, lat_hi), (lon_lo, lon_hi) = REGION_BOUNDS[region]
+            wildlife = rng.sample(WILDLIFE, 5)
+            activities = rng.sample(ACTIVITIES, 5)
+            landscapes = rng.sample(LANDSCAPES, 2)
+            parks.append(
+                {
+                    "Park_ID": park_id,
+                    "Park_Name": name,
+                    "State": rng.choice(REGION_STATES[region]),
+                    "Region": region,
+                    "Description": (
+                        f"{name} protects {landscapes[0]} and {landscapes[1]}, home to "
+                        f"{wildlife[0]} and {wildlife[1]}. Visitors come for "
+                        f"{activities[0]}, {activities[1]} and {activities[2]}."
+                    ),
+                    "Wildlife_Information": ", ".join(w.capitalize() for w in wildlife),
+                    "Plant_Information": ", ".join(p.capitalize() for p in rng.sample(PLANTS, 4)),
+                    "Area_Square_Miles": round(math.exp(rng.gauss(6.3, 1.3)), 2),
+                    # Log-normal, like the real parks: a few get millions of
+                    # visitors and the long tail gets tens of thousands
+                    "Annual_Visitors": int(min(15_000_000, max(5_000, math.exp(rng.gauss(13.3, 1.4))))),
+                    "Best_Time_To_Visit": BEST_TIMES.get(region, "Late Spring to Early Fall"),
+                    "Entry_Fee": rng.choice([0, 0, 15, 20, 25, 30, 35]),
+                    "Free_Entry_Days": "MLK Day, Presidents Day, National Park Week, Veterans Day",
+                    "Official_Website": f"https://www.nps.example/{name.lower().replace(' ', '-')}",
+                    "Latitude": round(rng.uniform(lat_lo, lat_hi), 6),
+                    "Longitude": round(rng.uniform(lon_lo, lon_hi), 6),
+                    "Park_Activities_Events": ", ".join(a.capitalize() for a in activities),
+                    "Popular_Park_Trails": ", ".join(
+                        f"{rng.choice(NAME_FIRST)} {rng.choice(TRAIL_NOUNS)}" for _ in range(3)
+                    ),
+                    "Difficulty_Rating": rng.choice(DIFFICULTIES),
+                    "Kid_Friendliness_Rating": rng.randint(1, 5),
+                    "Pet_Friendliness_Rating": rng.randint(1, 5),
+                }
+            )
+        return parks
+
+    def _generate_lodging(self) -> List[Dict[str, Any]]:
+        """Spread lodgings over parks in proportion to popularity, at least one each"""
+        rng = self._rng("Lodging")
+        total_visitors = sum(p["Annual_Visitors"] for p in self._parks)
+        type_cum = list(accumulate(LODGING_TYPE_WEIGHTS))
+        lodging = []
+        for park in self._parks:
+            share = park["Annual_Visitors"] / total_visitors
+            for _ in range(max(1, round(self.counts["Lodging"] * share))):
+                lodging_type = LODGING_TYPES[_weighted_choice(rng, type_cum)]
+                low, high = LODGING_PRICES[lodging_type]
+                lodging_id = len(lodging) + 1
+                name_word = park["Park_Name"].split()[0]
+                row = {
+                    "Lodging_ID": lodging_id,
+                    "Park_ID": park["Park_ID"],
+                    "Lodging_Name": f"{name_word} {rng.choice(NAME_SECOND)} {lodging_type} #{lodging_id}",
+                    "Lodging_Type": lodging_type,
+                    "Address": f"{rng.randint(1, 9999)} {rng.choice(NAME_FIRST)} Rd",
+                    "City": f"{rng.choice(NAME_FIRST)} {rng.choice(['Springs', 'City', 'Junction', 'Village'])}",
+                    "State": park["State"],
+                    "Zip_Code": f"{rng.randint(10000, 99999)}",
+                    "Description": f"{lodging_type} near {park['Park_Name']} with easy access to {rng.choice(ACTIVITIES)}.",
+                    "Amenities": ", ".join(rng.sample(AMENITIES, rng.randint(2, 6))),
+                    "Price_Per_Night": round(rng.uniform(low, high), 2),
+                    "Contact_Phone": f"{rng.randint(200, 999)}-555-{rng.randint(0, 9999):04d}",
+                    "Contact_Email": f"stay{lodging_id}@lodging.example",
+                    "Distance_From_Park_Miles": round(rng.expovariate(1 / 8), 1),
+                    "Star_Rating": round(rng.uniform(2.5, 5.0) * 2) / 2,
+                    "Total_Rooms": rng.randint(4, 40) if lodging_type in ("Campground", "RV Park", "Cabin") else rng.randint(20, 200),
+                }
+                # Placed Distance_From_Park_Miles from the park in a random direction
+                row["Latitude"], row["Longitude"] = offset_point(
+                    park["Latitude"],
+                    park["Longitude"],
+                    row["Distance_From_Park_Miles"],
+                    rng.uniform(0, 360),
+                )
+                lodging.append(row)
+        self.counts["Lodging"] = len(lodging)
+        return lodging
+
+    def parks(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._parks)
+
+    def lodging(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._lodging)
+
+    # -------------------- users, reviews, reservations --------------------
+
+    def users(self) -> Iterator[Dict[str, Any]]:
+        rng = self._rng("User")
+        for user_id in range(1, self.counts["User"] + 1):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            signed_up = datetime.combine(self.anchor, datetime.min.time()) - timedelta(
+                seconds=rng.randint(86_400, 4 * 365 * 86_400)
+            )
+            yield {
+                "User_ID": user_id,
+                "Email": f"{first.lower()}.{last.lower()}.{user_id}@example.test",
+                "Password_Hash": f"synthetic${rng.getrandbits(64):016x}",
+                "First_Name": first,
+                "Last_Name": last,
+                "Phone_Number": f"{rng.randint(200, 999)}-555-{rng.randint(0, 9999):04d}",
+                "Created_At": signed_up,
+                "Updated_At": signed_up,
+            }
+
+    def _pick_park(self, rng: random.Random) -> Dict[str, Any]:
+        return self._parks[_weighted_choice(rng, self.park_cum_weights)]
+
+    def _seasonal_date(self, rng: random.Random, region: str, first: date, last: date) -> date:
+        """Draw a date in [first, last] weighted by the region's season"""
+        season = REGION_SEASONS.get(region, DEFAULT_SEASON)
+        while True:
+            day = first + timedelta(days=rng.randint(0, (last - first).days))
+            if rng.random() * max(season) < season[day.month - 1]:
+                return day
+
+    def reviews(self) -> Iterator[Dict[str, Any]]:
+        rng = self._rng("Park_Review")
+        # Each park's quality shifts its rating mix up or down
+        quality = {p["Park_ID"]: rng.gauss(0, 0.25) for p in self._parks}
+        first_visit = self.anchor - timedelta(days=3 * 365)
+        last_visit = self.anchor - timedelta(days=1)
+        for review_id in range(1, self.counts["Park_Review"] + 1):
+            park = self._pick_park(rng)
+            weights = [
+                share * math.exp(quality[park["Park_ID"]] * (stars - 3))
+                for stars, share in enumerate(RATING_MIX, start=1)
+            ]
+            rating = _weighted_choice(rng, list(accumulate(weights))) + 1
+            visit = self._seasonal_date(rng, park["Region"], first_visit, last_visit)
+            written = visit + timedelta(days=min(int(rng.expovariate(1 / 10)), 120))
+            details = REVIEW_DETAILS["high" if rating >= 3 else "low"]
+            yield {
+                "Review_ID": review_id,
+                "User_ID": rng.randint(1, self.counts["User"]),
+                "Park_ID": park["Park_ID"],
+                "Rating": rating,
+                "Review_Text": " ".join(
+                    [rng.choice(REVIEW_OPENERS[rating])]
+                    + rng.sample(details, rng.randint(1, 3))
+                    + [f"We saw {rng.choice(WILDLIFE)} near the {rng.choice(TRAIL_NOUNS).lower()}."]
+                ),
+                "Visit_Date": visit,
+                "Review_Date": datetime.combine(
+                    min(written, self.anchor), datetime.min.time()
+                ) + timedelta(seconds=rng.randint(0, 86_399)),
+                "Photo_URLs": None,
+            }
+
+    def reservations(self) -> Iterator[Dict[str, Any]]:
+        """Yield reservations that never book a lodging past its Total_Rooms.
+
+        A stay that would overbook every lodging tried at its park is
+        recorded as cancelled, which holds no rooms.
+        """
+        rng = self._rng("Lodging_Reservation")
+        status_names = list(RESERVATION_STATUS_WEIGHTS)
+        status_cum = list(accumulate(RESERVATION_STATUS_WEIGHTS.values()))
+        first_stay = self.anchor - timedelta(days=365)
+        last_stay = self.anchor + timedelta(days=180)
+        booked: Dict[tuple, int] = {}
+
+        for reservation_id in range(1, self.counts["Lodging_Reservation"] + 1):
+            park = self._pick_park(rng)
+            options = self.lodging_by_park[park["Park_ID"]]
+            check_in = self._seasonal_date(rng, park["Region"], first_stay, last_stay)
+            nights = min(1 + int(rng.expovariate(1 / 2)), 14)
+            check_out = check_in + timedelta(days=nights)
+            guests = rng.choice([1, 2, 2, 2, 3, 4, 4, 5, 6])
+            rooms = 1 if guests <= 4 or rng.random() < 0.5 else 2
+            status = status_names[_weighted_choice(rng, status_cum)]
+
+            lodging = rng.choice(options)
+            if status != "cancelled":
+                stay_dates = [check_in + timedelta(days=n) for n in range(nights)]
+                for candidate in rng.sample(options, min(len(options), 3)):
+                    if all(
+                        booked.get((candidate["Lodging_ID"], d), 0) + rooms <= candidate["Total_Rooms"]
+                        for d in stay_dates
+                    ):
+                        lodging = candidate
+                        for d in stay_dates:
+                            key = (lodging["Lodging_ID"], d)
+                            booked[key] = booked.get(key, 0) + rooms
+                        break
+                else:
+                    status = "cancelled"
+
+            user_id = rng.randint(1, self.counts["User"])
+            created = check_in - timedelta(days=rng.randint(1, 120))
+            yield {
+                "Reservation_ID": reservation_id,
+                "User_ID": user_id,
+                "Lodging_ID": lodging["Lodging_ID"],
+                "Check_In_Date": check_in,
+                "Check_Out_Date": check_out,
+                "Number_Of_Guests": guests,
+                "Number_Of_Rooms": rooms,
+                "Guest_Name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                "Guest_Phone": f"{rng.randint(200, 999)}-555-{rng.randint(0, 9999):04d}",
+                "Guest_Email": f"guest{user_id}@example.test",
+                "Confirmation_Number": f"RES-{created:%Y%m%d}-{reservation_id:06d}",
+                "Reservation_Status": status,
+                "Total_Cost": round(lodging["Price_Per_Night"] * nights * rooms, 2),
+                "Created_At": datetime.combine(created, datetime.min.time())
+                + timedelta(seconds=rng.randint(0, 86_399)),
+            }
+
+    def rows(self, table: str) -> Iterator[Dict[str, Any]]:
+        return {
+            "National_Park": self.parks,
+            "Lodging": self.lodging,
+            "User": self.users,
+            "Park_Review": self.reviews,
+            "Lodging_Reservation": self.reservations,
+        }[table]()
+
+
+def batched(rows: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+# ==================== TARGETS ====================
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS National_Park (
+    Park_ID INTEGER PRIMARY KEY, Park_Name TEXT NOT NULL UNIQUE, State TEXT NOT NULL,
+    Region TEXT, Description TEXT, Wildlife_Information TEXT, Plant_Information TEXT,
+    Area_Square_Miles REAL, Annual_Visitors INTEGER, Best_Time_To_Visit TEXT,
+    Entry_Fee REAL, Free_Entry_Days TEXT, Official_Website TEXT, Latitude REAL,
+    Longitude REAL, Park_Activities_Events TEXT, Popular_Park_Trails TEXT,
+    Difficulty_Rating TEXT, Kid_Friendliness_Rating INTEGER, Pet_Friendliness_Rating INTEGER
+);
+CREATE TABLE IF NOT EXISTS User (
+    User_ID INTEGER PRIMARY KEY, Email TEXT NOT NULL UNIQUE, Password_Hash TEXT NOT NULL,
+    First_Name TEXT NOT NULL, Last_Name TEXT NOT NULL, Phone_Number TEXT,
+    Created_At TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    Updated_At TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS Lodging (
+    Lodging_ID INTEGER PRIMARY KEY, Park_ID INTEGER NOT NULL REFERENCES National_Park,
+    Lodging_Name TEXT NOT NULL, Lodging_Type TEXT NOT NULL, Address TEXT, City TEXT,
+    State TEXT, Zip_Code TEXT, Description TEXT, Amenities TEXT,
+    Price_Per_Night REAL NOT NULL, Contact_Phone TEXT, Contact_Email TEXT,
+    Distance_From_Park_Miles REAL, Star_Rating REAL, Total_Rooms INTEGER NOT NULL DEFAULT 20,
+    Latitude REAL, Longitude REAL
+);
+CREATE TABLE IF NOT EXISTS Park_Review (
+    Review_ID INTEGER PRIMARY KEY, User_ID INTEGER NOT NULL REFERENCES User,
+    Park_ID INTEGER NOT NULL REFERENCES National_Park,
+    Rating INTEGER NOT NULL CHECK (Rating BETWEEN 1 AND 5), Review_Text TEXT NOT NULL,
+    Visit_Date TEXT NOT NULL, Review_Date TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    Photo_URLs TEXT
+);
+CREATE TABLE IF NOT EXISTS Lodging_Reservation (
+    Reservation_ID INTEGER PRIMARY KEY, User_ID INTEGER NOT NULL REFERENCES User,
+    Lodging_ID INTEGER NOT NULL REFERENCES Lodging, Check_In_Date TEXT NOT NULL,
+    Check_Out_Date TEXT NOT NULL, Number_Of_Guests INTEGER NOT NULL,
+    Number_Of_Rooms INTEGER NOT NULL, Guest_Name TEXT NOT NULL, Guest_Phone TEXT NOT NULL,
+    Guest_Email TEXT NOT NULL, Confirmation_Number TEXT NOT NULL UNIQUE,
+    Reservation_Status TEXT NOT NULL, Total_Cost REAL NOT NULL,
+    Created_At TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_lodging_park_id ON Lodging (Park_ID);
+CREATE INDEX IF NOT EXISTS idx_review_park_id ON Park_Review (Park_ID);
+CREATE INDEX IF NOT EXISTS idx_review_user_id ON Park_Review (User_ID);
+CREATE INDEX IF NOT EXISTS idx_review_date ON Park_Review (Review_Date);
+CREATE INDEX IF NOT EXISTS idx_reservation_user_id ON Lodging_Reservation (User_ID);
+CREATE INDEX IF NOT EXISTS idx_reservation_lodging_id ON Lodging_Reservation (Lodging_ID);
+"""
+
+
+class SQLiteTarget:
+    """Write the dataset to a SQLite file with the ParkPal tables and columns"""
+
+    def __init__(self, path: str, truncate: bool = False):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("PRAGMA journal_mode = WAL; PRAGMA synchronous = OFF;")
+        self.connection.executescript(SQLITE_SCHEMA)
+        if truncate:
+            with self.connection:
+                for table in reversed(LOAD_ORDER):
+                    self.connection.execute(f"DELETE FROM {table}")
+
+    def row_count(self, table: str) -> int:
+        return self.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def load(self, table: str, batches: Iterator[List[Dict]], progress) -> None:
+        for batch in batches:
+            columns = list(batch[0].keys())
+            with self.connection:
+                self.connection.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))})",
+                    [
+                        tuple(
+                            v.isoformat(sep=" ") if isinstance(v, datetime)
+                            else v.isoformat() if isinstance(v, date) else v
+                            for v in row.values()
+                        )
+                        for row in batch
+                    ],
+                )
+            progress(len(batch))
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class MySQLTarget:
+    """Write the dataset to the ParkPal MySQL database with load_data.BulkLoader"""
+
+    def __init__(self, method: str, truncate: bool = False):
+        import mysql.connector
+
+        import parkpal_app
+
+        self.method = method
+        self.connection = mysql.connector.connect(**parkpal_app.get_connection_params())
+        if truncate:
+            cursor = self.connection.cursor()
+            cursor.execute("SET SESSION foreign_key_checks = 0")
+            for table in LOAD_ORDER + ["Lodging_Inventory", "Park_Rating_Summary", "Change_Log"]:
+                cursor.execute(f"TRUNCATE TABLE `{table}`")
+            cursor.execute("SET SESSION foreign_key_checks = 1")
+            cursor.close()
+
+    def row_count(self, table: str) -> int:
+        cursor = self.connection.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM `{table}`")
+        count = cursor.fetchone()[0]
+        cursor.close()
+        return count
+
+    def load(self, table: str, batches: Iterator[List[Dict]], progress) -> None:
+        from load_data import BulkLoader
+
+        # Most generated stays are in the past, which the booking trigger rejects
+        loader = BulkLoader(table, self.method, fast=True, history=True)
+        for batch in batches:
+            loader.load_batch(batch)
+            progress(len(batch))
+        for problem in loader.finish():
+            print(f"\n⚠️ {problem}")
+
+    def close(self) -> None:
+        # Every generated review went through the change feed; a fresh
+        # snapshot is far cheaper for running apps than replaying them all
+        cursor = self.connection.cursor()
+        cursor.execute("TRUNCATE TABLE Change_Log")
+        cursor.close()
+        self.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument(
+        "--anchor-date",
+        type=date.fromisoformat,
+        default=date.today(),
+        help="date the generated history is placed around (today)",
+    )
+    parser.add_argument("--target", choices=["mysql", "sqlite"], default="mysql")
+    parser.add_argument("--sqlite-path", default="parkpal_synthetic.sqlite3")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument(
+        "--method", choices=["executemany", "load-data"], default="executemany"
+    )
+    parser.add_argument(
+        "--truncate", action="store_true", help="empty the ParkPal tables first"
+    )
+    args = parser.parse_args()
+
+    data = SyntheticData(args.scale, args.seed, args.anchor_date)
+    try:
+        if args.target == "sqlite":
+            target = SQLiteTarget(args.sqlite_path, args.truncate)
+        else:
+            target = MySQLTarget(args.method, args.truncate)
+        occupied = [table for table in LOAD_ORDER if target.row_count(table)]
+    except (Error, sqlite3.Error) as e:
+        sys.exit(f"❌ Could not connect to the database: {e}")
+    if occupied:
+        sys.exit(f"❌ {', '.join(occupied)} already contain rows; pass --truncate to replace them")
+
+    print(
+        f"Scale {args.scale:g}, seed {args.seed}, anchored at {data.anchor}: "
+        + ", ".join(f"{data.counts[t]:,} {t}" for t in LOAD_ORDER)
+    )
+    started = time.perf_counter()
+    total = 0
+    for table in LOAD_ORDER:
+        table_started = time.perf_counter()
+        loaded = 0
+
+        def progress(rows: int) -> None:
+            nonlocal loaded
+            loaded += rows
+            elapsed = time.perf_counter() - table_started
+            print(
+                f"\r{table}: {loaded:,} rows ({loaded / max(elapsed, 1e-9):,.0f} rows/s)",
+                end="",
+                flush=True,
+            )
+
+        try:
+            target.load(table, batched(data.rows(table), args.batch_size), progress)
+        except (Error, sqlite3.Error) as e:
+            print()
+            sys.exit(f"❌ Loading {table} failed: {e}")
+        print()
+        total += loaded
+    target.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Generated {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
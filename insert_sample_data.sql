@@ -710,6 +710,26 @@ VALUES
     DATE_SUB(CURDATE(), INTERVAL 80 DAY)
 );
 
+-- Book the sample reservations into the nightly lodging inventory
+CALL sp_rebuild_lodging_inventory();
+
+-- Recompute per-park rating summaries (the review triggers keep them
+-- current; this also repairs any drift)
+CALL sp_rebuild_park_rating_summary();
+
+-- Start new confirmation numbers after the sample reservations
+UPDATE Confirmation_Sequence
+SET
+    Next_Value = GREATEST(
+        Next_Value,
+        (
+            SELECT COALESCE(MAX(Reservation_ID), 0) + 1
+            FROM Lodging_Reservation
+        )
+    )
+WHERE
+    Sequence_Name = 'reservation';
+
 -- Verify data insertion
 SELECT 'Users inserted:' as Status, COUNT(*) as Count FROM User;
 
@@ -0,0 +1,338 @@
+"""
+ParkPal bulk data loader.
+
+Loads CSV, JSON Lines or Parquet files into the ParkPal tables in batches,
+either with multi-row INSERTs (executemany) or with LOAD DATA LOCAL INFILE,
+and reports rows per second.
+
+    python load_data.py Park_Review reviews.parquet --batch-size 20000
+    python load_data.py User users.csv --upsert
+    python load_data.py Park_Review reviews.jsonl --method load-data --fast
+
+Column names in the file must match the table's columns; columns missing
+from the file take their defaults. Uses the same DB_* settings as the app.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+import mysql.connector
+from mysql.connector import Error
+
+import parkpal_app
+
+# Tables the loader accepts, with the foreign keys to verify after a
+# --fast load (checks are off during it): column -> (parent table, column)
+LOADABLE_TABLES = {
+    "National_Park": {},
+    "User": {},
+    "Lodging": {"Park_ID": ("National_Park", "Park_ID")},
+    "Park_Review": {
+        "User_ID": ("User", "User_ID"),
+        "Park_ID": ("National_Park", "Park_ID"),
+    },
+    "Lodging_Reservation": {
+        "User_ID": ("User", "User_ID"),
+        "Lodging_ID": ("Lodging", "Lodging_ID"),
+    },
+}
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}
+
+
+# ==================== FILE READERS ====================
+
+
+def read_batches(path: Path, file_format: str, batch_size: int) -> Iterator[List[Dict]]:
+    """Yield the file's rows as lists of dicts, ``batch_size`` rows at a time"""
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        for record_batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield record_batch.to_pylist()
+        return
+
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            # Empty CSV fields load as NULL
+            rows = (
+                {column: (value if value != "" else None) for column, value in row.items()}
+                for row in csv.DictReader(f)
+            )
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+# ==================== LOADER ====================
+
+
+class BulkLoader:
+    """Load batches of rows into one table over a dedicated connection.
+
+    With ``upsert``, rows whose primary or unique key already exists update
+    the existing row instead of failing, so a file can be loaded again.
+    With ``fast``, foreign key checks (and, where no secondary unique key
+    could be violated, unique checks) are off during the load; foreign keys
+    are verified once at the end instead. With ``history``, reservations
+    whose check-in date has passed are accepted.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        method: str = "executemany",
+        upsert: bool = False,
+        fast: bool = False,
+        history: bool = False,
+    ):
+        self.table = table
+        self.method = method
+        self.upsert = upsert
+        self.fast = fast
+        self.connection = mysql.connector.connect(
+            **parkpal_app.get_connection_params(),
+            allow_local_infile=method == "load-data",
+        )
+        self.connection.autocommit = False
+        self.cursor = self.connection.cursor()
+        self.table_columns = self._table_columns()
+        self.columns: List[str] = []
+        self.rows_loaded = 0
+
+        if fast:
+            self.cursor.execute("SET SESSION foreign_key_checks = 0")
+            if not upsert and not self._has_secondary_unique_key():
+                self.cursor.execute("SET SESSION unique_checks = 0")
+        if history:
+            # Checked by trg_validate_reservation_dates
+            self.cursor.execute("SET @parkpal_loading_history = 1")
+
+    def _table_columns(self) -> List[str]:
+        self.cursor.execute(
+            """
+            SELECT COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+              AND EXTRA NOT LIKE '%%GENERATED%%'
+            ORDER BY ORDINAL_POSITION
+            """,
+            (self.table,),
+        )
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def _has_secondary_unique_key(self) -> bool:
+        self.cursor.execute(
+            """
+            SELECT COUNT(*) FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+              AND NON_UNIQUE = 0 AND INDEX_NAME <> 'PRIMARY'
+            """,
+            (self.table,),
+        )
+        return self.cursor.fetchone()[0] > 0
+
+    def set_columns(self, columns: List[str]) -> None:
+        unknown = [c for c in columns if c not in self.table_columns]
+        if unknown:
+            raise ValueError(f"{self.table} has no column(s): {', '.join(unknown)}")
+        self.columns = columns
+
+    def _upsert_clause(self, alias: str) -> str:
+        updates = ", ".join(f"`{c}` = {alias}.`{c}`" for c in self.columns)
+        return f"ON DUPLICATE KEY UPDATE {updates}"
+
+    def load_batch(self, rows: List[Dict[str, Any]]) -> None:
+        """Insert (or upsert) one batch and commit it"""
+        if not self.columns:
+            self.set_columns(list(rows[0].keys()))
+        values = [tuple(row.get(c) for c in self.columns) for row in rows]
+        if self.method == "load-data":
+            self._load_data(values)
+        else:
+            self._executemany(values)
+        self.connection.commit()
+        self.rows_loaded += len(rows)
+
+    def _executemany(self, values: List[Tuple]) -> None:
+        column_list = ", ".join(f"`{c}`" for c in self.columns)
+        placeholders = ", ".join(["%s"] * len(self.columns))
+        query = f"INSERT INTO `{self.table}` ({column_list}) VALUES ({placeholders})"
+        if self.upsert:
+            query += " AS new " + self._upsert_clause("new")
+        # mysql-connector sends an INSERT executemany as one multi-row INSERT
+        self.cursor.executemany(query, values)
+
+    def _load_data(self, values: List[Tuple]) -> None:
+        """LOAD DATA one batch from a temporary tab-separated file.
+
+        Upserts load into a temporary staging table and merge from it, as
+        LOAD DATA's own REPLACE would delete and re-insert existing rows.
+        """
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".tsv", encoding="utf-8", newline="", delete=False
+        ) as f:
+            for row in values:
+                f.write("\t".join(_tsv_field(value) for value in row) + "\n")
+        try:
+            column_list = ", ".join(f"`{c}`" for c in self.columns)
+            target = self.table
+            if self.upsert:
+                target = f"_stage_{self.table}"
+                self.cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS `{target}`")
+                self.cursor.execute(f"CREATE TEMPORARY TABLE `{target}` LIKE `{self.table}`")
+            self.cursor.execute(
+                f"""
+                LOAD DATA LOCAL INFILE %s INTO TABLE `{target}`
+                CHARACTER SET utf8mb4
+                FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+                LINES TERMINATED BY '\\n'
+                ({column_list})
+                """,
+                (f.name,),
+            )
+            if self.upsert:
+                self.cursor.execute(
+                    f"""
+                    INSERT INTO `{self.table}` ({column_list})
+                    SELECT * FROM (SELECT {column_list} FROM `{target}`) AS new
+                    {self._upsert_clause("new")}
+                    """
+                )
+        finally:
+            os.unlink(f.name)
+
+    def finish(self) -> List[str]:
+        """Restore checks, run follow-up maintenance and return any problems"""
+        problems = []
+        if self.fast:
+            self.cursor.execute("SET SESSION foreign_key_checks = 1")
+            self.cursor.execute("SET SESSION unique_checks = 1")
+            for column, (parent, parent_column) in LOADABLE_TABLES[self.table].items():
+                self.cursor.execute(
+                    f"""
+                    SELECT COUNT(*) FROM `{self.table}` c
+                    LEFT JOIN `{parent}` p ON p.`{parent_column}` = c.`{column}`
+                    WHERE c.`{column}` IS NOT NULL AND p.`{parent_column}` IS NULL
+                    """
+                )
+                orphans = self.cursor.fetchone()[0]
+                if orphans:
+                    problems.append(
+                        f"{orphans:,} {self.table} rows reference a missing {parent}.{parent_column}"
+                    )
+
+        if self.table == "Lodging_Reservation":
+            # Bookings loaded in bulk bypass the app's inventory bookkeeping
+            self.cursor.execute("CALL sp_rebuild_lodging_inventory()")
+            self.cursor.execute(
+                """
+                UPDATE Confirmation_Sequence
+                SET Next_Value = GREATEST(
+                    Next_Value,
+                    (SELECT COALESCE(MAX(Reservation_ID), 0) + 1 FROM Lodging_Reservation)
+                )
+                WHERE Sequence_Name = 'reservation'
+                """
+            )
+        self.connection.commit()
+        self.cursor.close()
+        self.connection.close()
+        return problems
+
+
+def _tsv_field(value: Any) -> str:
+    """Format a value for LOAD DATA's default escaping (\\N is NULL)"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        value = int(value)
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("table", choices=sorted(LOADABLE_TABLES))
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=sorted(set(FORMATS.values())))
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument(
+        "--method", choices=["executemany", "load-data"], default="executemany"
+    )
+    parser.add_argument(
+        "--upsert", action="store_true", help="update rows whose key already exists"
+    )
+    parser.add_argument(
+        "--fast",
+        action="store_true",
+        help="skip foreign key (and where safe unique) checks during the load",
+    )
+    parser.add_argument(
+        "--history",
+        action="store_true",
+        help="accept reservations whose check-in date has passed",
+    )
+    args = parser.parse_args()
+
+    file_format = args.format or FORMATS.get(args.path.suffix.lower())
+    if not file_format:
+        parser.error(f"cannot tell the format of {args.path}; pass --format")
+
+    try:
+        loader = BulkLoader(
+            args.table, args.method, args.upsert, args.fast, args.history
+        )
+    except Error as e:
+        sys.exit(f"❌ Could not connect to the database: {e}")
+
+    started = time.perf_counter()
+    try:
+        for batch in read_batches(args.path, file_format, args.batch_size):
+            loader.load_batch(batch)
+            elapsed = time.perf_counter() - started
+            print(
+                f"\r{loader.rows_loaded:,} rows in {elapsed:.1f}s "
+                f"({loader.rows_loaded / elapsed:,.0f} rows/s)",
+                end="",
+                flush=True,
+            )
+        problems = loader.finish()
+    except (Error, ValueError) as e:
+        print()
+        sys.exit(f"❌ Load failed after {loader.rows_loaded:,} rows: {e}")
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"\n✅ Loaded {loader.rows_loaded:,} rows into {args.table} in {elapsed:.1f}s "
+        f"({loader.rows_loaded / max(elapsed, 1e-9):,.0f} rows/s)"
+    )
+    for problem in problems:
+        print(f"⚠️ {problem}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,17 +4,46 @@ A comprehensive Streamlit app for exploring parks, booking lodging, and sharing
 """
 
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.errors import PoolError
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as pa_ipc
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, date, timedelta
+from decimal import Decimal
 import os
 from dotenv import load_dotenv
 import openai
 import re
-from typing import Optional, Dict, List, Any
+import base64
+import bisect
+import cProfile
+import functools
+import hashlib
+import heapq
+import hmac
+import inspect
+import json
+import logging
+import math
+import pstats
+import queue
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from operator import itemgetter
+from typing import Optional, Dict, List, Any, Callable, Iterable, Iterator, Set, Tuple
 
 # Load environment variables
 load_dotenv()
@@ -24,8 +53,12 @@ load_dotenv()
 def get_config(key: str, default: str = None) -> str:
     """Get configuration from Streamlit secrets or environment variables"""
     # Try Streamlit secrets first (for cloud deployment)
-    if hasattr(st, "secrets") and key in st.secrets:
-        return st.secrets[key]
+    try:
+        if hasattr(st, "secrets") and key in st.secrets:
+            return st.secrets[key]
+    except FileNotFoundError:
+        # No secrets.toml (local development, CLI scripts and benchmarks)
+        pass
     # Fall back to environment variables (for local development)
     return os.getenv(key, default)
 
@@ -92,307 +125,4981 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# ==================== DATABASE FUNCTIONS ====================
+# ==================== METRICS ====================
 
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
 
-def get_db_connection():
-    """Create and return database connection using mysql-connector-python"""
-    try:
-        # SSL configuration for DigitalOcean MySQL
-        ssl_mode = get_config("DB_SSL_MODE", "REQUIRED")
-
-        connection_params = {
-            "host": get_config("DB_HOST"),
-            "port": int(get_config("DB_PORT", "3306")),
-            "user": get_config("DB_USER"),
-            "password": get_config("DB_PASSWORD"),
-            "database": get_config("DB_NAME"),
+# Literal values, placeholders and comments are removed so that one
+# statement shape gets one fingerprint whatever its parameters
+SQL_FINGERPRINT_RULES = [
+    (re.compile(r"/\*.*?\*/|--[^\n]*|#[^\n]*", re.DOTALL), " "),
+    (re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\""), "?"),
+    (re.compile(r"%s|\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)"), "(?+)"),
+    (re.compile(r"\s+"), " "),
+]
+
+# Per-thread cost of the page rerun in progress (see MetricsRegistry.page_rerun)
+_rerun_cost = threading.local()
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint_sql(query: str) -> str:
+    """Normalize a statement: literals become ?, IN lists (?+), whitespace collapsed"""
+    for pattern, replacement in SQL_FINGERPRINT_RULES:
+        query = pattern.sub(replacement, query)
+    return query.strip().rstrip(";").strip()
+
+
+class Histogram:
+    """Latency histogram with Prometheus-style buckets"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[str]:
+        """Prometheus exposition lines for this histogram"""
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), self.buckets):
+            cumulative += count
+            lines.append(_sample(f"{name}_bucket", {**labels, "le": bound}, cumulative))
+        lines.append(_sample(f"{name}_sum", labels, round(self.sum, 6)))
+        lines.append(_sample(f"{name}_count", labels, self.count))
+        return lines
+
+
+def _sample(name: str, labels: Dict[str, Any], value: Any) -> str:
+    """One Prometheus sample line, with label values escaped"""
+    rendered = ",".join(
+        '{}="{}"'.format(key, str(label).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, label in labels.items()
+    )
+    return f"{name}{{{rendered}}} {value}" if rendered else f"{name} {value}"
+
+
+class MetricsRegistry:
+    """Process-wide timings of SQL, connections, caches, model calls and pages.
+
+    Statements are grouped by fingerprint_sql(). Observations made on a
+    thread that is running a page (inside ``page_rerun``) also add to that
+    rerun's cost, which splits each page's time into connection waits, SQL,
+    model calls and the rest (pandas and rendering). The ``slow_samples``
+    slowest individual statements are kept along with their page.
+    """
+
+    def __init__(self, slow_samples: int = 20):
+        self.slow_samples = slow_samples
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = time.time()
+            self._queries: Dict[str, Dict[str, Any]] = {}
+            self._slowest: List[Tuple[float, int, Dict[str, Any]]] = []
+            self._sequence = 0
+            self._pool_acquire: Dict[str, Histogram] = {}
+            self._cache: Dict[str, List[int]] = {}
+            self._loaders: Dict[str, Histogram] = {}
+            self._model: Dict[str, Dict[str, Any]] = {}
+            self._pages: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _add_rerun_cost(field: str, seconds: float) -> None:
+        cost = getattr(_rerun_cost, "cost", None)
+        if cost is not None:
+            cost[field] += seconds
+            if field == "sql":
+                cost["statements"] += 1
+
+    def observe_query(
+        self, query: str, seconds: float, rows: int, error: bool = False
+    ) -> None:
+        fingerprint = fingerprint_sql(query)
+        self._add_rerun_cost("sql", seconds)
+        profiled = getattr(_rerun_cost, "queries", None)
+        if profiled is not None:
+            totals = profiled.setdefault(fingerprint, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += 1
+        sample = {
+            "fingerprint": fingerprint,
+            "rows": rows,
+            "page": getattr(_rerun_cost, "page", None),
+            "at": time.time(),
         }
+        with self._lock:
+            stats = self._queries.get(fingerprint)
+            if stats is None:
+                stats = self._queries[fingerprint] = {
+                    "id": hashlib.sha1(fingerprint.encode()).hexdigest()[:12],
+                    "histogram": Histogram(),
+                    "rows": 0,
+                    "errors": 0,
+                }
+            stats["histogram"].observe(seconds)
+            stats["rows"] += rows
+            stats["errors"] += error
+
+            self._sequence += 1
+            entry = (seconds, self._sequence, sample)
+            if len(self._slowest) < self.slow_samples:
+                heapq.heappush(self._slowest, entry)
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def observe_pool_acquire(self, pool: str, seconds: float) -> None:
+        self._add_rerun_cost("acquire", seconds)
+        with self._lock:
+            self._pool_acquire.setdefault(pool, Histogram()).observe(seconds)
+
+    def observe_cache(self, loader: str, hit: bool) -> None:
+        with self._lock:
+            counts = self._cache.setdefault(loader, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def observe_loader(self, loader: str, seconds: float) -> None:
+        with self._lock:
+            self._loaders.setdefault(loader, Histogram()).observe(seconds)
+
+    def observe_model(
+        self,
+        operation: str,
+        seconds: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+    ) -> None:
+        self._add_rerun_cost("model", seconds)
+        with self._lock:
+            stats = self._model.setdefault(
+                operation,
+                {"histogram": Histogram(), "prompt_tokens": 0, "completion_tokens": 0},
+            )
+            stats["histogram"].observe(seconds)
+            stats["prompt_tokens"] += prompt_tokens or 0
+            stats["completion_tokens"] += completion_tokens or 0
+
+    @contextmanager
+    def page_rerun(self, page: str):
+        """Record the time of one rerun of ``page`` and what it was spent on"""
+        cost = {"acquire": 0.0, "sql": 0.0, "model": 0.0, "statements": 0}
+        _rerun_cost.cost, _rerun_cost.page = cost, page
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            _rerun_cost.cost = _rerun_cost.page = None
+            with self._lock:
+                stats = self._pages.get(page)
+                if stats is None:
+                    stats = self._pages[page] = {"histogram": Histogram(), **cost}
+                else:
+                    for field, value in cost.items():
+                        stats[field] += value
+                stats["histogram"].observe(seconds)
+
+    # -------------------- reports --------------------
+
+    def query_report(self) -> List[Dict[str, Any]]:
+        """Per-fingerprint statement stats, most total time first"""
+        with self._lock:
+            rows = [
+                {
+                    "SQL": fingerprint,
+                    "Calls": s["histogram"].count,
+                    "Total ms": s["histogram"].sum * 1000,
+                    "Avg ms": s["histogram"].mean * 1000,
+                    "Max ms": s["histogram"].max * 1000,
+                    "Rows": s["rows"],
+                    "Errors": s["errors"],
+                }
+                for fingerprint, s in self._queries.items()
+            ]
+        return sorted(rows, key=lambda row: row["Total ms"], reverse=True)
+
+    def slowest_queries(self) -> List[Dict[str, Any]]:
+        """The slowest individual statements, slowest first"""
+        with self._lock:
+            entries = sorted(self._slowest, reverse=True)
+        return [
+            {
+                "ms": seconds * 1000,
+                "Rows": sample["rows"],
+                "Page": sample["page"] or "(background)",
+                "At": datetime.fromtimestamp(sample["at"]).strftime("%H:%M:%S"),
+                "SQL": sample["fingerprint"],
+            }
+            for seconds, _, sample in entries
+        ]
 
-        # Only disable SSL if explicitly set to DISABLED
-        if ssl_mode == "DISABLED":
-            connection_params["ssl_disabled"] = True
-        else:
-            # Enable SSL for cloud deployment
-            connection_params["ssl_disabled"] = False
+    def page_report(self) -> List[Dict[str, Any]]:
+        """Average cost of one rerun per page, split by where the time went"""
+        rows = []
+        with self._lock:
+            for page, s in self._pages.items():
+                reruns = s["histogram"].count
+                to_ms = 1000 / reruns if reruns else 0.0
+                other = max(
+                    s["histogram"].sum - s["acquire"] - s["sql"] - s["model"], 0.0
+                )
+                rows.append(
+                    {
+                        "Page": page,
+                        "Reruns": reruns,
+                        "Avg ms": s["histogram"].sum * to_ms,
+                        "Max ms": s["histogram"].max * 1000,
+                        "Connection wait ms": s["acquire"] * to_ms,
+                        "SQL ms": s["sql"] * to_ms,
+                        "Model ms": s["model"] * to_ms,
+                        "Other ms": other * to_ms,
+                        "Statements": s["statements"] / reruns if reruns else 0.0,
+                    }
+                )
+        return sorted(rows, key=lambda row: row["Avg ms"], reverse=True)
+
+    def cache_report(self) -> List[Dict[str, Any]]:
+        """Query cache hits and misses, and miss load time, per cached loader"""
+        rows = []
+        with self._lock:
+            for loader in sorted(set(self._cache) | set(self._loaders)):
+                hits, misses = self._cache.get(loader, [0, 0])
+                load = self._loaders.get(loader, Histogram())
+                rows.append(
+                    {
+                        "Loader": loader,
+                        "Hits": hits,
+                        "Misses": misses,
+                        "Hit rate": hits / (hits + misses) if hits + misses else 0.0,
+                        "Avg load ms": load.mean * 1000,
+                        "Max load ms": load.max * 1000,
+                    }
+                )
+        return rows
+
+    def pool_report(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "Pool": pool,
+                    "Checkouts": h.count,
+                    "Avg ms": h.mean * 1000,
+                    "Max ms": h.max * 1000,
+                }
+                for pool, h in self._pool_acquire.items()
+            ]
+
+    def model_report(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "Operation": operation,
+                    "Calls": s["histogram"].count,
+                    "Avg ms": s["histogram"].mean * 1000,
+                    "Max ms": s["histogram"].max * 1000,
+                    "Prompt tokens": s["prompt_tokens"],
+                    "Completion tokens": s["completion_tokens"],
+                }
+                for operation, s in self._model.items()
+            ]
+
+    def prometheus_text(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+
+        def family(name: str, kind: str, help_text: str, samples: Iterable[str]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        with self._lock:
+            queries = self._queries.items()
+            family(
+                "parkpal_query_duration_seconds",
+                "histogram",
+                "SQL statement time by query fingerprint.",
+                (
+                    line
+                    for _, s in queries
+                    for line in s["histogram"].samples(
+                        "parkpal_query_duration_seconds", {"query": s["id"]}
+                    )
+                ),
+            )
+            family(
+                "parkpal_query_rows_total",
+                "counter",
+                "Rows returned or affected by query fingerprint.",
+                (
+                    _sample("parkpal_query_rows_total", {"query": s["id"]}, s["rows"])
+                    for _, s in queries
+                ),
+            )
+            family(
+                "parkpal_query_errors_total",
+                "counter",
+                "Failed statements by query fingerprint.",
+                (
+                    _sample(
+                        "parkpal_query_errors_total", {"query": s["id"]}, s["errors"]
+                    )
+                    for _, s in queries
+                ),
+            )
+            family(
+                "parkpal_query_info",
+                "gauge",
+                "Normalized SQL of each query fingerprint.",
+                (
+                    _sample(
+                        "parkpal_query_info", {"query": s["id"], "sql": sql[:300]}, 1
+                    )
+                    for sql, s in queries
+                ),
+            )
+            family(
+                "parkpal_pool_acquire_seconds",
+                "histogram",
+                "Time to check out a pooled database connection.",
+                (
+                    line
+                    for pool, h in self._pool_acquire.items()
+                    for line in h.samples(
+                        "parkpal_pool_acquire_seconds", {"pool": pool}
+                    )
+                ),
+            )
+            family(
+                "parkpal_cache_requests_total",
+                "counter",
+                "Query cache lookups by loader and result.",
+                (
+                    _sample(
+                        "parkpal_cache_requests_total",
+                        {"loader": loader, "result": result},
+                        count,
+                    )
+                    for loader, counts in self._cache.items()
+                    for result, count in zip(("hit", "miss"), counts)
+                ),
+            )
+            family(
+                "parkpal_loader_duration_seconds",
+                "histogram",
+                "Cached loader time on a cache miss.",
+                (
+                    line
+                    for loader, h in self._loaders.items()
+                    for line in h.samples(
+                        "parkpal_loader_duration_seconds", {"loader": loader}
+                    )
+                ),
+            )
+            family(
+                "parkpal_model_request_duration_seconds",
+                "histogram",
+                "Language model call time.",
+                (
+                    line
+                    for operation, s in self._model.items()
+                    for line in s["histogram"].samples(
+                        "parkpal_model_request_duration_seconds",
+                        {"operation": operation},
+                    )
+                ),
+            )
+            family(
+                "parkpal_model_tokens_total",
+                "counter",
+                "Language model tokens used.",
+                (
+                    _sample(
+                        "parkpal_model_tokens_total",
+                        {"operation": operation, "type": kind},
+                        s[f"{kind}_tokens"],
+                    )
+                    for operation, s in self._model.items()
+                    for kind in ("prompt", "completion")
+                ),
+            )
+            family(
+                "parkpal_page_rerun_seconds",
+                "histogram",
+                "Time of one page rerun.",
+                (
+                    line
+                    for page, s in self._pages.items()
+                    for line in s["histogram"].samples(
+                        "parkpal_page_rerun_seconds", {"page": page}
+                    )
+                ),
+            )
+            for part, help_text in [
+                ("acquire", "Connection wait time spent in page reruns."),
+                ("sql", "SQL time spent in page reruns."),
+                ("model", "Language model time spent in page reruns."),
+            ]:
+                family(
+                    f"parkpal_page_{part}_seconds_total",
+                    "counter",
+                    help_text,
+                    (
+                        _sample(
+                            f"parkpal_page_{part}_seconds_total",
+                            {"page": page},
+                            round(s[part], 6),
+                        )
+                        for page, s in self._pages.items()
+                    ),
+                )
+        return "\n".join(lines) + "\n"
+
+
+@st.cache_resource
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry"""
+    return MetricsRegistry()
+
+
+@contextmanager
+def record_statement(query: str):
+    """Time one SQL statement into the metrics; set ``["rows"]`` on the yielded dict"""
+    statement = {"rows": 0}
+    started = time.perf_counter()
+    try:
+        yield statement
+    except BaseException:
+        get_metrics().observe_query(query, time.perf_counter() - started, 0, error=True)
+        raise
+    get_metrics().observe_query(query, time.perf_counter() - started, statement["rows"])
+
+
+class InstrumentedCursor:
+    """Cursor wrapper that records every execute() in the metrics.
+
+    Rows are the cursor's rowcount: affected rows for writes, fetched rows
+    for buffered SELECTs and 0 for unbuffered ones.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query: str, *args, **kwargs):
+        with record_statement(query) as statement:
+            result = self._cursor.execute(query, *args, **kwargs)
+            statement["rows"] = max(self._cursor.rowcount, 0)
+        return result
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+
+@st.cache_resource
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> None:
+    """Serve the metrics in Prometheus text format at http://host:port/metrics.
+
+    If the port is taken (another app process, or a listener left over from
+    a code reload) the app runs without the endpoint; the failure is cached
+    with the rest of this call, so it is logged once.
+    """
+    registry = get_metrics()
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        logging.getLogger(__name__).warning(
+            "Metrics endpoint not started on %s:%s: %s", host, port, e
+        )
+        return
+    threading.Thread(
+        target=server.serve_forever, name="metrics-server", daemon=True
+    ).start()
+
+
+# ==================== PROFILING ====================
+
+# Only one cProfile profiler can run per process (since Python 3.12 it also
+# sees every thread), so concurrent profiled reruns fall back to sampling
+_cprofile_lock = threading.Lock()
+_APP_FILE = os.path.abspath(__file__)
+
+
+def profile_mode(admin: bool) -> Optional[str]:
+    """The profiling mode for this rerun: "cprofile", "sample" or None.
+
+    Set for every session with PARKPAL_PROFILE, or for one session with
+    ``?profile=cprofile|sample`` (admins only once ADMIN_TOKEN is set).
+    ``admin`` is this rerun's is_admin(), which draws the token input.
+    """
+    mode = (get_config("PARKPAL_PROFILE") or "").lower()
+    if not mode and (not get_config("ADMIN_TOKEN") or admin):
+        mode = st.query_params.get("profile", "").lower()
+    return mode if mode in ("cprofile", "sample") else None
+
+
+def _frame_key(frame) -> Tuple[str, str, int]:
+    code = frame.f_code
+    return code.co_filename, code.co_name, code.co_firstlineno
+
+
+# Streamlit wraps its public functions in these to collect usage stats
+_STREAMLIT_WRAPPERS = {"wrapped_func"}
+
+
+def _is_streamlit_file(filename: str) -> bool:
+    return f"{os.sep}streamlit{os.sep}" in filename
+
+
+def _is_widget(filename: str, name: str) -> bool:
+    """Whether a frame is a public Streamlit element or command"""
+    return (
+        _is_streamlit_file(filename)
+        and f"{os.sep}runtime{os.sep}" not in filename
+        and name[0] not in "_<"
+        and name not in _STREAMLIT_WRAPPERS
+    )
+
+
+def _widget_name(stack: Tuple[Tuple[str, str, int], ...]) -> Optional[str]:
+    """``st.<name>`` for the Streamlit call the innermost app frame is in"""
+    innermost = max(i for i, key in enumerate(stack) if key[0] == _APP_FILE)
+    for filename, name, _ in stack[innermost + 1 :]:
+        if name not in _STREAMLIT_WRAPPERS or not _is_streamlit_file(filename):
+            return f"st.{name}" if _is_widget(filename, name) else None
+    return None
+
+
+class StackSampler:
+    """Samples one thread's Python stack every ``interval`` seconds.
+
+    Stacks are kept root first and start at the outermost parkpal_app
+    frame, so Streamlit's script runner does not show up in every sample.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Dict[Tuple[Tuple[str, str, int], ...], int] = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="rerun-profiler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_key(frame))
+                frame = frame.f_back
+            app_frames = [i for i, key in enumerate(stack) if key[0] == _APP_FILE]
+            if not app_frames:
+                continue
+            stack = tuple(reversed(stack[: app_frames[-1] + 1]))
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """The samples in collapsed-stack format (flamegraph.pl, speedscope)"""
+        return "".join(
+            ";".join(
+                f"{name} ({os.path.basename(filename)}:{line})"
+                for filename, name, line in stack
+            )
+            + f" {count}\n"
+            for stack, count in sorted(self.stacks.items())
+        )
+
+    def widget_seconds(self, total_seconds: float) -> Dict[str, List[float]]:
+        """Estimated time inside each Streamlit call made by app code"""
+        widgets: Dict[str, List[float]] = {}
+        for stack, count in self.stacks.items():
+            name = _widget_name(stack)
+            if name:
+                widgets.setdefault(name, [0.0, None])[0] += (
+                    total_seconds * count / self.samples
+                )
+        return widgets
+
+
+def _cprofile_widget_seconds(profiler) -> Dict[str, List[float]]:
+    """Time and calls for each Streamlit call made by app code"""
+    widgets: Dict[str, List[float]] = {}
+    for (filename, _, name), (*_, callers) in pstats.Stats(profiler).stats.items():
+        if not _is_widget(filename, name):
+            continue
+        for (caller_file, _, caller), (_, calls, _, cumulative) in callers.items():
+            if caller_file == _APP_FILE or (
+                _is_streamlit_file(caller_file) and caller in _STREAMLIT_WRAPPERS
+            ):
+                totals = widgets.setdefault(f"st.{name}", [0.0, 0])
+                totals[0] += cumulative
+                totals[1] += calls
+    return widgets
+
+
+@contextmanager
+def profile_rerun(page: str, mode: Optional[str]):
+    """Profile one page rerun and save it under PROFILE_DIR.
+
+    Yields a dict that holds, once the rerun finishes, its time, the top
+    Streamlit calls ("widgets") and queries by cumulative time and the files
+    written: ``.folded`` collapsed stacks for flame graphs and, in cprofile
+    mode, a ``.prof`` for snakeviz or ``python -m pstats``.
+    """
+    profile: Dict[str, Any] = {"page": page, "mode": mode}
+    if mode is None:
+        yield profile
+        return
 
-        connection = mysql.connector.connect(**connection_params)
+    interval = float(get_config("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+    sampler = StackSampler(threading.get_ident(), interval)
+    profiler = None
+    if mode == "cprofile" and _cprofile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+    profile["mode"] = "cprofile" if profiler else "sample"
+
+    _rerun_cost.queries = queries = {}
+    sampler.start()
+    if profiler:
+        profiler.enable()
+    started = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        seconds = time.perf_counter() - started
+        if profiler:
+            profiler.disable()
+            _cprofile_lock.release()
+        sampler.stop()
+        _rerun_cost.queries = None
+
+        widgets = (
+            _cprofile_widget_seconds(profiler)
+            if profiler
+            else sampler.widget_seconds(seconds)
+        )
+        profile["ms"] = seconds * 1000
+        profile["samples"] = sampler.samples
+        profile["widgets"] = sorted(
+            (
+                {"Widget": name, "Calls": calls, "Cumulative ms": total * 1000}
+                for name, (total, calls) in widgets.items()
+            ),
+            key=lambda row: row["Cumulative ms"],
+            reverse=True,
+        )
+        profile["queries"] = sorted(
+            (
+                {"SQL": fingerprint, "Calls": calls, "Cumulative ms": total * 1000}
+                for fingerprint, (total, calls) in queries.items()
+            ),
+            key=lambda row: row["Cumulative ms"],
+            reverse=True,
+        )
+        profile["files"] = _save_profile(page, sampler, profiler)
+
+
+def _save_profile(page: str, sampler: StackSampler, profiler) -> List[str]:
+    """Write one rerun's profile files, keeping the newest PROFILE_KEEP reruns"""
+    directory = get_config("PROFILE_DIR", ".parkpal_profiles")
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", page).strip("-").lower() or "page"
+    base = os.path.join(
+        directory, f"{datetime.now():%Y%m%d-%H%M%S-%f}-{slug}-{threading.get_ident()}"
+    )
+
+    files = [f"{base}.folded"]
+    with open(files[0], "w", encoding="utf-8") as f:
+        f.write(sampler.collapsed())
+    if profiler:
+        files.append(f"{base}.prof")
+        profiler.dump_stats(files[1])
+
+    keep = int(get_config("PROFILE_KEEP", "200"))
+    reruns = sorted({name.rsplit(".", 1)[0] for name in os.listdir(directory)})
+    for stale in reruns[:-keep] if keep > 0 else []:
+        for extension in (".folded", ".prof"):
+            path = os.path.join(directory, stale + extension)
+            if os.path.exists(path):
+                os.remove(path)
+    return files
+
+
+def show_rerun_profile(profile: Dict[str, Any]) -> None:
+    """Sidebar summary of a profiled rerun"""
+    if "ms" not in profile:
+        return
+    with st.sidebar.expander(f"⏱️ Profile: {profile['ms']:,.0f} ms", expanded=True):
+        st.caption(
+            f"{profile['mode']} · {profile['samples']:,} stack samples · "
+            + ", ".join(f"`{path}`" for path in profile["files"])
+        )
+        for title in ("widgets", "queries"):
+            rows = profile[title]
+            st.markdown(f"**Top {title}**")
+            if rows:
+                st.dataframe(
+                    pd.DataFrame(rows[:10]).round(1),
+                    use_container_width=True,
+                    hide_index=True,
+                )
+            else:
+                st.caption(f"No {title} recorded.")
+
+
+# ==================== DATABASE FUNCTIONS ====================
+
+
+def get_connection_params() -> Dict[str, Any]:
+    """Build mysql-connector connection parameters from configuration"""
+    # SSL configuration for DigitalOcean MySQL
+    ssl_mode = get_config("DB_SSL_MODE", "REQUIRED")
+
+    connection_params = {
+        "host": get_config("DB_HOST"),
+        "port": int(get_config("DB_PORT", "3306")),
+        "user": get_config("DB_USER"),
+        "password": get_config("DB_PASSWORD"),
+        "database": get_config("DB_NAME"),
+    }
+
+    # Only disable SSL if explicitly set to DISABLED
+    if ssl_mode == "DISABLED":
+        connection_params["ssl_disabled"] = True
+    else:
+        # Enable SSL for cloud deployment
+        connection_params["ssl_disabled"] = False
+
+    return connection_params
+
+
+# MySQL client errors that mean the server side of a connection has gone away
+# (server restart, wait_timeout, load balancer idle cut). A pooled connection
+# that hits one of these is discarded; read-only work is retried once.
+STALE_CONNECTION_ERRNOS = {2006, 2013, 2055}
+
+
+class ConnectionPool:
+    """Thread-safe pool of MySQL connections shared by all Streamlit sessions.
+
+    Connections are created lazily up to ``size``. Checkout blocks for at most
+    ``timeout`` seconds when every connection is in use. Idle connections are
+    pinged before reuse once they have been idle for ``ping_interval`` seconds
+    (0 pings on every checkout). Pooled connections run in autocommit mode so
+    that a reused connection never serves reads from an old snapshot;
+    multi-statement work opens its own transaction. ``init_statements`` run
+    once on every new connection (e.g. session settings). Checkout times
+    are recorded in the metrics under ``name``.
+    """
+
+    def __init__(
+        self,
+        connection_params: Dict[str, Any],
+        size: int = 5,
+        timeout: float = 10.0,
+        ping_interval: float = 30.0,
+        init_statements: Tuple[str, ...] = (),
+        name: str = "main",
+    ):
+        self.name = name
+        self.connection_params = connection_params
+        self.init_statements = init_statements
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []  # LIFO stack of (connection, last_used) tuples
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._stats = {
+            "checkouts": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts": 0,
+            "connections_created": 0,
+            "connections_discarded": 0,
+            "stale_reconnects": 0,
+        }
+
+    def _connect(self):
+        connection = mysql.connector.connect(**self.connection_params)
+        connection.autocommit = True
+        if self.init_statements:
+            cursor = connection.cursor()
+            for statement in self.init_statements:
+                cursor.execute(statement)
+            cursor.close()
+        with self._lock:
+            self._stats["connections_created"] += 1
         return connection
-    except Error as e:
-        st.error(f"❌ Database connection error: {e}")
-        return None
+
+    def _discard(self, connection) -> None:
+        with self._lock:
+            self._stats["connections_discarded"] += 1
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def _checkout(self, verify: bool = False):
+        started = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self.timeout)
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._stats["wait_seconds_total"] += waited
+            self._stats["wait_seconds_max"] = max(
+                self._stats["wait_seconds_max"], waited
+            )
+            if not acquired:
+                self._stats["timeouts"] += 1
+            else:
+                self._stats["checkouts"] += 1
+                self._in_use += 1
+        if not acquired:
+            raise PoolError(
+                f"No database connection available after {self.timeout:.1f}s "
+                f"(pool size {self.size})"
+            )
+
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    connection, last_used = self._idle.pop()
+                # Health check connections that have been idle for a while
+                if not verify and time.monotonic() - last_used < self.ping_interval:
+                    return connection
+                try:
+                    connection.ping(reconnect=False)
+                    return connection
+                except Error:
+                    self._discard(connection)
+            return self._connect()
+        except BaseException:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+            raise
+
+    def _checkin(self, connection, healthy: bool = True) -> None:
+        try:
+            if healthy and connection.is_connected():
+                if connection.in_transaction:
+                    connection.rollback()
+                with self._lock:
+                    self._idle.append((connection, time.monotonic()))
+            else:
+                self._discard(connection)
+        except Error:
+            self._discard(connection)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, verify: bool = False):
+        """Borrow a connection for the duration of a ``with`` block.
+
+        ``verify`` pings the connection first even if it was used recently.
+        """
+        started = time.perf_counter()
+        connection = self._checkout(verify)
+        get_metrics().observe_pool_acquire(self.name, time.perf_counter() - started)
+        healthy = True
+        try:
+            yield connection
+        except Error as e:
+            healthy = e.errno not in STALE_CONNECTION_ERRNOS
+            raise
+        except BaseException:
+            healthy = False
+            raise
+        finally:
+            self._checkin(connection, healthy)
+
+    def run(self, work: Callable[[Any], Any], read_only: bool = False) -> Any:
+        """Run ``work(connection)`` on a pooled connection.
+
+        Read-only work that finds its connection stale is retried once on a
+        fresh connection. Other work may already have committed when the
+        connection dropped (the pool is autocommit), so it is never run
+        twice; instead its connection is pinged before the work starts.
+        """
+        if not read_only:
+            with self.connection(verify=True) as connection:
+                return work(connection)
+        try:
+            with self.connection() as connection:
+                return work(connection)
+        except Error as e:
+            if e.errno not in STALE_CONNECTION_ERRNOS:
+                raise
+            with self._lock:
+                self._stats["stale_reconnects"] += 1
+            with self.connection() as connection:
+                return work(connection)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool usage counters for sizing the pool"""
+        with self._lock:
+            stats = dict(self._stats)
+            idle = len(self._idle)
+            in_use = self._in_use
+        checkouts = stats["checkouts"]
+        stats.update(
+            {
+                "size": self.size,
+                "idle": idle,
+                "in_use": in_use,
+                "wait_seconds_avg": (
+                    stats["wait_seconds_total"] / checkouts if checkouts else 0.0
+                ),
+            }
+        )
+        return stats
+
+
+@st.cache_resource
+def get_connection_pool() -> ConnectionPool:
+    """Return the process-wide connection pool"""
+    return ConnectionPool(
+        get_connection_params(),
+        size=int(get_config("DB_POOL_SIZE", "5")),
+        timeout=float(get_config("DB_POOL_TIMEOUT", "10")),
+        ping_interval=float(get_config("DB_POOL_PING_INTERVAL", "30")),
+    )
+
+
+@st.cache_resource
+def get_readonly_pool() -> ConnectionPool:
+    """Return the small, read-only pool used for untrusted (ParkBot) queries.
+
+    Uses DB_READONLY_USER/DB_READONLY_PASSWORD when configured (grant that
+    account SELECT only); either way every session is set to READ ONLY and
+    given a server-side statement time limit.
+    """
+    connection_params = get_connection_params()
+    if get_config("DB_READONLY_USER"):
+        connection_params["user"] = get_config("DB_READONLY_USER")
+        connection_params["password"] = get_config("DB_READONLY_PASSWORD")
+    return ConnectionPool(
+        connection_params,
+        size=int(get_config("DB_READONLY_POOL_SIZE", "2")),
+        timeout=float(get_config("DB_POOL_TIMEOUT", "10")),
+        ping_interval=float(get_config("DB_POOL_PING_INTERVAL", "30")),
+        init_statements=(
+            "SET SESSION TRANSACTION READ ONLY",
+            f"SET SESSION max_execution_time = {int(get_config('GUARDED_QUERY_TIMEOUT_MS', '5000'))}",
+        ),
+        name="readonly",
+    )
 
 
 def execute_query(
     query: str, params: tuple = None, fetch: str = "all"
 ) -> Optional[List[Dict]]:
     """Execute SELECT query and return results as list of dictionaries"""
-    connection = get_db_connection()
-    if not connection:
+
+    def work(connection):
+        cursor = connection.cursor(dictionary=True)
+        try:
+            with record_statement(query) as statement:
+                cursor.execute(query, params or ())
+
+                if fetch == "all":
+                    result = cursor.fetchall()
+                elif fetch == "one":
+                    result = cursor.fetchone()
+                    cursor.fetchall()  # Drain unread rows before reusing the connection
+                else:
+                    result = cursor.fetchmany(fetch)
+                    cursor.fetchall()
+                statement["rows"] = (
+                    len(result) if isinstance(result, list) else int(result is not None)
+                )
+            return result
+        finally:
+            cursor.close()
+
+    try:
+        return get_connection_pool().run(work, read_only=True)
+    except Error as e:
+        st.error(f"❌ Query execution error: {e}")
+        return None
+
+
+def _execute_write(query: str, params: tuple) -> int:
+    """Execute a single write statement and return its last inserted ID"""
+
+    def work(connection):
+        cursor = InstrumentedCursor(connection.cursor())
+        try:
+            cursor.execute(query, params)
+            connection.commit()
+            return cursor.lastrowid
+        finally:
+            cursor.close()
+
+    return get_connection_pool().run(work)
+
+
+def execute_insert(
+    query: str, params: tuple, invalidates: Iterable[str] = ()
+) -> Optional[int]:
+    """Execute INSERT query and return last inserted ID.
+
+    ``invalidates`` lists the query cache tags of the rows being written.
+    """
+    try:
+        last_id = _execute_write(query, params)
+        invalidate_cache(*invalidates)
+        return last_id
+    except Error as e:
+        st.error(f"❌ Insert error: {e}")
         return None
 
+
+def execute_update(query: str, params: tuple, invalidates: Iterable[str] = ()) -> bool:
+    """Execute UPDATE query and return success status"""
+    try:
+        _execute_write(query, params)
+        invalidate_cache(*invalidates)
+        return True
+    except Error as e:
+        st.error(f"❌ Update error: {e}")
+        return False
+
+
+def execute_delete(query: str, params: tuple, invalidates: Iterable[str] = ()) -> bool:
+    """Execute DELETE query and return success status"""
     try:
+        _execute_write(query, params)
+        invalidate_cache(*invalidates)
+        return True
+    except Error as e:
+        st.error(f"❌ Delete error: {e}")
+        return False
+
+
+# InnoDB deadlock / lock wait timeout: the transaction was rolled back and
+# can safely be run again.
+RETRYABLE_TRANSACTION_ERRNOS = {1205, 1213}
+
+
+def run_in_transaction(work: Callable[[Any], Any], attempts: int = 3) -> Any:
+    """Run ``work(cursor)`` inside one transaction on a pooled connection.
+
+    Commits when ``work`` returns and rolls back if it raises. Transactions
+    that lose a deadlock are retried up to ``attempts`` times.
+    """
+
+    def transaction(connection):
+        connection.start_transaction()
+        cursor = InstrumentedCursor(connection.cursor(dictionary=True, buffered=True))
+        try:
+            result = work(cursor)
+            connection.commit()
+            return result
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    for attempt in range(attempts):
+        try:
+            return get_connection_pool().run(transaction)
+        except Error as e:
+            if (
+                e.errno not in RETRYABLE_TRANSACTION_ERRNOS
+                or attempt == attempts - 1
+            ):
+                raise
+
+
+# ==================== GUARDED QUERY EXECUTION ====================
+
+# A LIMIT clause ending the statement: "LIMIT n", "LIMIT offset, n" or
+# "LIMIT n OFFSET offset", optionally followed by a semicolon
+TRAILING_LIMIT_RE = re.compile(
+    r"\bLIMIT\s+(\d+)(?:\s*,\s*(\d+)|\s+OFFSET\s+(\d+))?\s*;?\s*$",
+    re.IGNORECASE,
+)
+
+
+class QueryRejectedError(Exception):
+    """Raised when the EXPLAIN pre-check refuses to run a query"""
+
+
+def apply_row_cap(query: str, max_rows: int) -> str:
+    """Rewrite a SELECT so the server returns at most ``max_rows`` rows.
+
+    An existing trailing LIMIT is lowered if needed; otherwise a LIMIT is
+    appended on its own line (so it survives a trailing ``--`` comment).
+    """
+    query = query.strip()
+    match = TRAILING_LIMIT_RE.search(query)
+    if match:
+        offset_first, count_after_comma, offset_after = match.groups()
+        if count_after_comma is not None:
+            offset, count = int(offset_first), int(count_after_comma)
+        else:
+            offset, count = int(offset_after or 0), int(offset_first)
+        return (
+            f"{query[: match.start()]}LIMIT {min(count, max_rows)} OFFSET {offset}"
+        )
+    return f"{query.rstrip(';').rstrip()}\nLIMIT {max_rows}"
+
+
+def add_execution_time_hint(query: str, timeout_ms: int) -> str:
+    """Add a MAX_EXECUTION_TIME optimizer hint to a statement starting with SELECT"""
+    return re.sub(
+        r"^\s*SELECT\b",
+        f"SELECT /*+ MAX_EXECUTION_TIME({int(timeout_ms)}) */",
+        query,
+        count=1,
+        flags=re.IGNORECASE,
+    )
+
+
+def check_query_plan(cursor, query: str, max_scan_rows: int) -> None:
+    """Reject queries whose plan full-scans a table estimated above max_scan_rows"""
+    cursor.execute(f"EXPLAIN {query}")
+    for step in cursor.fetchall():
+        if step["type"] == "ALL" and (step["rows"] or 0) > max_scan_rows:
+            raise QueryRejectedError(
+                f"full scan of {step['table']} (~{step['rows']:,} rows) "
+                f"exceeds the {max_scan_rows:,} row limit"
+            )
+
+
+def execute_guarded_query(
+    query: str,
+    max_rows: int = None,
+    timeout_ms: int = None,
+    max_scan_rows: int = None,
+    batch_size: int = 500,
+) -> Optional[Tuple[List[Dict], bool]]:
+    """Execute an untrusted SELECT with time, row and cost limits.
+
+    Runs on the read-only pool with a MAX_EXECUTION_TIME hint, caps the
+    result with a LIMIT of ``max_rows + 1`` and streams rows in batches so a
+    huge result is never fetched at once. When ``max_scan_rows`` is set, the
+    query is first EXPLAINed and rejected if it would full-scan a larger
+    table. Returns (rows, truncated) or None on failure.
+    """
+    if max_rows is None:
+        max_rows = int(get_config("GUARDED_QUERY_MAX_ROWS", "1000"))
+    if timeout_ms is None:
+        timeout_ms = int(get_config("GUARDED_QUERY_TIMEOUT_MS", "5000"))
+    if max_scan_rows is None:
+        max_scan_rows = int(get_config("GUARDED_QUERY_MAX_SCAN_ROWS", "100000"))
+
+    capped_query = add_execution_time_hint(
+        apply_row_cap(query, max_rows + 1), timeout_ms
+    )
+
+    def work(connection):
+        if max_scan_rows:
+            plan_cursor = InstrumentedCursor(connection.cursor(dictionary=True))
+            try:
+                check_query_plan(plan_cursor, capped_query, max_scan_rows)
+            finally:
+                plan_cursor.close()
+
         cursor = connection.cursor(dictionary=True)
-        cursor.execute(query, params or ())
+        try:
+            with record_statement(capped_query) as statement:
+                cursor.execute(capped_query)
+                rows = []
+                while len(rows) <= max_rows:
+                    batch = cursor.fetchmany(min(batch_size, max_rows + 1 - len(rows)))
+                    if not batch:
+                        break
+                    rows.extend(batch)
+                cursor.fetchall()  # At most the one extra row allowed by the LIMIT
+                statement["rows"] = len(rows)
+        finally:
+            cursor.close()
+        return rows[:max_rows], len(rows) > max_rows
+
+    try:
+        return get_readonly_pool().run(work, read_only=True)
+    except QueryRejectedError as e:
+        st.error(f"❌ Query rejected: {e}")
+        return None
+    except Error as e:
+        st.error(f"❌ Query execution error: {e}")
+        return None
+
+
+# ==================== QUERY CACHE ====================
+
+
+class CacheBackendError(Exception):
+    """Raised by a cache backend when its store cannot be reached"""
+
+
+def _encode_json(value: Any) -> Any:
+    """Make a cached value JSON-safe, tagging the types JSON lacks.
+
+    Raises TypeError for any other type: cache entries may come from a
+    shared backend, so they are never decoded into arbitrary objects.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [_encode_json(item) for item in value]
+    if isinstance(value, dict):
+        if all(isinstance(k, str) for k in value) and "__type__" not in value:
+            return {k: _encode_json(v) for k, v in value.items()}
+        items = [[_encode_json(k), _encode_json(v)] for k, v in value.items()]
+        return {"__type__": "dict", "items": items}
+    if isinstance(value, (tuple, set, frozenset)):
+        kind = "tuple" if isinstance(value, tuple) else "set"
+        return {"__type__": kind, "items": [_encode_json(item) for item in value]}
+    if isinstance(value, np.generic):
+        return _encode_json(value.item())
+    if isinstance(value, datetime):
+        return {"__type__": "datetime", "value": value.isoformat()}
+    if isinstance(value, date):
+        return {"__type__": "date", "value": value.isoformat()}
+    if isinstance(value, timedelta):
+        return {"__type__": "timedelta", "value": value.total_seconds()}
+    if isinstance(value, Decimal):
+        return {"__type__": "decimal", "value": str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {"__type__": "bytes", "value": base64.b64encode(value).decode()}
+    if isinstance(value, pd.DataFrame):
+        return {
+            "__type__": "frame",
+            "columns": _encode_json(list(value.columns)),
+            "index": _encode_json(list(value.index)),
+            "data": _encode_json(value.to_numpy().tolist()),
+        }
+    raise TypeError(f"Cannot cache a {type(value).__name__}")
+
+
+_JSON_DECODERS = {
+    "dict": lambda o: {k: v for k, v in o["items"]},
+    "tuple": lambda o: tuple(o["items"]),
+    "set": lambda o: set(o["items"]),
+    "datetime": lambda o: datetime.fromisoformat(o["value"]),
+    "date": lambda o: date.fromisoformat(o["value"]),
+    "timedelta": lambda o: timedelta(seconds=o["value"]),
+    "decimal": lambda o: Decimal(o["value"]),
+    "bytes": lambda o: base64.b64decode(o["value"]),
+    "frame": lambda o: pd.DataFrame(o["data"], index=o["index"], columns=o["columns"]),
+}
+
+
+def _decode_json(obj: Dict[str, Any]) -> Any:
+    kind = obj.get("__type__")
+    if kind is None:
+        return obj
+    if kind not in _JSON_DECODERS:
+        raise ValueError(f"Unknown cached type {kind!r}")
+    return _JSON_DECODERS[kind](obj)
+
+
+def serialize_result(value: Any) -> bytes:
+    """Encode a cached result: DataFrames as Arrow IPC, tuples part by part,
+    anything else (or a frame Arrow cannot represent) as tagged JSON.
+
+    Raises TypeError for values of other types.
+    """
+    if isinstance(value, tuple):
+        parts = [serialize_result(item) for item in value]
+        return b"T" + b"".join(struct.pack(">I", len(part)) + part for part in parts)
+    if isinstance(value, pd.DataFrame):
+        try:
+            table = pa.Table.from_pandas(value)
+            sink = pa.BufferOutputStream()
+            with pa_ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return b"A" + sink.getvalue().to_pybytes()
+        except pa.ArrowException:
+            pass
+    return b"J" + json.dumps(_encode_json(value)).encode()
+
+
+def deserialize_result(data: bytes) -> Any:
+    """Decode a value written by serialize_result.
+
+    Raises ValueError for anything else, such as entries from older
+    versions.
+    """
+    kind, body = data[:1], memoryview(data)[1:]
+    if kind == b"A":
+        return pa_ipc.open_stream(pa.py_buffer(body)).read_all().to_pandas()
+    if kind == b"T":
+        items, offset = [], 0
+        while offset < len(body):
+            (length,) = struct.unpack_from(">I", body, offset)
+            items.append(deserialize_result(bytes(body[offset + 4 : offset + 4 + length])))
+            offset += 4 + length
+        return tuple(items)
+    if kind == b"J":
+        return json.loads(bytes(body), object_hook=_decode_json)
+    raise ValueError(f"Unknown cache entry kind {bytes(kind)!r}")
+
+
+class MemoryCacheBackend:
+    """Cache store inside this process (the default; not shared by replicas).
+
+    Least recently used entries are evicted beyond ``max_entries``.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 2000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() >= entry[1]:
+                del self._entries[key]
+                self._expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, counter: str) -> int:
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + 1
+            return self._counters[counter]
+
+    def get_counters(self, counters: List[str]) -> List[int]:
+        with self._lock:
+            return [self._counters.get(counter, 0) for counter in counters]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+
+class SQLiteCacheBackend:
+    """Cache store in a local SQLite file shared by every replica on the host.
+
+    Expired entries are purged, and the entries closest to expiry are
+    evicted beyond ``max_entries``, every ``trim_interval`` writes.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, max_entries: int = 20000, trim_interval: int = 100):
+        self.max_entries = max_entries
+        self.trim_interval = trim_interval
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS query_cache (
+                cache_key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_query_cache_expires ON query_cache (expires_at)"
+        )
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS query_cache_counters (
+                counter TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            try:
+                yield self._db
+                self._db.commit()
+            except sqlite3.Error as e:
+                self._db.rollback()
+                raise CacheBackendError(str(e)) from e
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT value, expires_at FROM query_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if time.time() >= row[1]:
+                db.execute("DELETE FROM query_cache WHERE cache_key = ?", (key,))
+                self._expirations += 1
+                return None
+            return row[0]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._transaction() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO query_cache (cache_key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+            self._writes += 1
+            if self._writes % self.trim_interval == 0:
+                self._expirations += db.execute(
+                    "DELETE FROM query_cache WHERE expires_at <= ?", (time.time(),)
+                ).rowcount
+                self._evictions += db.execute(
+                    """
+                    DELETE FROM query_cache WHERE cache_key IN (
+                        SELECT cache_key FROM query_cache
+                        ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_entries,),
+                ).rowcount
+
+    def delete(self, key: str) -> None:
+        with self._transaction() as db:
+            db.execute("DELETE FROM query_cache WHERE cache_key = ?", (key,))
+
+    def incr(self, counter: str) -> int:
+        with self._transaction() as db:
+            return db.execute(
+                """
+                INSERT INTO query_cache_counters (counter, value) VALUES (?, 1)
+                ON CONFLICT (counter) DO UPDATE SET value = value + 1
+                RETURNING value
+                """,
+                (counter,),
+            ).fetchone()[0]
+
+    def get_counters(self, counters: List[str]) -> List[int]:
+        if not counters:
+            return []
+        with self._transaction() as db:
+            placeholders = ", ".join(["?"] * len(counters))
+            values = dict(
+                db.execute(
+                    f"SELECT counter, value FROM query_cache_counters WHERE counter IN ({placeholders})",
+                    counters,
+                ).fetchall()
+            )
+        return [values.get(counter, 0) for counter in counters]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._transaction() as db:
+            entries = db.execute("SELECT COUNT(*) FROM query_cache").fetchone()[0]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+        }
+
+
+class RedisCacheBackend:
+    """Cache store on a Redis-compatible server shared by every replica.
+
+    Entries expire through Redis TTLs; eviction under memory pressure is
+    left to the server's ``maxmemory-policy``.
+    """
+
+    name = "redis"
+
+    def __init__(self, client, prefix: str = "parkpal:cache:"):
+        self.client = client
+        self.prefix = prefix
+        try:
+            import redis
+
+            self._errors = (redis.RedisError,)
+        except ImportError:
+            self._errors = (ConnectionError, TimeoutError)
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCacheBackend":
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError(
+                "QUERY_CACHE_BACKEND=redis needs the redis package (pip install redis)"
+            ) from e
+        return cls(redis.Redis.from_url(url, socket_timeout=1))
+
+    @contextmanager
+    def _call(self):
+        try:
+            yield
+        except self._errors as e:
+            raise CacheBackendError(str(e)) from e
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._call():
+            return self.client.get(f"{self.prefix}entry:{key}")
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._call():
+            self.client.set(f"{self.prefix}entry:{key}", value, px=max(int(ttl * 1000), 1))
+
+    def delete(self, key: str) -> None:
+        with self._call():
+            self.client.delete(f"{self.prefix}entry:{key}")
+
+    def incr(self, counter: str) -> int:
+        with self._call():
+            return int(self.client.incr(f"{self.prefix}counter:{counter}"))
+
+    def get_counters(self, counters: List[str]) -> List[int]:
+        if not counters:
+            return []
+        with self._call():
+            values = self.client.mget([f"{self.prefix}counter:{c}" for c in counters])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class FakeRedis:
+    """In-process stand-in for the few Redis commands RedisCacheBackend uses.
+
+    Lets the Redis backend run without a server (QUERY_CACHE_BACKEND=fakeredis);
+    several QueryCaches sharing one instance behave like replicas sharing a
+    server.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+
+    def _live(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and time.time() >= entry[1]:
+            del self._data[key]
+            return None
+        return entry[0]
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._live(key)
+
+    def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        with self._lock:
+            return [self._live(key) for key in keys]
+
+    def set(self, key: str, value: bytes, px: Optional[int] = None) -> bool:
+        with self._lock:
+            self._data[key] = (value, time.time() + px / 1000 if px else None)
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._live(key) or 0) + 1
+            self._data[key] = (str(value).encode(), None)
+            return value
+
+
+class QueryCache:
+    """Cache of query results with tag-based invalidation over a backend.
+
+    Every entry is tagged with the data it was built from, e.g.
+    ``"reviews:park:3"`` or ``"reservations:user:7"``. Tags are
+    hierarchical: invalidating ``"reviews:park:3"`` also invalidates entries
+    tagged ``"reviews"`` (which depend on every review) but not those tagged
+    ``"reviews:park:4"``. Each tag has a version counter in the backend and
+    an entry is only served while all its tags still have the versions it
+    was computed under, so with a shared backend an invalidation by one
+    replica is seen by every other one. Backend outages degrade to misses.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._errors = 0
+        self._stale_hits = 0
+        self._refreshes = 0
+        self._refreshing: set = set()
+        self._refresher: Optional[ThreadPoolExecutor] = None
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _read_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        """Current version of each tag; raises CacheBackendError"""
+        tags = list(dict.fromkeys(tags))
+        return dict(zip(tags, self.backend.get_counters([f"tag:{t}" for t in tags])))
+
+    def tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        """Current version of each tag; pass the result to ``set``.
+
+        Empty if the backend cannot be read, which ``set`` refuses to store.
+        """
+        try:
+            return self._read_versions(tags)
+        except CacheBackendError:
+            self._count("_errors")
+            return {}
+
+    def _entry(self, key: str) -> Optional[Tuple[Dict[str, Any], bytes, int]]:
+        """The header, blob and payload offset of a valid entry, or None.
+
+        Drops the entry if one of its tags was invalidated. A failed read of
+        the tag versions raises CacheBackendError rather than dropping it.
+        """
+        blob = self.backend.get(key)
+        if blob is None:
+            return None
+        (header_length,) = struct.unpack_from(">I", blob)
+        header = json.loads(blob[4 : 4 + header_length])
+        versions = header["versions"]
+        if self._read_versions(versions) != versions:
+            self.backend.delete(key)
+            self._count("_invalidations")
+            return None
+        return header, blob, 4 + header_length
+
+    def get(self, key: str, allow_stale: bool = False) -> Tuple[bool, Any, bool]:
+        """Return ``(hit, value, stale)`` for ``key``.
+
+        Entries past their TTL but inside their stale window are only
+        returned (with ``stale=True``) when ``allow_stale`` is set.
+        Invalidated entries, and entries that do not decode, are never
+        returned.
+        """
+        try:
+            entry = self._entry(key)
+            if entry is not None:
+                header, blob, offset = entry
+                stale = time.time() >= header["fresh_until"]
+                if not stale or allow_stale:
+                    self._count("_stale_hits" if stale else "_hits")
+                    return True, deserialize_result(blob[offset:]), stale
+        except (CacheBackendError, ValueError):
+            self._count("_errors")
+        self._count("_misses")
+        return False, None, False
+
+    def stamp(
+        self, key: str, allow_stale: bool = False
+    ) -> Tuple[Optional[float], bool]:
+        """Return ``(stamp, stale)`` for ``key`` without decoding the value.
+
+        The stamp is the same for as long as one stored result is served
+        and changes when it is reloaded; it is None when ``get`` would miss.
+        """
+        try:
+            entry = self._entry(key)
+        except CacheBackendError:
+            self._count("_errors")
+            return None, False
+        if entry is None:
+            return None, False
+        stale = time.time() >= entry[0]["fresh_until"]
+        if stale and not allow_stale:
+            return None, False
+        return entry[0]["fresh_until"], stale
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: float,
+        versions: Dict[str, int],
+        stale_ttl: float = 0,
+    ) -> None:
+        """Store ``value`` unless one of its tags was invalidated since ``versions``.
+
+        The entry is fresh for ``ttl`` seconds and may be served stale for
+        ``stale_ttl`` seconds after that. Values serialize_result cannot
+        encode are not stored.
+        """
+        if not versions or self.tag_versions(versions) != versions:
+            return
+        header = json.dumps(
+            {"versions": versions, "fresh_until": time.time() + ttl}
+        ).encode()
+        try:
+            body = serialize_result(value)
+        except TypeError:
+            self._count("_errors")
+            return
+        try:
+            self.backend.set(
+                key, struct.pack(">I", len(header)) + header + body, ttl + stale_ttl
+            )
+        except CacheBackendError:
+            self._count("_errors")
+
+    def refresh_in_background(self, key: str, refresh: Callable[[], None]) -> None:
+        """Run ``refresh`` on a background thread unless ``key`` is already
+        being refreshed by this process"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresher is None:
+                self._refresher = ThreadPoolExecutor(
+                    max_workers=2, thread_name_prefix="cache-refresh"
+                )
+
+        def run():
+            try:
+                refresh()
+                self._count("_refreshes")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._refresher.submit(run)
+
+    def invalidate(self, *tags: str) -> None:
+        """Invalidate entries tagged with any of ``tags`` or their parent tags"""
+        expanded = set()
+        for tag in tags:
+            parts = tag.split(":")
+            expanded.update(":".join(parts[:i]) for i in range(1, len(parts) + 1))
+        for tag in expanded:
+            try:
+                self.backend.incr(f"tag:{tag}")
+            except CacheBackendError:
+                self._count("_errors")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters for the System Stats panel"""
+        try:
+            backend_stats = self.backend.stats()
+        except CacheBackendError:
+            backend_stats = {}
+        with self._lock:
+            lookups = self._hits + self._stale_hits + self._misses
+            return {
+                "backend": self.backend.name,
+                "entries": backend_stats.get("entries"),
+                "max_entries": backend_stats.get("max_entries"),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits + self._stale_hits) / lookups if lookups else 0.0,
+                "evictions": backend_stats.get("evictions"),
+                "expirations": backend_stats.get("expirations"),
+                "invalidations": self._invalidations,
+                "stale_hits": self._stale_hits,
+                "refreshes": self._refreshes,
+                "errors": self._errors,
+            }
+
+
+@st.cache_resource
+def get_query_cache() -> QueryCache:
+    """Process-wide query cache shared by all sessions (and, with a shared
+    backend, by all replicas)"""
+    backend = get_config("QUERY_CACHE_BACKEND", "memory")
+    max_entries = int(get_config("QUERY_CACHE_MAX_ENTRIES", "2000"))
+    if backend == "sqlite":
+        return QueryCache(
+            SQLiteCacheBackend(
+                get_config("QUERY_CACHE_PATH", ".parkpal_query_cache.sqlite3"),
+                max_entries=max_entries,
+            )
+        )
+    if backend == "redis":
+        return QueryCache(
+            RedisCacheBackend.from_url(
+                get_config("QUERY_CACHE_REDIS_URL", "redis://localhost:6379/0")
+            )
+        )
+    if backend == "fakeredis":
+        return QueryCache(RedisCacheBackend(FakeRedis()))
+    return QueryCache(MemoryCacheBackend(max_entries=max_entries))
+
+
+# Set for the duration of one script run after "Refresh Data" is pressed:
+# cached functions then reload (and re-cache) everything that run reads
+# instead of the whole cache being dropped for every session.
+_cache_refresh = threading.local()
+
+
+def cached(ttl: float, tags: Callable[..., Iterable[str]], stale_ttl: float = 0):
+    """Cache a data function's result in the shared QueryCache.
+
+    ``tags`` is called with the same arguments as the function and returns
+    the tags to file the result under. The cache holds results serialized,
+    so callers get their own copy and may modify it, like with
+    ``st.cache_data``.
+
+    With ``stale_ttl``, a result older than ``ttl`` is still returned for up
+    to ``stale_ttl`` more seconds while one background thread per key
+    reloads it (stale-while-revalidate). Invalidated results are never
+    served stale.
+
+    The wrapper's ``clear()`` drops every entry of the function,
+    ``prime(value, *args, **kwargs)`` stores a result loaded elsewhere and
+    ``stamp(*args, **kwargs)`` identifies the stored result without
+    decoding it (None when a call would reload it), so state derived from
+    a result can be rebuilt only when the result changes.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        function_tag = f"fn:{func.__name__}"
+
+        def cache_key(bound) -> str:
+            arguments = repr(tuple(bound.arguments.items())).encode()
+            return f"{func.__name__}:{hashlib.sha256(arguments).hexdigest()[:32]}"
+
+        def load(bound, key: str):
+            cache = get_query_cache()
+            versions = cache.tag_versions([function_tag, *tags(**bound.arguments)])
+            started = time.perf_counter()
+            value = func(*bound.args, **bound.kwargs)
+            get_metrics().observe_loader(func.__name__, time.perf_counter() - started)
+            cache.set(key, value, ttl, versions, stale_ttl)
+            return value
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = cache_key(bound)
+            cache = get_query_cache()
+
+            if not getattr(_cache_refresh, "active", False):
+                hit, value, stale = cache.get(key, allow_stale=stale_ttl > 0)
+                if stale:
+                    cache.refresh_in_background(key, lambda: load(bound, key))
+                get_metrics().observe_cache(func.__name__, hit)
+                if hit:
+                    return value
+            else:
+                get_metrics().observe_cache(func.__name__, False)
+
+            return load(bound, key)
+
+        def prime(value, *args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            cache = get_query_cache()
+            versions = cache.tag_versions([function_tag, *tags(**bound.arguments)])
+            cache.set(cache_key(bound), value, ttl, versions, stale_ttl)
+
+        def stamp(*args, **kwargs) -> Optional[float]:
+            if getattr(_cache_refresh, "active", False):
+                return None
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = cache_key(bound)
+            cache = get_query_cache()
+            value_stamp, stale = cache.stamp(key, allow_stale=stale_ttl > 0)
+            if stale:
+                cache.refresh_in_background(key, lambda: load(bound, key))
+            return value_stamp
+
+        wrapper.clear = lambda: get_query_cache().invalidate(function_tag)
+        wrapper.prime = prime
+        wrapper.stamp = stamp
+        return wrapper
+
+    return decorator
+
+
+def invalidate_cache(*tags: str) -> None:
+    """Invalidate cached query results after a write to the tagged rows.
+
+    After a review or lodging write the park aggregates are marked stale,
+    so the next read in this process pulls the change feed and includes it.
+    """
+    if tags:
+        get_query_cache().invalidate(*tags)
+        if any(tag.startswith(("reviews:park:", "lodging")) for tag in tags):
+            get_park_aggregates().mark_stale()
+
+
+def reservation_tags(user_id: Optional[int], park_id: int) -> List[str]:
+    """Cache tags touched by booking, changing or deleting a reservation"""
+    return [f"reservations:user:{user_id}", f"inventory:park:{park_id}"]
+
+
+def review_tags(review_id: Optional[int], user_id: int, park_id: int) -> List[str]:
+    """Cache tags touched by writing a review"""
+    tags = [f"reviews:user:{user_id}", f"reviews:park:{park_id}"]
+    if review_id is not None:
+        tags.append(f"reviews:id:{review_id}")
+    return tags
+
+
+# ==================== INCREMENTAL AGGREGATES ====================
+
+
+class ParkAggregates:
+    """Per-park review and lodging aggregates kept current from Change_Log.
+
+    A full snapshot is loaded once (from Park_Rating_Summary and a grouped
+    count of Lodging); after that the rows the Park_Review and
+    Lodging triggers append to Change_Log are applied as deltas. Ratings
+    are kept as a 1-5 histogram per park, so count, sum, average, minimum
+    and maximum stay exact through edits and deletes. Reads are O(1) and
+    never scan Park_Review or Lodging; the feed is polled at most every
+    ``poll_interval`` seconds, by one thread at a time.
+
+    Change_IDs are allocated before commit, so a slow transaction can commit
+    an ID lower than ones already applied. Such missing IDs are looked for
+    again on every poll; once one has been missing for ``gap_timeout``
+    seconds the aggregates are reloaded, since it may belong to a long
+    transaction rather than a rolled-back one. An ID still missing after
+    that is most likely rolled back: it is still looked for but never
+    causes another reload. IDs below the oldest row left in Change_Log
+    (purged) are not tracked at all. The snapshot is also
+    reloaded when Change_Log has been truncated (data reloaded), which is
+    detected by the row at the last applied Change_ID changing or
+    disappearing while older rows remain.
+    """
+
+    def __init__(
+        self, poll_interval: float = 2.0, gap_timeout: float = 60.0, batch_size: int = 5000
+    ):
+        self.poll_interval = poll_interval
+        self.gap_timeout = gap_timeout
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._loaded = False
+        self._last_poll = 0.0
+        self._ratings: Dict[int, List[int]] = {}
+        self._lodging: Dict[int, int] = {}
+        self._total_reviews = 0
+        self._total_lodging = 0
+        self._high_water = 0
+        self._high_water_at = None  # Changed_At of the row at _high_water
+        self._gaps: Dict[int, float] = {}
+        self._expired_gaps: Set[int] = set()  # gaps that already forced a reload
+        self._changes_applied = 0
+        self._reloads = 0
+
+    def _load(self) -> None:
+        """Replace all aggregates with a consistent snapshot of the tables"""
+
+        def snapshot(connection):
+            connection.start_transaction(consistent_snapshot=True, readonly=True)
+            cursor = InstrumentedCursor(connection.cursor())
+            try:
+                cursor.execute(
+                    """
+                    SELECT Change_ID, Changed_At,
+                           (SELECT MIN(Change_ID) FROM Change_Log)
+                    FROM Change_Log
+                    ORDER BY Change_ID DESC LIMIT 1
+                    """
+                )
+                high_water, high_water_at, min_id = cursor.fetchone() or (0, None, 1)
+                # IDs below the snapshot's newest that it cannot see yet
+                # belong to transactions still in flight (or rolled back);
+                # IDs below its oldest were purged
+                low = max(high_water - self.batch_size, min_id - 1, 0)
+                cursor.execute(
+                    "SELECT Change_ID FROM Change_Log WHERE Change_ID > %s", (low,)
+                )
+                recent = {row[0] for row in cursor.fetchall()}
+                cursor.execute(
+                    """
+                    SELECT Park_ID, Rating_1_Count, Rating_2_Count, Rating_3_Count,
+                           Rating_4_Count, Rating_5_Count
+                    FROM Park_Rating_Summary
+                    """
+                )
+                ratings = cursor.fetchall()
+                cursor.execute("SELECT Park_ID, COUNT(*) FROM Lodging GROUP BY Park_ID")
+                lodging = cursor.fetchall()
+                connection.commit()
+                return high_water, high_water_at, low, recent, ratings, lodging
+            finally:
+                cursor.close()
+
+        high_water, high_water_at, low, recent, ratings, lodging = (
+            get_connection_pool().run(snapshot, read_only=True)
+        )
+        now = time.time()
+        with self._lock:
+            self._ratings = {row[0]: list(row[1:]) for row in ratings}
+            self._lodging = {park_id: count for park_id, count in lodging}
+            self._total_reviews = sum(sum(h) for h in self._ratings.values())
+            self._total_lodging = sum(self._lodging.values())
+            self._high_water = high_water
+            self._high_water_at = high_water_at
+            missing = set(range(low + 1, high_water)) - recent
+            self._expired_gaps &= missing
+            self._gaps = {change_id: now for change_id in missing - self._expired_gaps}
+            self._loaded = True
+            self._reloads += 1
+
+    def _apply(self, change: Dict[str, Any]) -> None:
+        """Apply one Change_Log row (caller holds the lock)"""
+        if change["Table_Name"] == "Park_Review":
+            if change["Old_Park_ID"] is not None:
+                histogram = self._ratings.setdefault(change["Old_Park_ID"], [0] * 5)
+                histogram[change["Old_Rating"] - 1] -= 1
+                self._total_reviews -= 1
+            if change["New_Park_ID"] is not None:
+                histogram = self._ratings.setdefault(change["New_Park_ID"], [0] * 5)
+                histogram[change["New_Rating"] - 1] += 1
+                self._total_reviews += 1
+        elif change["Table_Name"] == "Lodging":
+            if change["Old_Park_ID"] is not None:
+                self._lodging[change["Old_Park_ID"]] = self._lodging.get(change["Old_Park_ID"], 0) - 1
+                self._total_lodging -= 1
+            if change["New_Park_ID"] is not None:
+                self._lodging[change["New_Park_ID"]] = self._lodging.get(change["New_Park_ID"], 0) + 1
+                self._total_lodging += 1
+        self._changes_applied += 1
+
+    def _fetch_changes(self) -> Tuple[List[Dict], Dict[str, Any]]:
+        """New and gap-filling Change_Log rows, and the state of the feed"""
+        gaps = sorted(self._gaps.keys() | self._expired_gaps)[:1000]
+
+        def work(connection):
+            cursor = InstrumentedCursor(connection.cursor(dictionary=True))
+            try:
+                gap_filter = ""
+                if gaps:
+                    gap_filter = f"OR Change_ID IN ({', '.join(['%s'] * len(gaps))})"
+                cursor.execute(
+                    f"""
+                    SELECT Change_ID, Table_Name, Old_Park_ID, New_Park_ID,
+                           Old_Rating, New_Rating, Changed_At
+                    FROM Change_Log
+                    WHERE Change_ID > %s {gap_filter}
+                    ORDER BY Change_ID
+                    LIMIT %s
+                    """,
+                    (self._high_water, *gaps, self.batch_size),
+                )
+                changes = cursor.fetchall()
+                cursor.execute(
+                    """
+                    SELECT (SELECT MIN(Change_ID) FROM Change_Log) AS min_id,
+                           (SELECT MAX(Change_ID) FROM Change_Log) AS max_id,
+                           (SELECT Changed_At FROM Change_Log WHERE Change_ID = %s)
+                               AS high_water_at
+                    """,
+                    (self._high_water,),
+                )
+                return changes, cursor.fetchone()
+            finally:
+                cursor.close()
+
+        return get_connection_pool().run(work, read_only=True)
+
+    def poll(self) -> None:
+        """Apply new Change_Log rows; loads a snapshot first if needed"""
+        if time.time() - self._last_poll < self.poll_interval:
+            return
+        # One poller at a time; once loaded, other readers use the current values
+        if not self._poll_lock.acquire(blocking=not self._loaded):
+            return
+        try:
+            self._last_poll = time.time()
+            if not self._loaded:
+                self._load()
+            else:
+                self._apply_new_changes()
+        except Error as e:
+            st.error(f"❌ Could not refresh park statistics: {e}")
+        finally:
+            self._poll_lock.release()
+
+    def mark_stale(self) -> None:
+        """Make the next read poll the feed instead of waiting for ``poll_interval``"""
+        self._last_poll = 0.0
+
+    def _feed_was_reset(self, feed: Dict[str, Any]) -> bool:
+        """Whether Change_Log was truncated since the last applied change"""
+        if not self._high_water:
+            return False
+        if (feed["max_id"] or 0) < self._high_water:
+            return True
+        if feed["high_water_at"] is not None:
+            # The ID was reused by a row written after the truncate
+            return feed["high_water_at"] != self._high_water_at
+        # The row is gone: purged with everything before it, or truncated
+        return feed["min_id"] is not None and feed["min_id"] <= self._high_water
+
+    def _apply_new_changes(self) -> None:
+        while True:
+            changes, feed = self._fetch_changes()
+            if self._feed_was_reset(feed):
+                # Change_Log was truncated (data reloaded): start over
+                with self._lock:
+                    self._expired_gaps.clear()
+                self._load()
+                return
+            now = time.time()
+            with self._lock:
+                for change in changes:
+                    change_id = change["Change_ID"]
+                    if change_id > self._high_water:
+                        for missing in range(self._high_water + 1, change_id):
+                            self._gaps[missing] = now
+                        self._high_water = change_id
+                        self._high_water_at = change["Changed_At"]
+                    elif change_id in self._expired_gaps:
+                        self._expired_gaps.discard(change_id)
+                    elif self._gaps.pop(change_id, None) is None:
+                        continue
+                    self._apply(change)
+                expired = {
+                    change_id
+                    for change_id, seen in self._gaps.items()
+                    if now - seen >= self.gap_timeout
+                }
+                self._expired_gaps |= expired
+            if expired:
+                # A change still missing may belong to a long transaction
+                # that commits later; a new snapshot includes it once it has.
+                # If it is missing from that one too it was rolled back.
+                self._load()
+                return
+            if len(changes) < self.batch_size:
+                return
+
+    def _rating_row(self, park_id: int) -> Dict[str, Any]:
+        histogram = self._ratings.get(park_id, [0] * 5)
+        count = sum(histogram)
+        rated = [rating for rating in range(1, 6) if histogram[rating - 1]]
+        return {
+            "Park_ID": park_id,
+            "Avg_Rating": (
+                sum(rating * n for rating, n in enumerate(histogram, 1)) / count
+                if count
+                else 0.0
+            ),
+            "Review_Count": count,
+            "Min_Rating": rated[0] if rated else None,
+            "Max_Rating": rated[-1] if rated else None,
+        }
+
+    def park_rating(self, park_id: int) -> Dict[str, Any]:
+        """Rating aggregates for one park"""
+        self.poll()
+        with self._lock:
+            return self._rating_row(int(park_id))
+
+    def ratings_frame(self, park_ids: Optional[Iterable[int]] = None) -> pd.DataFrame:
+        """Rating aggregates for ``park_ids`` (default: every reviewed park)"""
+        self.poll()
+        with self._lock:
+            ids = list(self._ratings) if park_ids is None else [int(p) for p in park_ids]
+            return pd.DataFrame(
+                [self._rating_row(park_id) for park_id in ids],
+                columns=["Park_ID", "Avg_Rating", "Review_Count", "Min_Rating", "Max_Rating"],
+            )
+
+    def totals(self) -> Dict[str, int]:
+        """Total reviews and lodging across all parks"""
+        self.poll()
+        with self._lock:
+            return {"reviews": self._total_reviews, "lodging": self._total_lodging}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "high_water": self._high_water,
+                "pending_gaps": len(self._gaps),
+                "expired_gaps": len(self._expired_gaps),
+                "changes_applied": self._changes_applied,
+                "reloads": self._reloads,
+                "seconds_since_poll": time.time() - self._last_poll,
+            }
+
+
+@st.cache_resource
+def get_park_aggregates() -> ParkAggregates:
+    """Process-wide park aggregates shared by all sessions"""
+    return ParkAggregates(
+        poll_interval=float(get_config("AGGREGATE_POLL_INTERVAL", "2")),
+    )
+
+
+# ==================== DATA RETRIEVAL FUNCTIONS ====================
+
+# Parks and lodging change rarely: after their TTL they are served stale for
+# this long while a background thread reloads them
+CATALOG_STALE_TTL = float(get_config("CATALOG_STALE_TTL", "3600"))
+
+LODGING_COLUMNS = """
+    Lodging_ID, Lodging_Name, Lodging_Type, Address, City, State,
+    Description, Amenities, Price_Per_Night, Contact_Phone, Contact_Email,
+    Distance_From_Park_Miles, Star_Rating, Total_Rooms, Latitude, Longitude
+"""
+
+
+PARK_COLUMNS = """
+    Park_ID, Park_Name, State, Region, Description,
+    Wildlife_Information, Plant_Information, Area_Square_Miles,
+    Annual_Visitors, Best_Time_To_Visit, Entry_Fee, Official_Website,
+    Latitude, Longitude, Park_Activities_Events, Popular_Park_Trails,
+    Difficulty_Rating, Kid_Friendliness_Rating, Pet_Friendliness_Rating
+"""
+
+
+@cached(ttl=300, tags=lambda: ["parks"], stale_ttl=CATALOG_STALE_TTL)
+def get_park_catalog() -> pd.DataFrame:
+    """Fetch all national parks (without review statistics)"""
+    query = f"SELECT {PARK_COLUMNS} FROM National_Park ORDER BY Park_Name"
+    results = execute_query(query)
+    return pd.DataFrame(results) if results else pd.DataFrame()
+
+
+def get_all_parks() -> pd.DataFrame:
+    """Fetch all national parks with their average rating and review count.
+
+    The catalog comes from the query cache and the ratings from the
+    incrementally maintained ParkAggregates, so new reviews show up without
+    reloading the catalog.
+    """
+    parks_df = get_park_catalog()
+    if parks_df.empty:
+        return parks_df
+    return with_park_ratings(parks_df)
+
+
+def with_park_ratings(parks_df: pd.DataFrame) -> pd.DataFrame:
+    """``parks_df`` with each park's Avg_Rating and Review_Count joined on"""
+    ratings_df = get_park_ratings(tuple(parks_df["Park_ID"]))
+    return parks_df.merge(
+        ratings_df[["Park_ID", "Avg_Rating", "Review_Count"]], on="Park_ID", how="left"
+    )
+
+
+def get_park_ratings(park_ids: Optional[tuple] = None) -> pd.DataFrame:
+    """Get average rating and review count for many parks.
+
+    Pass a tuple of Park_IDs to fetch only the parks being shown; parks
+    without reviews get a zero rating and count. Also includes each park's
+    Min_Rating and Max_Rating.
+    """
+    return get_park_aggregates().ratings_frame(park_ids)
+
+
+@cached(ttl=300, tags=lambda park_id: ["parks"], stale_ttl=CATALOG_STALE_TTL)
+def get_park(park_id: int) -> Optional[Dict]:
+    """Get one park's details"""
+    query = "SELECT * FROM National_Park WHERE Park_ID = %s"
+    return execute_query(query, (park_id,), fetch="one")
+
+
+def get_park_with_rating(park_id: int) -> Optional[Dict]:
+    """Get park details with average rating"""
+    park = get_park(park_id)
+    if park is None:
+        return None
+    rating = get_park_aggregates().park_rating(park_id)
+    return {**park, "Avg_Rating": rating["Avg_Rating"], "Review_Count": rating["Review_Count"]}
+
+
+@cached(
+    ttl=300,
+    tags=lambda park_id: [f"lodging:park:{park_id}"],
+    stale_ttl=CATALOG_STALE_TTL,
+)
+def get_lodging_by_park(park_id: int) -> pd.DataFrame:
+    """Get all lodging options for a specific park"""
+    query = f"""
+        SELECT {LODGING_COLUMNS}
+        FROM Lodging
+        WHERE Park_ID = %s
+        ORDER BY Price_Per_Night
+    """
+    results = execute_query(query, (park_id,))
+    return pd.DataFrame(results) if results else pd.DataFrame()
+
+
+def warm_cache() -> None:
+    """Preload the park catalog and every park's lodging into the query cache.
+
+    All lodging is read in one query and split per park, rather than one
+    query per park.
+    """
+    parks_df = get_all_parks()
+    if parks_df.empty:
+        return
+
+    query = f"""
+        SELECT Park_ID, {LODGING_COLUMNS}
+        FROM Lodging
+        ORDER BY Park_ID, Price_Per_Night
+    """
+    results = execute_query(query)
+    if results is None:
+        return
+    lodging_by_park = {}
+    for row in results:
+        park_id = row.pop("Park_ID")
+        lodging_by_park.setdefault(park_id, []).append(row)
+
+    for park_id in parks_df["Park_ID"]:
+        rows = lodging_by_park.get(int(park_id))
+        get_lodging_by_park.prime(
+            pd.DataFrame(rows) if rows else pd.DataFrame(), int(park_id)
+        )
+
+
+@st.cache_resource
+def start_cache_warmup() -> None:
+    """Warm the query cache once per process, in the background (CACHE_WARMUP)"""
+    threading.Thread(target=warm_cache, name="cache-warmup", daemon=True).start()
+
+
+@cached(ttl=30, tags=lambda park_id, **_: [f"inventory:park:{park_id}"])
+def get_rooms_booked(park_id: int, check_in: date, check_out: date) -> Dict[int, int]:
+    """Get the busiest night's booked room count for each lodging at a park.
+
+    One range scan of Lodging_Inventory's (Park_ID, Stay_Date) index; lodging
+    with nothing booked during the stay is absent.
+    """
+    query = """
+        SELECT Lodging_ID, MAX(Rooms_Booked) AS Max_Rooms_Booked
+        FROM Lodging_Inventory
+        WHERE Park_ID = %s AND Stay_Date >= %s AND Stay_Date < %s
+        GROUP BY Lodging_ID
+    """
+    results = execute_query(query, (park_id, check_in, check_out)) or []
+    return {row["Lodging_ID"]: int(row["Max_Rooms_Booked"]) for row in results}
+
+
+def get_available_lodging(
+    park_id: int, check_in: date, check_out: date, num_rooms: int = 1
+) -> pd.DataFrame:
+    """Get lodging near a park with at least ``num_rooms`` free every night of a stay.
+
+    Combines the long-lived lodging catalog with the short-lived booked
+    room counts, so only the inventory scan is repeated as bookings change.
+    """
+    lodging_df = get_lodging_by_park(park_id)
+    if lodging_df.empty:
+        return lodging_df
+
+    rooms_booked = get_rooms_booked(park_id, check_in, check_out)
+    lodging_df["Rooms_Available"] = lodging_df["Total_Rooms"] - (
+        lodging_df["Lodging_ID"].map(rooms_booked).fillna(0).astype(int)
+    )
+    return lodging_df[lodging_df["Rooms_Available"] >= num_rooms].reset_index(drop=True)
+
+
+@cached(ttl=60, tags=lambda: ["users"])
+def get_all_users() -> List[Dict]:
+    """Get all users for dropdown selection"""
+    query = "SELECT User_ID, First_Name, Last_Name, Email FROM User ORDER BY First_Name"
+    return execute_query(query) or []
+
+
+@cached(ttl=60, tags=lambda user_id, **_: [f"reservations:user:{user_id}"])
+def get_user_reservations(user_id: int, filter_status: str = "all") -> pd.DataFrame:
+    """Get reservations for a specific user"""
+    base_query = """
+        SELECT lr.Reservation_ID, lr.Confirmation_Number, lr.Check_In_Date, lr.Check_Out_Date,
+               lr.Number_Of_Guests, lr.Number_Of_Rooms, lr.Reservation_Status, lr.Total_Cost,
+               lr.Guest_Name, lr.Guest_Phone, lr.Guest_Email, lr.Created_At,
+               l.Lodging_Name, l.Lodging_Type, l.Price_Per_Night,
+               np.Park_Name, np.State
+        FROM Lodging_Reservation lr
+        JOIN Lodging l ON lr.Lodging_ID = l.Lodging_ID
+        JOIN National_Park np ON l.Park_ID = np.Park_ID
+        WHERE lr.User_ID = %s
+    """
+
+    if filter_status == "upcoming":
+        base_query += (
+            " AND lr.Check_In_Date >= CURDATE() AND lr.Reservation_Status = 'confirmed'"
+        )
+    elif filter_status == "past":
+        base_query += " AND lr.Check_Out_Date < CURDATE()"
+    elif filter_status == "cancelled":
+        base_query += " AND lr.Reservation_Status = 'cancelled'"
+
+    base_query += " ORDER BY lr.Check_In_Date DESC"
+
+    results = execute_query(base_query, (user_id,))
+    return pd.DataFrame(results) if results else pd.DataFrame()
+
+
+@cached(ttl=60, tags=lambda: ["reviews", "users"])
+def get_all_reviews() -> pd.DataFrame:
+    """Get all park reviews with user and park information"""
+    query = """
+        SELECT pr.Review_ID, pr.Rating, pr.Review_Text, pr.Visit_Date, pr.Review_Date,
+               pr.Photo_URLs, pr.User_ID, pr.Park_ID,
+               u.First_Name, u.Last_Name, u.Email,
+               np.Park_Name, np.State
+        FROM Park_Review pr
+        JOIN User u ON pr.User_ID = u.User_ID
+        JOIN National_Park np ON pr.Park_ID = np.Park_ID
+        ORDER BY pr.Review_Date DESC
+    """
+    results = execute_query(query)
+    return pd.DataFrame(results) if results else pd.DataFrame()
+
+
+# Keyset pagination orderings for the reviews browser: sort column and
+# direction. Review_ID breaks ties so every row has a unique position, and
+# both sort columns are covered by single-column indexes (idx_review_date,
+# idx_rating) whose entries already end in the primary key.
+REVIEW_SORT_ORDERS = {
+    "recent": ("pr.Review_Date", "DESC"),
+    "highest": ("pr.Rating", "DESC"),
+    "lowest": ("pr.Rating", "ASC"),
+}
+
+REVIEW_PREVIEW_CHARS = 200
+
+
+@cached(
+    ttl=60,
+    tags=lambda park_id, **_: [
+        "reviews" if park_id is None else f"reviews:park:{park_id}"
+    ],
+)
+def get_reviews_page(
+    park_id: Optional[int] = None,
+    rating: Optional[int] = None,
+    sort: str = "recent",
+    after: Optional[tuple] = None,
+    before: Optional[tuple] = None,
+    page_size: int = 10,
+) -> Tuple[pd.DataFrame, bool]:
+    """Get one page of reviews using keyset (seek) pagination.
+
+    ``after``/``before`` are the ``(sort value, Review_ID)`` of the last/first
+    row of the page currently shown; pass one of them to move forward or
+    backward. Only the first REVIEW_PREVIEW_CHARS characters of each review
+    are returned. Returns the page and whether more rows exist in the
+    direction of travel.
+    """
+    sort_column, direction = REVIEW_SORT_ORDERS[sort]
+    backwards = before is not None
+    if backwards:
+        direction = "ASC" if direction == "DESC" else "DESC"
+    comparison = "<" if direction == "DESC" else ">"
+
+    conditions = []
+    params = []
+    if park_id is not None:
+        conditions.append("pr.Park_ID = %s")
+        params.append(int(park_id))
+    if rating is not None:
+        conditions.append("pr.Rating = %s")
+        params.append(int(rating))
+
+    cursor = before if backwards else after
+    if cursor is not None:
+        sort_value, review_id = cursor
+        conditions.append(
+            f"({sort_column} {comparison} %s OR "
+            f"({sort_column} = %s AND pr.Review_ID {comparison} %s))"
+        )
+        params.extend([sort_value, sort_value, int(review_id)])
+
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"""
+        SELECT pr.Review_ID, pr.Rating,
+               LEFT(pr.Review_Text, {REVIEW_PREVIEW_CHARS}) AS Review_Preview,
+               CHAR_LENGTH(pr.Review_Text) > {REVIEW_PREVIEW_CHARS} AS Is_Truncated,
+               pr.Visit_Date, pr.Review_Date, pr.Photo_URLs, pr.User_ID, pr.Park_ID,
+               u.First_Name, u.Last_Name,
+               np.Park_Name, np.State
+        FROM Park_Review pr
+        JOIN User u ON pr.User_ID = u.User_ID
+        JOIN National_Park np ON pr.Park_ID = np.Park_ID
+        {where_clause}
+        ORDER BY {sort_column} {direction}, pr.Review_ID {direction}
+        LIMIT %s
+    """
+    params.append(page_size + 1)
+
+    results = execute_query(query, tuple(params)) or []
+    has_more = len(results) > page_size
+    results = results[:page_size]
+    if backwards:
+        results.reverse()
+    return pd.DataFrame(results), has_more
+
+
+@cached(ttl=300, tags=lambda review_id: [f"reviews:id:{review_id}"])
+def get_review_text(review_id: int) -> str:
+    """Get the full text of a single review"""
+    query = "SELECT Review_Text FROM Park_Review WHERE Review_ID = %s"
+    result = execute_query(query, (review_id,), fetch="one")
+    return result["Review_Text"] if result else ""
+
+
+@cached(ttl=60, tags=lambda user_id: [f"reviews:user:{user_id}"])
+def get_user_reviews(user_id: int) -> pd.DataFrame:
+    """Get reviews for a specific user"""
+    query = """
+        SELECT pr.Review_ID, pr.Rating, pr.Review_Text, pr.Visit_Date, pr.Review_Date,
+               pr.Photo_URLs, pr.Park_ID,
+               np.Park_Name, np.State
+        FROM Park_Review pr
+        JOIN National_Park np ON pr.Park_ID = np.Park_ID
+        WHERE pr.User_ID = %s
+        ORDER BY pr.Review_Date DESC
+    """
+    results = execute_query(query, (user_id,))
+    return pd.DataFrame(results) if results else pd.DataFrame()
+
+
+# ==================== PARK CATALOG ====================
+
+# Catalog columns with few distinct values, stored as categoricals
+CATALOG_CATEGORY_COLUMNS = (
+    "State",
+    "Region",
+    "Best_Time_To_Visit",
+    "Difficulty_Rating",
+)
+
+_NO_POSITIONS = np.empty(0, dtype=np.int64)
+
+
+def split_states(state: str) -> List[str]:
+    """The states named in a park's State field, e.g. "Wyoming, Montana, Idaho\""""
+    return [part.strip() for part in state.split(",") if part.strip()]
+
+
+class ParkCatalog:
+    """The park catalog column by column, indexed for the directory filters.
+
+    Columns with few distinct values are categoricals. Each state, region
+    and best time to visit maps to the sorted row positions of its parks
+    (a park in "Wyoming, Montana, Idaho" is listed under all three states),
+    so a combination of filters is an intersection of position arrays and
+    only the rows that are shown get materialized.
+    """
+
+    INDEXED_COLUMNS = {
+        "State": split_states,
+        "Region": None,
+        "Best_Time_To_Visit": None,
+    }
+
+    def __init__(self, parks_df: pd.DataFrame):
+        frame = parks_df.reset_index(drop=True)
+        for column in CATALOG_CATEGORY_COLUMNS:
+            if column in frame.columns:
+                frame[column] = frame[column].astype("category")
+        self.frame = frame
+        ids = frame["Park_ID"].to_numpy(dtype=np.int64)
+        self._id_order = np.argsort(ids, kind="stable")
+        self._sorted_ids = ids[self._id_order]
+        self._indexes = {
+            column: self._build_index(frame[column], split)
+            for column, split in self.INDEXED_COLUMNS.items()
+            if column in frame.columns
+        }
+
+    @staticmethod
+    def _build_index(
+        column: pd.Series, split: Optional[Callable[[str], List[str]]]
+    ) -> Dict[str, np.ndarray]:
+        """Sorted row positions for each value of a categorical column"""
+        codes = column.cat.codes.to_numpy()
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(
+            codes[order], np.arange(len(column.cat.categories) + 1)
+        )
+        parts: Dict[str, List[np.ndarray]] = {}
+        for code, category in enumerate(column.cat.categories):
+            positions = order[bounds[code] : bounds[code + 1]]
+            for value in split(category) if split else [category]:
+                parts.setdefault(value, []).append(positions)
+        return {
+            value: np.unique(np.concatenate(arrays)).astype(np.int64)
+            for value, arrays in parts.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def values(self, column: str) -> List[str]:
+        """Every value of an indexed column, sorted, for filter choices"""
+        return sorted(self._indexes[column])
+
+    def select(
+        self, filters: Dict[str, str], within: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Row positions of the parks matching every ``column: value`` filter.
+
+        In catalog order, or in the order of ``within`` (e.g. ranked search
+        results) when given, which also limits the result.
+        """
+        matches = sorted(
+            (
+                self._indexes[column].get(value, _NO_POSITIONS)
+                for column, value in filters.items()
+            ),
+            key=len,
+        )
+        if not matches:
+            return np.arange(len(self)) if within is None else within
+        positions = functools.reduce(
+            lambda left, right: np.intersect1d(left, right, assume_unique=True), matches
+        )
+        if within is not None:
+            positions = within[np.isin(within, positions)]
+        return positions
+
+    def positions_of(self, park_ids: Iterable[int]) -> np.ndarray:
+        """Row positions of ``park_ids`` in the same order; unknown IDs are dropped"""
+        ids = np.fromiter(park_ids, dtype=np.int64)
+        found = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self) - 1)
+        known = self._sorted_ids[found] == ids if len(self) else found < 0
+        return self._id_order[found[known]]
+
+    def rows(
+        self, positions: np.ndarray, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """The parks at ``positions`` (optionally only some columns), in that order"""
+        frame = self.frame if columns is None else self.frame[columns]
+        return frame.take(positions).reset_index(drop=True)
+
+    def largest(self, column: str, n: int, positions: np.ndarray) -> np.ndarray:
+        """Positions of the ``n`` parks with the most ``column`` among ``positions``"""
+        values = pd.to_numeric(self.frame[column], errors="coerce")
+        chosen = values.to_numpy(dtype=float)[positions]
+        chosen = np.where(np.isnan(chosen), -np.inf, chosen)
+        return positions[np.argsort(-chosen, kind="stable")[:n]]
+
+    def value_counts(self, column: str, positions: np.ndarray) -> pd.Series:
+        """Parks per value of an indexed column among ``positions``, most first"""
+        counts = pd.Series(
+            {
+                value: int(np.isin(index, positions, assume_unique=True).sum())
+                for value, index in self._indexes[column].items()
+            },
+            dtype=int,
+        )
+        return counts[counts > 0].sort_values(ascending=False, kind="stable")
+
+
+class ParkCatalogSource:
+    """A ParkCatalog of the cached park catalog, rebuilt only when the cache
+    reloads it (checked through the loader's ``stamp``)"""
+
+    def __init__(self, loader):
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._catalog: Optional[ParkCatalog] = None
+
+    def current(self) -> Optional[ParkCatalog]:
+        """The catalog, or None when there are no parks"""
+        with self._lock:
+            stamp = self.loader.stamp()
+            if stamp is None or stamp != self._stamp:
+                parks_df = self.loader()
+                self._catalog = None if parks_df.empty else ParkCatalog(parks_df)
+                self._stamp = self.loader.stamp()
+            return self._catalog
+
+
+@st.cache_resource
+def get_park_catalog_source() -> ParkCatalogSource:
+    """Return the process-wide indexed park catalog"""
+    return ParkCatalogSource(get_park_catalog)
+
+
+# ==================== PARK SEARCH ====================
+
+SEARCH_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into",
+    "is", "it", "its", "of", "on", "or", "the", "to", "with",
+}
+
+
+@functools.lru_cache(maxsize=65536)
+def _stem(word: str) -> str:
+    """Fold common English plurals ("canyons", "arches", "ponies") to their stem"""
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "ches", "shes", "xes", "zes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def search_terms(text: str) -> List[str]:
+    """Split text into lowercase, plural-folded search terms"""
+    return [
+        _stem(word)
+        for word in re.findall(r"[a-z0-9]+", str(text).lower())
+        if word not in SEARCH_STOPWORDS
+    ]
+
+
+class BM25Index:
+    """In-memory inverted index with BM25 ranking over weighted fields.
+
+    Each document is a dict of field name -> text. A term's frequency in a
+    document is the sum of its counts in each field times that field's
+    weight, and the document length is weighted the same way (BM25F with
+    shared length normalization). Documents can be added, replaced and
+    removed one at a time, so the index follows its source incrementally.
+
+    Each term's per-document BM25 weights are computed on first use and
+    kept until the next change, so repeated searches only add them up.
+    """
+
+    def __init__(
+        self, field_weights: Dict[str, float], k1: float = 1.2, b: float = 0.75
+    ):
+        self.field_weights = field_weights
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[Any, float]] = {}
+        self._doc_terms: Dict[Any, Dict[str, float]] = {}
+        self._lengths: Dict[Any, float] = {}
+        self._total_length = 0.0
+        self._impacts: Dict[str, Dict[Any, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: Any) -> bool:
+        return doc_id in self._doc_terms
+
+    def add(self, doc_id: Any, fields: Dict[str, Any]) -> None:
+        """Add a document, replacing any previous version of it"""
+        self.remove(doc_id)
+        terms: Dict[str, float] = {}
+        length = 0.0
+        for field, weight in self.field_weights.items():
+            value = fields.get(field)
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                continue
+            field_terms = search_terms(value)
+            length += len(field_terms) * weight
+            for term, count in Counter(field_terms).items():
+                terms[term] = terms.get(term, 0.0) + count * weight
+        self._doc_terms[doc_id] = terms
+        self._lengths[doc_id] = length
+        self._total_length += length
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        self._impacts.clear()
+
+    def remove(self, doc_id: Any) -> None:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        self._impacts.clear()
+
+    def _term_impacts(self, term: str) -> Dict[Any, float]:
+        """idf x saturated term frequency of ``term`` for each document"""
+        impacts = self._impacts.get(term)
+        if impacts is None:
+            postings = self._postings.get(term)
+            if not postings:
+                return {}
+            doc_count, df = len(self._doc_terms), len(postings)
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            k1, b, lengths = self.k1, self.b, self._lengths
+            # tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average_length))
+            base = k1 * (1 - b)
+            per_length = k1 * b / (self._total_length / doc_count or 1.0)
+            impacts = self._impacts[term] = {
+                doc_id: idf * tf * (k1 + 1) / (tf + base + per_length * lengths[doc_id])
+                for doc_id, tf in postings.items()
+            }
+        return impacts
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Tuple[Any, float]]:
+        """Return (doc_id, score) pairs for documents matching any query term.
+
+        Best first; all matches unless ``k`` is given.
+        """
+        if not self._doc_terms:
+            return []
+        scores: Dict[Any, float] = {}
+        for term in set(search_terms(query)):
+            impacts = self._term_impacts(term)
+            if not scores:
+                scores = dict(impacts)
+                continue
+            for doc_id, impact in impacts.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + impact
+        if k is None:
+            return sorted(scores.items(), key=itemgetter(1), reverse=True)
+        return heapq.nlargest(k, scores.items(), key=itemgetter(1))
+
+
+# Park text columns searched, with their label and weight
+PARK_SEARCH_FIELDS = {
+    "Park_Name": ("Name", 3.0),
+    "Park_Activities_Events": ("Activities", 2.0),
+    "Popular_Park_Trails": ("Trails", 1.5),
+    "Wildlife_Information": ("Wildlife", 1.5),
+    "Plant_Information": ("Plants", 1.0),
+    "Description": ("Description", 1.0),
+}
+
+
+class ParkSearchIndex:
+    """BM25 keyword search over the park catalog, kept in step with it.
+
+    ``sync`` compares each park's searchable text with what was indexed and
+    re-indexes only the parks that were added or changed (and drops removed
+    ones), so a catalog reload does not rebuild the whole index.
+    """
+
+    def __init__(self):
+        self._index = BM25Index(
+            {field: weight for field, (_, weight) in PARK_SEARCH_FIELDS.items()}
+        )
+        self._signatures: Dict[int, int] = {}
+        self._synced_catalog = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def sync(self, parks_df: pd.DataFrame) -> Dict[str, int]:
+        """Bring the index up to date with ``parks_df``; return what changed"""
+        changes = {"added": 0, "updated": 0, "removed": 0}
+        with self._lock:
+            if parks_df is self._synced_catalog:
+                return changes
+            columns = [c for c in PARK_SEARCH_FIELDS if c in parks_df.columns]
+            seen = set()
+            for row in parks_df[["Park_ID", *columns]].itertuples(index=False):
+                park_id, texts = int(row[0]), row[1:]
+                seen.add(park_id)
+                signature = hash(texts)
+                previous = self._signatures.get(park_id)
+                if previous == signature:
+                    continue
+                self._index.add(park_id, dict(zip(columns, texts)))
+                self._signatures[park_id] = signature
+                changes["updated" if previous is not None else "added"] += 1
+            for park_id in set(self._signatures) - seen:
+                self._index.remove(park_id)
+                del self._signatures[park_id]
+                changes["removed"] += 1
+            self._synced_catalog = parks_df
+        return changes
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Tuple[int, float]]:
+        with self._lock:
+            return self._index.search(query, k)
+
+
+@st.cache_resource
+def get_park_search_index() -> ParkSearchIndex:
+    """Return the process-wide park search index"""
+    return ParkSearchIndex()
+
+
+def search_parks(query: str, catalog: ParkCatalog) -> np.ndarray:
+    """Catalog positions of the parks matching a keyword query, best match first"""
+    index = get_park_search_index()
+    index.sync(catalog.frame)
+    return catalog.positions_of(park_id for park_id, _ in index.search(query))
+
+
+def matched_fields(query: str, parks_df: pd.DataFrame) -> List[str]:
+    """For each park, the searched fields that contain a query term, as labels"""
+    query_terms = set(search_terms(query))
+    return [
+        ", ".join(
+            label
+            for field, (label, _) in PARK_SEARCH_FIELDS.items()
+            if field in parks_df.columns
+            and pd.notna(park[field])
+            and query_terms.intersection(search_terms(park[field]))
+        )
+        for _, park in parks_df.iterrows()
+    ]
+
+
+# ==================== GEOSPATIAL SEARCH ====================
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE = EARTH_RADIUS_MILES * math.pi / 180
+
+
+def haversine_miles(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle miles between points given in degrees (scalars or arrays)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoGridIndex:
+    """Points bucketed into a latitude/longitude grid for radius and k-nearest search.
+
+    Points are sorted by grid cell so each cell is one contiguous slice. A
+    radius query reads only the cells that can reach the circle - looked up
+    directly when its bounding box is small, otherwise by comparing the
+    circle with every occupied cell's center and radius - and computes exact
+    haversine distances for the points in them.
+    """
+
+    def __init__(self, ids, lats, lons, cell_degrees: float = 0.1):
+        self.cell_degrees = cell_degrees
+        self._lon_cells = math.ceil(360 / cell_degrees)
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        keys = self._cell_keys(lats, lons)
+        order = np.argsort(keys, kind="stable")
+        self.ids = np.asarray(ids)[order]
+        self.lats, self.lons = lats[order], lons[order]
+        keys = keys[order]
+        cells, starts = np.unique(keys, return_index=True)
+        ends = np.append(starts[1:], len(keys))
+        self._cells = dict(zip(cells.tolist(), zip(starts.tolist(), ends.tolist())))
+        self._starts, self._ends = starts, ends
+
+        # Center of each occupied cell and the farthest any point in it can be
+        south = (cells // self._lon_cells) * cell_degrees - 90
+        west = (cells % self._lon_cells) * cell_degrees - 180
+        self._center_lats = np.minimum(south + cell_degrees / 2, 90)
+        self._center_lons = west + cell_degrees / 2
+        north = np.minimum(south + cell_degrees, 90)
+        self._cell_radii = np.max(
+            [
+                haversine_miles(self._center_lats, self._center_lons, lat, lon)
+                for lat in (south, north)
+                for lon in (west, west + cell_degrees)
+            ],
+            axis=0,
+        ) * (1 + 1e-9)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _cell_keys(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        rows = np.floor((lats + 90) / self.cell_degrees).astype(np.int64)
+        columns = np.floor((lons + 180) / self.cell_degrees).astype(np.int64)
+        return rows * self._lon_cells + columns % self._lon_cells
+
+    def _cell_ranges(
+        self, lat: float, lon: float, miles: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Start and end positions of the cells that can hold points within ``miles``"""
+        lat_span = miles / MILES_PER_DEGREE
+        low, high = lat - lat_span, lat + lat_span
+        # Longitude half-width of the circle's bounding box at its center
+        ratio = math.sin(min(miles / EARTH_RADIUS_MILES, math.pi / 2)) / max(
+            math.cos(math.radians(lat)), 1e-12
+        )
+        if low > -90 and high < 90 and ratio < 1:
+            lon_span = math.degrees(math.asin(ratio))
+            columns = range(
+                math.floor((lon - lon_span + 180) / self.cell_degrees),
+                math.floor((lon + lon_span + 180) / self.cell_degrees) + 1,
+            )
+            rows = range(
+                math.floor((low + 90) / self.cell_degrees),
+                math.floor((high + 90) / self.cell_degrees) + 1,
+            )
+            if len(rows) * len(columns) <= min(len(self._cells), 256):
+                cells, lon_cells = self._cells, self._lon_cells
+                ranges = [
+                    cells[key]
+                    for row in rows
+                    for column in columns
+                    if (key := row * lon_cells + column % lon_cells) in cells
+                ]
+                if not ranges:
+                    return np.empty(0, np.int64), np.empty(0, np.int64)
+                starts, ends = zip(*ranges)
+                return np.array(starts), np.array(ends)
+
+        nearest_possible = (
+            haversine_miles(lat, lon, self._center_lats, self._center_lons)
+            - self._cell_radii
+        )
+        reachable = nearest_possible <= miles
+        return self._starts[reachable], self._ends[reachable]
+
+    def within(
+        self, lat: float, lon: float, miles: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """IDs of the points within ``miles`` and their distances, nearest first"""
+        starts, ends = self._cell_ranges(lat, lon, miles)
+        if len(starts) == 1:
+            chosen = slice(starts[0], ends[0])
+        else:
+            # Positions of every point in the chosen cells, in one vectorized step
+            lengths = ends - starts
+            chosen = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+            chosen += np.arange(len(chosen))
+        distances = haversine_miles(lat, lon, self.lats[chosen], self.lons[chosen])
+        inside = distances <= miles
+        ids, distances = self.ids[chosen][inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return ids[order], distances[order]
+
+    def nearest(self, lat: float, lon: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """IDs of the ``k`` nearest points and their distances, nearest first"""
+        ids, distances = self.within(lat, lon, self.cell_degrees * MILES_PER_DEGREE)
+        if len(ids) >= k or not len(self):
+            return ids[:k], distances[:k]
+        # The smallest circle known to hold k points: the one reaching the far
+        # side of the cells whose farthest point is closest
+        farthest_possible = (
+            haversine_miles(lat, lon, self._center_lats, self._center_lons)
+            + self._cell_radii
+        )
+        order = np.argsort(farthest_possible)
+        covering = np.searchsorted(np.cumsum((self._ends - self._starts)[order]), k)
+        miles = farthest_possible[order[min(covering, len(order) - 1)]]
+        ids, distances = self.within(lat, lon, miles)
+        return ids[:k], distances[:k]
+
+
+class LocationIndex:
+    """A GeoGridIndex over a cached catalog's coordinates, kept current.
+
+    ``loader`` is re-read at most every ``refresh_interval`` seconds, and
+    the grid is only rebuilt when the IDs or coordinates it returns changed.
+    Rows without coordinates are left out.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], pd.DataFrame],
+        id_column: str,
+        cell_degrees: float,
+        refresh_interval: float,
+    ):
+        self.loader = loader
+        self.id_column = id_column
+        self.cell_degrees = cell_degrees
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._checked_at = -math.inf
+        self._digest = None
+        self._index: Optional[GeoGridIndex] = None
+        self._rows = pd.DataFrame()
+
+    def current(self) -> Tuple[Optional[GeoGridIndex], pd.DataFrame]:
+        """The grid and the catalog rows it was built from (indexed by ID)"""
+        with self._lock:
+            if time.monotonic() - self._checked_at >= self.refresh_interval:
+                self._checked_at = time.monotonic()
+                self._refresh()
+            return self._index, self._rows
+
+    def _refresh(self) -> None:
+        df = self.loader()
+        if df.empty:
+            self._index, self._rows, self._digest = None, pd.DataFrame(), None
+            return
+        ids = df[self.id_column].to_numpy(dtype=np.int64)
+        lats = pd.to_numeric(df["Latitude"], errors="coerce").to_numpy(dtype=float)
+        lons = pd.to_numeric(df["Longitude"], errors="coerce").to_numpy(dtype=float)
+        digest = hashlib.blake2b(
+            ids.tobytes() + lats.tobytes() + lons.tobytes()
+        ).digest()
+        if digest == self._digest:
+            return
+        located = ~(np.isnan(lats) | np.isnan(lons))
+        self._index = GeoGridIndex(
+            ids[located], lats[located], lons[located], self.cell_degrees
+        )
+        self._rows = df[located].set_index(self.id_column, drop=False)
+        self._digest = digest
+
+
+@cached(ttl=300, tags=lambda: ["lodging"], stale_ttl=CATALOG_STALE_TTL)
+def get_lodging_locations() -> pd.DataFrame:
+    """Every lodging's ID, park and coordinates (the park's, until it is geocoded)"""
+    query = """
+        SELECT l.Lodging_ID, l.Park_ID,
+               COALESCE(l.Latitude, p.Latitude) AS Latitude,
+               COALESCE(l.Longitude, p.Longitude) AS Longitude
+        FROM Lodging l
+        JOIN National_Park p ON p.Park_ID = l.Park_ID
+    """
+    results = execute_query(query)
+    return pd.DataFrame(results) if results else pd.DataFrame()
+
+
+@st.cache_resource
+def get_park_location_index() -> LocationIndex:
+    """Return the process-wide index of park locations"""
+    return LocationIndex(
+        get_park_catalog,
+        "Park_ID",
+        cell_degrees=1.0,
+        refresh_interval=float(get_config("GEO_INDEX_REFRESH", "60")),
+    )
+
+
+@st.cache_resource
+def get_lodging_location_index() -> LocationIndex:
+    """Return the process-wide index of lodging locations"""
+    return LocationIndex(
+        get_lodging_locations,
+        "Lodging_ID",
+        cell_degrees=0.1,
+        refresh_interval=float(get_config("GEO_INDEX_REFRESH", "60")),
+    )
+
+
+def nearest_parks(lat: float, lon: float, k: int = 5) -> pd.DataFrame:
+    """The ``k`` parks nearest to a point, nearest first, with Distance_Miles"""
+    index, parks = get_park_location_index().current()
+    if index is None:
+        return pd.DataFrame()
+    ids, distances = index.nearest(lat, lon, k)
+    return parks.loc[ids].assign(Distance_Miles=distances).reset_index(drop=True)
+
+
+def lodging_within(lat: float, lon: float, miles: float) -> pd.DataFrame:
+    """Lodgings (ID, park and coordinates) within ``miles`` of a point.
+
+    Nearest first, with Distance_Miles.
+    """
+    index, lodging = get_lodging_location_index().current()
+    if index is None:
+        return pd.DataFrame()
+    ids, distances = index.within(lat, lon, miles)
+    return lodging.loc[ids].assign(Distance_Miles=distances).reset_index(drop=True)
+
+
+# ==================== TRIP PLANNING ====================
+
+# Driving miles per great-circle mile, for legs between parks
+ROAD_DISTANCE_FACTOR = 1.3
+
+
+def distance_matrix(lats, lons) -> np.ndarray:
+    """Great-circle miles between every pair of points, as a square matrix"""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    return haversine_miles(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+
+
+def route_miles(route: np.ndarray, dist: np.ndarray) -> float:
+    """Length of a route given as matrix positions, in order"""
+    return float(dist[route[:-1], route[1:]].sum())
+
+
+def _nearest_neighbor_route(dist: np.ndarray, end: int) -> np.ndarray:
+    """Route from point 0 always to the closest unvisited stop, then to ``end``"""
+    unvisited = np.ones(len(dist), dtype=bool)
+    unvisited[[0, end]] = False
+    route = [0]
+    while unvisited.any():
+        candidates = np.flatnonzero(unvisited)
+        stop = candidates[np.argmin(dist[route[-1], candidates])]
+        route.append(stop)
+        unvisited[stop] = False
+    route.append(end)
+    return np.array(route)
+
+
+def _two_opt(route: np.ndarray, dist: np.ndarray) -> bool:
+    """Reverse the stretch of ``route`` that shortens it most, per start position.
+
+    The first and last positions stay put. Returns whether anything changed.
+    """
+    improved = False
+    for i in range(1, len(route) - 2):
+        j = np.arange(i + 1, len(route) - 1)
+        before, first = route[i - 1], route[i]
+        last, after = route[j], route[j + 1]
+        gains = (
+            dist[before, first] + dist[last, after]
+            - dist[before, last] - dist[first, after]
+        )
+        best = int(np.argmax(gains))
+        if gains[best] > 1e-9:
+            route[i : j[best] + 1] = route[i : j[best] + 1][::-1]
+            improved = True
+    return improved
+
+
+def _or_opt(route: np.ndarray, dist: np.ndarray, max_segment: int = 3) -> bool:
+    """Move short runs of stops (either way round) to where they fit best.
+
+    The first and last positions stay put. Returns whether anything changed.
+    """
+    improved = False
+    for length in range(1, max_segment + 1):
+        i = 1
+        while i + length < len(route):
+            segment = route[i : i + length]
+            first, last = segment[0], segment[-1]
+            before, after = route[i - 1], route[i + length]
+            removed = (
+                dist[before, first] + dist[last, after] - dist[before, after]
+            )
+            rest = np.concatenate([route[:i], route[i + length :]])
+            left, right = rest[:-1], rest[1:]
+            forward = dist[left, first] + dist[last, right] - dist[left, right]
+            backward = dist[left, last] + dist[first, right] - dist[left, right]
+            position = int(np.argmin(np.minimum(forward, backward)))
+            added = min(forward[position], backward[position])
+            if removed - added > 1e-9:
+                if backward[position] < forward[position]:
+                    segment = segment[::-1]
+                route[:] = np.concatenate(
+                    [rest[: position + 1], segment, rest[position + 1 :]]
+                )
+                improved = True
+            i += 1
+    return improved
+
+
+def _local_search(route: np.ndarray, dist: np.ndarray) -> np.ndarray:
+    """Apply 2-opt and Or-opt moves until neither shortens ``route``"""
+    while _two_opt(route, dist) | _or_opt(route, dist):
+        pass
+    return route
+
+
+def optimize_route(
+    dist: np.ndarray, round_trip: bool = False, kicks: int = 8, seed: int = 0
+) -> np.ndarray:
+    """A short route through every point of ``dist`` starting from point 0.
+
+    Nearest-neighbor construction, then 2-opt and Or-opt moves until
+    neither finds a shorter route. Each of ``kicks`` rounds then scrambles
+    the best route so far with a random double bridge (a move those two
+    cannot undo) and searches again from there. Returns the visiting
+    order of points 1..n; with ``round_trip`` the route is measured back
+    to point 0.
+    """
+    if len(dist) <= 2:
+        return np.arange(1, len(dist))
+    if round_trip:
+        end, extended = 0, dist
+    else:
+        # An open route ends anywhere: finish at a pinned extra point that is
+        # zero miles from every stop
+        end = len(dist)
+        extended = np.zeros((len(dist) + 1, len(dist) + 1))
+        extended[:-1, :-1] = dist
+    best = _local_search(_nearest_neighbor_route(extended, end), extended)
+    best_miles = route_miles(best, extended)
+    stops = len(best) - 2
+    rng = np.random.default_rng(seed)
+    for _ in range(kicks if stops >= 4 else 0):
+        a, b, c = np.sort(rng.choice(np.arange(2, stops + 1), 3, replace=False))
+        route = np.concatenate([best[:a], best[b:c], best[a:b], best[c:]])
+        route = _local_search(route, extended)
+        miles = route_miles(route, extended)
+        if miles < best_miles - 1e-9:
+            best, best_miles = route, miles
+    return best[1:-1]
+
+
+def plan_itinerary(
+    park_ids: List[int],
+    start: Tuple[float, float],
+    start_date: date,
+    end_date: date,
+    nights_per_park: int = 1,
+    num_rooms: int = 1,
+    round_trip: bool = False,
+    max_drive_hours: float = 8.0,
+    average_mph: float = 55.0,
+    parks_df: Optional[pd.DataFrame] = None,
+    availability: Optional[Callable[[int, date, date, int], pd.DataFrame]] = None,
+) -> Dict[str, Any]:
+    """Order a set of parks into a road trip and fit a stay at each into the dates.
+
+    Legs longer than ``max_drive_hours`` add nights on the road. Nights
+    left over in the window are shared out between the parks, and each
+    park stay gets the cheapest lodging with ``num_rooms`` free for all
+    of its nights (``availability`` defaults to get_available_lodging).
+    """
+    parks_df = get_park_catalog() if parks_df is None else parks_df
+    availability = availability or get_available_lodging
+    parks = parks_df.set_index("Park_ID", drop=False).loc[list(dict.fromkeys(park_ids))]
+    located = parks["Latitude"].notna() & parks["Longitude"].notna()
+    skipped = parks.loc[~located, "Park_Name"].tolist()
+    parks = parks[located]
+
+    lats = np.concatenate([[start[0]], parks["Latitude"].to_numpy(dtype=float)])
+    lons = np.concatenate([[start[1]], parks["Longitude"].to_numpy(dtype=float)])
+    dist = distance_matrix(lats, lons) * ROAD_DISTANCE_FACTOR
+    order = optimize_route(dist, round_trip)
+    points = np.concatenate([[0], order, [0] if round_trip else []]).astype(int)
+
+    leg_miles = dist[points[:-1], points[1:]]
+    leg_hours = leg_miles / average_mph
+    # Nights spent on the road before arriving at each stop
+    road_nights = np.maximum(np.ceil(leg_hours / max_drive_hours) - 1, 0).astype(int)
+    stay_nights = np.full(len(order), max(nights_per_park, 1))
+    nights_available = (end_date - start_date).days
+    spare = nights_available - int(road_nights.sum() + stay_nights.sum())
+    if spare > 0 and len(order):
+        stay_nights += spare // len(order)
+        stay_nights[: spare % len(order)] += 1
+
+    stops = []
+    day = start_date
+    for position, point in enumerate(order):
+        park = parks.iloc[point - 1]
+        check_in = day + timedelta(days=int(road_nights[position]))
+        check_out = check_in + timedelta(days=int(stay_nights[position]))
+        lodging = availability(int(park["Park_ID"]), check_in, check_out, num_rooms)
+        stop = {
+            "Park_ID": int(park["Park_ID"]),
+            "Park_Name": park["Park_Name"],
+            "State": park["State"],
+            "Latitude": float(park["Latitude"]),
+            "Longitude": float(park["Longitude"]),
+            "Drive_Miles": float(leg_miles[position]),
+            "Drive_Hours": float(leg_hours[position]),
+            "Nights_On_Road": int(road_nights[position]),
+            "Check_In": check_in,
+            "Check_Out": check_out,
+            "Nights": int(stay_nights[position]),
+            "Lodging_ID": None,
+            "Lodging_Name": None,
+            "Price_Per_Night": None,
+            "Lodging_Cost": 0.0,
+        }
+        if not lodging.empty:
+            cheapest = lodging.loc[lodging["Price_Per_Night"].astype(float).idxmin()]
+            stop.update(
+                Lodging_ID=int(cheapest["Lodging_ID"]),
+                Lodging_Name=cheapest["Lodging_Name"],
+                Price_Per_Night=float(cheapest["Price_Per_Night"]),
+                Lodging_Cost=calculate_total_cost(
+                    float(cheapest["Price_Per_Night"]), check_in, check_out, num_rooms
+                ),
+            )
+        stops.append(stop)
+        day = check_out
+
+    home_date = day
+    if round_trip and len(order):
+        home_date += timedelta(days=int(road_nights[-1]))
+    return {
+        "stops": stops,
+        "skipped": skipped,
+        "total_miles": float(leg_miles.sum()),
+        "drive_hours": float(leg_hours.sum()),
+        "return_miles": float(leg_miles[-1]) if round_trip and len(order) else 0.0,
+        "nights_needed": int(road_nights.sum() + stay_nights.sum()),
+        "nights_available": nights_available,
+        "fits": home_date <= end_date,
+        "end_date": home_date,
+        "lodging_cost": sum(stop["Lodging_Cost"] for stop in stops),
+        "unlodged": [s["Park_Name"] for s in stops if s["Lodging_ID"] is None],
+    }
+
+
+# ==================== RESERVATION INVENTORY ====================
+
+# Reservation statuses that hold rooms in Lodging_Inventory
+ROOM_HOLDING_STATUSES = ("confirmed", "pending")
+
+
+class RoomsUnavailableError(Exception):
+    """Raised inside a booking transaction when a stay cannot be booked"""
+
+
+def _reserve_rooms(
+    cursor, lodging_id: int, check_in: date, check_out: date, num_rooms: int
+) -> int:
+    """Lock the inventory rows for a stay and add ``num_rooms`` to every night.
+
+    Must run inside a transaction and returns the lodging's Park_ID. Rows
+    are created on first use and then locked in (Lodging_ID, Stay_Date)
+    order, so two bookings competing for the last room serialize and the
+    second one sees the first one's count.
+    """
+    if check_out <= check_in:
+        raise RoomsUnavailableError("Check-out must be after check-in")
+    cursor.execute(
+        "SELECT Park_ID, Total_Rooms FROM Lodging WHERE Lodging_ID = %s",
+        (lodging_id,),
+    )
+    lodging = cursor.fetchone()
+    if not lodging:
+        raise RoomsUnavailableError("Lodging no longer exists")
+
+    nights = [
+        check_in + timedelta(days=offset)
+        for offset in range((check_out - check_in).days)
+    ]
+    placeholders = ", ".join(["(%s, %s, %s, 0)"] * len(nights))
+    cursor.execute(
+        f"""
+        INSERT INTO Lodging_Inventory (Lodging_ID, Stay_Date, Park_ID, Rooms_Booked)
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE Rooms_Booked = Rooms_Booked
+        """,
+        tuple(
+            value
+            for night in nights
+            for value in (lodging_id, night, lodging["Park_ID"])
+        ),
+    )
+    cursor.execute(
+        """
+        SELECT Stay_Date, Rooms_Booked
+        FROM Lodging_Inventory
+        WHERE Lodging_ID = %s AND Stay_Date >= %s AND Stay_Date < %s
+        ORDER BY Stay_Date
+        FOR UPDATE
+        """,
+        (lodging_id, check_in, check_out),
+    )
+    for night in cursor.fetchall():
+        if night["Rooms_Booked"] + num_rooms > lodging["Total_Rooms"]:
+            rooms_left = max(lodging["Total_Rooms"] - night["Rooms_Booked"], 0)
+            raise RoomsUnavailableError(
+                f"Only {rooms_left} room(s) left on {night['Stay_Date']}"
+            )
+
+    cursor.execute(
+        """
+        UPDATE Lodging_Inventory
+        SET Rooms_Booked = Rooms_Booked + %s
+        WHERE Lodging_ID = %s AND Stay_Date >= %s AND Stay_Date < %s
+        """,
+        (num_rooms, lodging_id, check_in, check_out),
+    )
+    return lodging["Park_ID"]
+
+
+def _release_rooms(
+    cursor, lodging_id: int, check_in: date, check_out: date, num_rooms: int
+) -> None:
+    """Give ``num_rooms`` back for every night of a stay (inside a transaction)"""
+    cursor.execute(
+        """
+        UPDATE Lodging_Inventory
+        SET Rooms_Booked = GREATEST(Rooms_Booked - %s, 0)
+        WHERE Lodging_ID = %s AND Stay_Date >= %s AND Stay_Date < %s
+        """,
+        (num_rooms, lodging_id, check_in, check_out),
+    )
+
+
+def _lock_reservation(cursor, reservation_id: int) -> Optional[Dict]:
+    cursor.execute(
+        """
+        SELECT User_ID, Lodging_ID, Check_In_Date, Check_Out_Date, Number_Of_Rooms,
+               Reservation_Status
+        FROM Lodging_Reservation
+        WHERE Reservation_ID = %s
+        FOR UPDATE
+        """,
+        (reservation_id,),
+    )
+    return cursor.fetchone()
+
+
+def _lodging_park_id(cursor, lodging_id: int) -> int:
+    cursor.execute("SELECT Park_ID FROM Lodging WHERE Lodging_ID = %s", (lodging_id,))
+    return cursor.fetchone()["Park_ID"]
+
+
+def create_reservation(reservation: Dict[str, Any]) -> Optional[int]:
+    """Book rooms and insert a reservation in one transaction.
+
+    ``reservation`` maps Lodging_Reservation columns to values. Returns the
+    new Reservation_ID, or None if the stay is sold out or the insert fails.
+    """
+
+    def work(cursor):
+        if reservation["Reservation_Status"] in ROOM_HOLDING_STATUSES:
+            park_id = _reserve_rooms(
+                cursor,
+                reservation["Lodging_ID"],
+                reservation["Check_In_Date"],
+                reservation["Check_Out_Date"],
+                reservation["Number_Of_Rooms"],
+            )
+        else:
+            park_id = _lodging_park_id(cursor, reservation["Lodging_ID"])
+        columns = ", ".join(reservation.keys())
+        placeholders = ", ".join(["%s"] * len(reservation))
+        cursor.execute(
+            f"INSERT INTO Lodging_Reservation ({columns}) VALUES ({placeholders})",
+            tuple(reservation.values()),
+        )
+        return cursor.lastrowid, park_id
+
+    try:
+        reservation_id, park_id = run_in_transaction(work)
+        invalidate_cache(*reservation_tags(reservation.get("User_ID"), park_id))
+        return reservation_id
+    except RoomsUnavailableError as e:
+        st.error(f"❌ Cannot book this stay: {e}")
+        return None
+    except Error as e:
+        st.error(f"❌ Insert error: {e}")
+        return None
+
+
+def update_reservation(
+    reservation_id: int,
+    check_in: date,
+    check_out: date,
+    num_guests: int,
+    num_rooms: int,
+    total_cost: float,
+) -> bool:
+    """Move a reservation to new dates/rooms, re-booking its inventory atomically"""
+
+    def work(cursor):
+        current = _lock_reservation(cursor, reservation_id)
+        if not current:
+            raise RoomsUnavailableError("Reservation no longer exists")
+        if current["Reservation_Status"] in ROOM_HOLDING_STATUSES:
+            _release_rooms(
+                cursor,
+                current["Lodging_ID"],
+                current["Check_In_Date"],
+                current["Check_Out_Date"],
+                current["Number_Of_Rooms"],
+            )
+            _reserve_rooms(
+                cursor, current["Lodging_ID"], check_in, check_out, num_rooms
+            )
+        cursor.execute(
+            """
+            UPDATE Lodging_Reservation
+            SET Check_In_Date = %s, Check_Out_Date = %s,
+                Number_Of_Guests = %s, Number_Of_Rooms = %s,
+                Total_Cost = %s
+            WHERE Reservation_ID = %s
+            """,
+            (check_in, check_out, num_guests, num_rooms, total_cost, reservation_id),
+        )
+        return reservation_tags(
+            current["User_ID"], _lodging_park_id(cursor, current["Lodging_ID"])
+        )
+
+    try:
+        invalidate_cache(*run_in_transaction(work))
+        return True
+    except RoomsUnavailableError as e:
+        st.error(f"❌ Cannot book this stay: {e}")
+        return False
+    except Error as e:
+        st.error(f"❌ Update error: {e}")
+        return False
+
+
+def delete_reservation(reservation_id: int) -> bool:
+    """Delete a reservation and return its rooms to inventory"""
+
+    def work(cursor):
+        current = _lock_reservation(cursor, reservation_id)
+        if not current:
+            return []
+        if current["Reservation_Status"] in ROOM_HOLDING_STATUSES:
+            _release_rooms(
+                cursor,
+                current["Lodging_ID"],
+                current["Check_In_Date"],
+                current["Check_Out_Date"],
+                current["Number_Of_Rooms"],
+            )
+        cursor.execute(
+            "DELETE FROM Lodging_Reservation WHERE Reservation_ID = %s",
+            (reservation_id,),
+        )
+        return reservation_tags(
+            current["User_ID"], _lodging_park_id(cursor, current["Lodging_ID"])
+        )
+
+    try:
+        invalidate_cache(*run_in_transaction(work))
+        return True
+    except Error as e:
+        st.error(f"❌ Delete error: {e}")
+        return False
+
+
+# ==================== HELPER FUNCTIONS ====================
+
+
+class ConfirmationNumberAllocator:
+    """Hands out reservation sequence numbers without a round trip per booking.
+
+    Numbers are claimed from the Confirmation_Sequence table in blocks of
+    ``block_size`` with a single atomic ``UPDATE ... LAST_INSERT_ID()``, so
+    blocks never overlap between threads, processes or replicas. Numbers
+    within a block are then handed out from memory. Unused numbers from a
+    block are lost when the process exits, which only leaves gaps.
+    """
+
+    def __init__(self, block_size: int = 50, sequence_name: str = "reservation"):
+        self.block_size = block_size
+        self.sequence_name = sequence_name
+        self._lock = threading.Lock()
+        self._next_value = 0
+        self._block_end = 0
+
+    def _claim_block(self) -> int:
+        def work(connection):
+            cursor = InstrumentedCursor(connection.cursor())
+            try:
+                cursor.execute(
+                    """
+                    UPDATE Confirmation_Sequence
+                    SET Next_Value = LAST_INSERT_ID(Next_Value) + %s
+                    WHERE Sequence_Name = %s
+                    """,
+                    (self.block_size, self.sequence_name),
+                )
+                if cursor.rowcount != 1:
+                    raise Error(
+                        msg=f"Confirmation sequence '{self.sequence_name}' is missing"
+                    )
+                cursor.execute("SELECT LAST_INSERT_ID()")
+                return cursor.fetchone()[0]
+            finally:
+                cursor.close()
+
+        return get_connection_pool().run(work)
+
+    def next_value(self) -> int:
+        """Return the next unused sequence number"""
+        with self._lock:
+            if self._next_value >= self._block_end:
+                self._next_value = self._claim_block()
+                self._block_end = self._next_value + self.block_size
+            value = self._next_value
+            self._next_value += 1
+            return value
+
+
+@st.cache_resource
+def get_confirmation_allocator() -> ConfirmationNumberAllocator:
+    """Return the process-wide confirmation number allocator"""
+    return ConfirmationNumberAllocator(
+        block_size=int(get_config("CONFIRMATION_BLOCK_SIZE", "50"))
+    )
+
+
+def generate_confirmation_number() -> Optional[str]:
+    """Generate confirmation number in format RES-YYYYMMDD-NNNNNN"""
+    date_part = datetime.now().strftime("%Y%m%d")
+    try:
+        next_id = get_confirmation_allocator().next_value()
+    except Error as e:
+        st.error(f"❌ Could not allocate a confirmation number: {e}")
+        return None
+    return f"RES-{date_part}-{next_id:06d}"
+
+
+def calculate_total_cost(
+    price_per_night: float, check_in: date, check_out: date, num_rooms: int
+) -> float:
+    """Calculate total cost for reservation"""
+    num_nights = (check_out - check_in).days
+    return price_per_night * num_nights * num_rooms
+
+
+def display_star_rating(rating: float) -> str:
+    """Convert numeric rating to star display"""
+    full_stars = int(rating)
+    half_star = 1 if rating - full_stars >= 0.5 else 0
+    empty_stars = 5 - full_stars - half_star
+    return "⭐" * full_stars + "✨" * half_star + "☆" * empty_stars
+
+
+# ==================== SQL VALIDATION ====================
+
+# Tables and columns ParkBot-generated SQL may read (User.Password_Hash is
+# deliberately left out)
+PARKBOT_SCHEMA = {
+    "National_Park": (
+        "Park_ID", "Park_Name", "State", "Region", "Description",
+        "Wildlife_Information", "Plant_Information", "Area_Square_Miles",
+        "Annual_Visitors", "Best_Time_To_Visit", "Entry_Fee", "Free_Entry_Days",
+        "Official_Website", "Latitude", "Longitude", "Park_Activities_Events",
+        "Popular_Park_Trails", "Difficulty_Rating", "Kid_Friendliness_Rating",
+        "Pet_Friendliness_Rating",
+    ),
+    "Lodging": (
+        "Lodging_ID", "Park_ID", "Lodging_Name", "Lodging_Type", "Address", "City",
+        "State", "Zip_Code", "Description", "Amenities", "Price_Per_Night",
+        "Contact_Phone", "Contact_Email", "Distance_From_Park_Miles", "Star_Rating",
+        "Total_Rooms", "Latitude", "Longitude",
+    ),
+    "Lodging_Reservation": (
+        "Reservation_ID", "User_ID", "Lodging_ID", "Check_In_Date", "Check_Out_Date",
+        "Number_Of_Guests", "Number_Of_Rooms", "Guest_Name", "Guest_Phone",
+        "Guest_Email", "Confirmation_Number", "Reservation_Status", "Total_Cost",
+        "Created_At",
+    ),
+    "Park_Review": (
+        "Review_ID", "User_ID", "Park_ID", "Rating", "Review_Text", "Visit_Date",
+        "Review_Date", "Photo_URLs",
+    ),
+    "User": (
+        "User_ID", "Email", "First_Name", "Last_Name", "Phone_Number",
+        "Created_At", "Updated_At",
+    ),
+    "Park_Rating_Summary": (
+        "Park_ID", "Review_Count", "Rating_Sum", "Rating_1_Count", "Rating_2_Count",
+        "Rating_3_Count", "Rating_4_Count", "Rating_5_Count", "Average_Rating",
+        "Min_Rating", "Max_Rating", "Updated_At",
+    ),
+    "v_park_ratings": (
+        "Park_ID", "Park_Name", "State", "Total_Reviews", "Average_Rating",
+        "Min_Rating", "Max_Rating",
+    ),
+}
+
+PARKBOT_SCHEMA_COLUMNS = {
+    table.upper(): {column.upper() for column in columns}
+    for table, columns in PARKBOT_SCHEMA.items()
+}
+
+# Real columns left out of PARKBOT_SCHEMA. SELECT * and alias.* are rejected
+# on these tables, since they would return the hidden columns too.
+PARKBOT_HIDDEN_COLUMNS = {"User": ("Password_Hash",)}
+
+# Functions generated SQL may call; SLEEP, BENCHMARK, LOAD_FILE and friends
+# are rejected simply by not being listed
+ALLOWED_SQL_FUNCTIONS = {
+    "ABS", "AVG", "CAST", "CEIL", "CEILING", "CHAR_LENGTH", "COALESCE", "CONCAT",
+    "CONCAT_WS", "CONVERT", "COUNT", "CURDATE", "CURRENT_DATE", "CURRENT_TIMESTAMP",
+    "DATE", "DATEDIFF", "DATE_ADD", "DATE_FORMAT", "DATE_SUB", "DAY", "DAYNAME",
+    "DAYOFWEEK", "DENSE_RANK", "EXTRACT", "FIELD", "FLOOR", "FORMAT", "GREATEST",
+    "GROUP_CONCAT", "IF", "IFNULL", "INSTR", "LAG", "LEAD", "LEAST", "LEFT",
+    "LENGTH", "LOCATE", "LOWER", "LPAD", "LTRIM", "MAX", "MIN", "MOD", "MONTH",
+    "MONTHNAME", "NOW", "NULLIF", "PERCENT_RANK", "POWER", "QUARTER", "RANK",
+    "REPLACE", "RIGHT", "ROUND", "ROW_NUMBER", "RPAD", "RTRIM", "SQRT", "STDDEV",
+    "SUBSTR", "SUBSTRING", "SUBSTRING_INDEX", "SUM", "TIMESTAMPDIFF", "TRIM",
+    "TRUNCATE", "UPPER", "VARIANCE", "WEEK", "YEAR",
+    # Type names that take a length, e.g. CAST(x AS DECIMAL(10, 2))
+    "CHAR", "DECIMAL",
+}
+
+# Keywords that may appear in a read-only SELECT
+SQL_KEYWORDS = {
+    "ALL", "AND", "ANY", "AS", "ASC", "BETWEEN", "BINARY", "BY", "CASE", "CHAR",
+    "CROSS", "CURRENT", "CURRENT_DATE", "CURRENT_TIMESTAMP", "DATE", "DATETIME",
+    "DAY", "DECIMAL", "DESC", "DISTINCT", "DIV", "DOUBLE", "ELSE", "END", "ESCAPE",
+    "EXISTS", "FALSE", "FIRST", "FOLLOWING", "FROM", "FULL", "GROUP", "HAVING",
+    "HOUR", "IN", "INNER", "INTEGER", "INTERVAL", "IS", "JOIN", "LAST", "LEFT",
+    "LIKE", "LIMIT", "MINUTE", "MOD", "MONTH", "NATURAL", "NOT", "NULL", "OFFSET",
+    "ON", "OR", "ORDER", "OUTER", "OVER", "PARTITION", "PRECEDING", "QUARTER",
+    "RANGE", "RECURSIVE", "REGEXP", "RIGHT", "RLIKE", "ROW", "ROWS", "SECOND",
+    "SELECT", "SEPARATOR", "SIGNED", "SOME", "STRAIGHT_JOIN", "THEN", "TIME",
+    "TRUE", "UNBOUNDED", "UNION", "UNSIGNED", "USING", "WEEK", "WHEN", "WHERE",
+    "WINDOW", "WITH", "XOR", "YEAR",
+}
+
+# Keywords that write, lock, export data or change session state
+FORBIDDEN_SQL_KEYWORDS = {
+    "ALTER", "ANALYZE", "CALL", "CREATE", "DEALLOCATE", "DELETE", "DO", "DROP",
+    "DUMPFILE", "EXEC", "EXECUTE", "GRANT", "HANDLER", "INSERT", "INTO", "KILL",
+    "LOAD", "LOCK", "OUTFILE", "PREPARE", "PROCEDURE", "RENAME", "REVOKE", "SET",
+    "SHARE", "SHOW", "SHUTDOWN", "UNLOCK", "UPDATE", "USE",
+}
+
+# Keywords that end a FROM clause's list of table references
+FROM_CLAUSE_TERMINATORS = {
+    "WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "UNION", "WINDOW", "ON", "USING",
+}
+
+# Keywords that end a whole FROM clause, joins included
+SELECT_CLAUSES_AFTER_FROM = FROM_CLAUSE_TERMINATORS - {"ON", "USING"}
+
+SQL_TOKEN_RE = re.compile(
+    r"""
+      (?P<space>\s+)
+    | (?P<comment>--(?=\s|$)[^\n]*|\#[^\n]*|/\*.*?\*/)
+    | (?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+    | (?P<quoted>`(?:[^`]|``)+`)
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<name>[A-Za-z_][A-Za-z0-9_$]*)
+    | (?P<op><=>|>=|<=|<>|!=|\|\||&&|[(),.;*+\-/%=<>!&|^~])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+class SQLValidationError(Exception):
+    """Raised by the SQL tokenizer/validator with the reason for rejection"""
+
+
+def tokenize_sql(sql: str) -> List[Tuple[str, str]]:
+    """Split SQL into (kind, value) tokens, dropping whitespace and comments.
+
+    Names are upper-cased; quoted identifiers are returned without their
+    backticks as kind ``quoted``. Raises SQLValidationError on characters
+    that cannot appear in a plain SELECT (variables, placeholders, ...).
+    """
+    tokens = []
+    position = 0
+    while position < len(sql):
+        match = SQL_TOKEN_RE.match(sql, position)
+        if not match:
+            raise SQLValidationError(f"Unexpected character {sql[position]!r}")
+        kind = match.lastgroup
+        value = match.group()
+        position = match.end()
+        if kind == "space":
+            continue
+        if kind == "comment":
+            if value.startswith(("/*!", "/*+")):
+                raise SQLValidationError("Executable comments and hints are not allowed")
+            continue
+        if kind == "name":
+            value = value.upper()
+        elif kind == "quoted":
+            value = value[1:-1].replace("``", "`").upper()
+        tokens.append((kind, value))
+    return tokens
+
+
+def _matching_paren(tokens: List[Tuple[str, str]], start: int) -> int:
+    """Return the index of the ')' that closes the '(' at ``start``"""
+    depth = 0
+    for index in range(start, len(tokens)):
+        if tokens[index] == ("op", "("):
+            depth += 1
+        elif tokens[index] == ("op", ")"):
+            depth -= 1
+            if depth == 0:
+                return index
+    raise SQLValidationError("Unbalanced parentheses")
+
+
+def _is_identifier(token: Tuple[str, str]) -> bool:
+    kind, value = token
+    return kind == "quoted" or (
+        kind == "name" and value not in SQL_KEYWORDS and value not in FROM_CLAUSE_TERMINATORS
+    )
+
+
+def _parse_sql_references(tokens: List[Tuple[str, str]]):
+    """Find CTEs, table references and aliases in a tokenized SELECT.
+
+    Returns (tables, names, definitions): ``tables`` maps every usable table
+    name or alias to its base table (None for CTEs and derived tables),
+    ``names`` holds column aliases and CTE column names, and ``definitions``
+    are the token positions that define a table reference or alias.
+    """
+    tables: Dict[str, Optional[str]] = {}
+    names = set()
+    definitions = set()
+    in_from = {}  # paren depth -> inside a FROM clause's table list
+    depth = 0
+    count = len(tokens)
+
+    def token(index):
+        return tokens[index] if index < count else ("", "")
+
+    def read_alias(index: int) -> int:
+        """Consume an optional ``[AS] alias`` at index; return the next index"""
+        if token(index) == ("name", "AS"):
+            index += 1
+        if index < count and _is_identifier(tokens[index]) and token(index + 1) != ("op", "("):
+            definitions.add(index)
+            return index + 1
+        return index
+
+    index = 0
+    while index < count:
+        kind, value = tokens[index]
+
+        if (kind, value) == ("op", "("):
+            depth += 1
+        elif (kind, value) == ("op", ")"):
+            in_from.pop(depth, None)
+            depth -= 1
+
+        # CTE: name [(columns)] AS ( ... )
+        elif (
+            _is_identifier(tokens[index])
+            and token(index - 1) in (("name", "WITH"), ("name", "RECURSIVE"), ("op", ","))
+            and not in_from.get(depth)
+        ):
+            after = index + 1
+            if token(after) == ("op", "("):
+                close = _matching_paren(tokens, after)
+                names.update(v for k, v in tokens[after + 1 : close] if k in ("name", "quoted"))
+                after = close + 1
+            if token(after) == ("name", "AS") and token(after + 1) == ("op", "("):
+                tables[value] = None
+                definitions.add(index)
+
+        elif kind == "name" and value in ("FROM", "JOIN"):
+            in_from[depth] = True
+            reference = index + 1
+            while True:
+                if token(reference) == ("op", "("):
+                    # Derived table: validated as part of the main scan
+                    close = _matching_paren(tokens, reference)
+                    alias_end = read_alias(close + 1)
+                    if alias_end > close + 1:
+                        tables[tokens[alias_end - 1][1]] = None
+                    break
+                if not (_is_identifier(token(reference)) or token(reference)[0] == "name"):
+                    break
+                table_name = token(reference)[1]
+                if token(reference + 1) == ("op", "."):
+                    raise SQLValidationError("Schema-qualified table names are not allowed")
+                if table_name not in PARKBOT_SCHEMA_COLUMNS and table_name not in tables:
+                    raise SQLValidationError(f"Table {table_name} is not allowed")
+                base_table = table_name if table_name in PARKBOT_SCHEMA_COLUMNS else None
+                tables.setdefault(table_name, base_table)
+                definitions.add(reference)
+                alias_end = read_alias(reference + 1)
+                if alias_end > reference + 1:
+                    tables[tokens[alias_end - 1][1]] = base_table
+                # Comma-separated table list: FROM a, b
+                if token(alias_end) == ("op", ",") and value == "FROM":
+                    reference = alias_end + 1
+                    continue
+                index = alias_end - 1
+                break
+
+        elif kind == "name" and value in FROM_CLAUSE_TERMINATORS:
+            in_from[depth] = False
+
+        elif (kind, value) == ("name", "AS"):
+            if _is_identifier(token(index + 1)) and token(index + 2) != ("op", "("):
+                names.add(token(index + 1)[1])
+                definitions.add(index + 1)
+
+        # Column alias without AS: "AVG(Rating) avg_rating," or "... END label FROM"
+        elif (
+            _is_identifier(tokens[index])
+            and index not in definitions
+            and (
+                token(index - 1) in (("op", ")"), ("name", "END"))
+                or token(index - 1)[0] in ("number", "string")
+                or (_is_identifier(token(index - 1)) and index >= 2)
+            )
+            and token(index + 1) in (("op", ","), ("op", ")"), ("name", "FROM"), ("", ""))
+        ):
+            names.add(value)
+            definitions.add(index)
+
+        index += 1
+
+    if depth != 0:
+        raise SQLValidationError("Unbalanced parentheses")
+    return tables, names, definitions
+
+
+def _star_tables(
+    tokens: List[Tuple[str, str]],
+    index: int,
+    tables: Dict[str, Optional[str]],
+    definitions: set,
+) -> Optional[List[Optional[str]]]:
+    """Base tables read by the ``*`` at ``index`` (None for CTEs and derived
+    tables), or None if that ``*`` is a multiplication or COUNT(*)."""
+    previous = tokens[index - 1] if index else ("", "")
+    if previous == ("op", "."):
+        return [tables.get(tokens[index - 2][1])]
+    if previous not in (
+        ("name", "SELECT"), ("name", "DISTINCT"), ("name", "ALL"), ("op", ",")
+    ):
+        return None
+
+    # An unqualified * reads every table in its own select's FROM clause
+    depth, position = 0, index + 1
+    while position < len(tokens) and not (
+        depth == 0 and tokens[position] == ("name", "FROM")
+    ):
+        depth += {("op", "("): 1, ("op", ")"): -1}.get(tokens[position], 0)
+        if depth < 0:
+            return []
+        position += 1
+    read = []
+    for position in range(position + 1, len(tokens)):
+        kind, value = tokens[position]
+        depth += {("op", "("): 1, ("op", ")"): -1}.get((kind, value), 0)
+        if depth < 0 or (depth == 0 and value in SELECT_CLAUSES_AFTER_FROM):
+            break
+        if depth == 0 and position in definitions and value in tables:
+            read.append(tables[value])
+    return read
+
+
+@functools.lru_cache(maxsize=4096)
+def check_sql_safety(sql: str) -> Optional[str]:
+    """Validate generated SQL; return the reason it is unsafe, or None if safe.
+
+    The query is tokenized once and must be a single SELECT (optionally
+    with CTEs) that reads only allow-listed tables, columns and functions,
+    with no INTO OUTFILE, locking clauses, variables or executable comments.
+    """
+    try:
+        tokens = tokenize_sql(sql)
+        while tokens and tokens[-1] == ("op", ";"):
+            tokens.pop()
+        if not tokens:
+            return "Empty query"
+        if ("op", ";") in tokens:
+            return "Multiple statements are not allowed"
+
+        first = next((t for t in tokens if t != ("op", "(")), ("", ""))
+        if first not in (("name", "SELECT"), ("name", "WITH")):
+            return "Only SELECT statements are allowed"
+
+        for kind, value in tokens:
+            if kind == "name" and value in FORBIDDEN_SQL_KEYWORDS:
+                return f"{value} is not allowed"
+
+        tables, names, definitions = _parse_sql_references(tokens)
+        allowed_columns = set(names)
+        for base_table in set(tables.values()):
+            if base_table:
+                allowed_columns |= PARKBOT_SCHEMA_COLUMNS[base_table]
+        partial_tables = {table.upper() for table in PARKBOT_HIDDEN_COLUMNS}
+
+        for index, (kind, value) in enumerate(tokens):
+            if (kind, value) == ("op", "*"):
+                read = _star_tables(tokens, index, tables, definitions) or ()
+                for base_table in partial_tables.intersection(read):
+                    return f"SELECT * is not allowed on {base_table}; list the columns"
+                continue
+            if kind not in ("name", "quoted") or index in definitions:
+                continue
+            next_token = tokens[index + 1] if index + 1 < len(tokens) else ("", "")
+            previous = tokens[index - 1] if index else ("", "")
+
+            if next_token == ("op", "(") and kind == "name":
+                if value not in SQL_KEYWORDS and value not in ALLOWED_SQL_FUNCTIONS:
+                    return f"Function {value}() is not allowed"
+                continue
+            if kind == "name" and (value in SQL_KEYWORDS or value in FROM_CLAUSE_TERMINATORS):
+                continue
+
+            if previous == ("op", "."):
+                qualifier = tokens[index - 2][1]
+                base_table = tables.get(qualifier)
+                # A CTE or derived table exposes only what its own select
+                # list may read: allow-listed columns and aliases
+                exposed = allowed_columns
+                if base_table:
+                    exposed = PARKBOT_SCHEMA_COLUMNS[base_table]
+                if value not in exposed:
+                    return f"Column {qualifier}.{value} is not allowed"
+                continue
+            if next_token == ("op", "."):
+                if value not in tables:
+                    return f"Unknown table or alias {value}"
+                continue
+            if value not in allowed_columns and value not in tables:
+                return f"Column {value} is not allowed"
+    except SQLValidationError as e:
+        return str(e)
+
+    return None
+
+
+def validate_sql_safety(sql: str) -> bool:
+    """Check if SQL query is safe (single read-only SELECT on allowed schema)"""
+    return check_sql_safety(sql) is None
+
+
+# ==================== PARKBOT ====================
+
+PARKBOT_MODEL = "gpt-4-turbo-preview"
+
+PARKBOT_SYSTEM_PROMPT = """
+You are a helpful SQL query generator for the ParkPal database.
+
+Database schema:
+- National_Park: Park_ID, Park_Name, State, Region, Description, Annual_Visitors, Best_Time_To_Visit, Entry_Fee, Difficulty_Rating, Kid_Friendliness_Rating, Pet_Friendliness_Rating, and more
+- Lodging: Lodging_ID, Park_ID, Lodging_Name, Lodging_Type, Price_Per_Night, Distance_From_Park_Miles, Star_Rating, Amenities, and more
+- Park_Review: Review_ID, User_ID, Park_ID, Rating, Review_Text, Visit_Date, Review_Date
+- Lodging_Reservation: Reservation_ID, User_ID, Lodging_ID, Check_In_Date, Check_Out_Date, Reservation_Status, Total_Cost
+- User: User_ID, First_Name, Last_Name, Email
+- Park_Rating_Summary: Park_ID, Review_Count, Average_Rating, Min_Rating, Max_Rating (one row per reviewed park, kept current automatically)
+
+For park ratings or review counts, read Park_Rating_Summary instead of aggregating Park_Review.
+Generate ONLY SELECT queries. Never use INSERT, UPDATE, DELETE, DROP, or other modifying commands.
+Return valid MySQL syntax. Join tables when needed for better results.
+Limit results to 100 rows maximum.
+
+Return only the SQL query without explanation or markdown formatting.
+"""
+
+PARKBOT_EXPLAIN_PROMPT = "Explain what this SQL query does in simple terms."
+
+# Cached answers are only reused while the prompt and model are unchanged
+PARKBOT_SCHEMA_VERSION = hashlib.sha256(
+    f"{PARKBOT_MODEL}\n{PARKBOT_SYSTEM_PROMPT}".encode()
+).hexdigest()[:16]
+
+PARKBOT_EXAMPLE_QUESTIONS = [
+    "What are the top 5 most visited national parks?",
+    "Show me all lodging options under $150 per night",
+    "Which parks have the highest average ratings?",
+    "Find all campgrounds in Utah",
+    "What are the best parks to visit in summer?",
+    "Show me reviews for Yellowstone with ratings above 4",
+]
+
+
+class OpenAIModelClient:
+    """Chat completion client backed by the OpenAI API"""
+
+    def __init__(self, model: str = PARKBOT_MODEL):
+        self.model = model
+
+    def complete(
+        self, messages: List[Dict[str, str]], max_tokens: int, temperature: float = 0.3
+    ) -> str:
+        started = time.perf_counter()
+        response = openai.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        usage = response.usage
+        get_metrics().observe_model(
+            "complete",
+            time.perf_counter() - started,
+            usage.prompt_tokens if usage else 0,
+            usage.completion_tokens if usage else 0,
+        )
+        return response.choices[0].message.content
+
+    def stream(
+        self, messages: List[Dict[str, str]], max_tokens: int, temperature: float = 0.3
+    ) -> Iterator[str]:
+        """Yield the completion piece by piece as the model produces it"""
+        started = time.perf_counter()
+        response = openai.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        usage = None
+        for chunk in response:
+            # The final chunk carries token usage and no choices
+            usage = chunk.usage or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        get_metrics().observe_model(
+            "stream",
+            time.perf_counter() - started,
+            usage.prompt_tokens if usage else 0,
+            usage.completion_tokens if usage else 0,
+        )
 
-        if fetch == "all":
-            result = cursor.fetchall()
-        elif fetch == "one":
-            result = cursor.fetchone()
-        else:
-            result = cursor.fetchmany(fetch)
 
-        cursor.close()
-        connection.close()
-        return result
-    except Error as e:
-        st.error(f"❌ Query execution error: {e}")
-        if connection:
-            connection.close()
-        return None
+class StubModelClient:
+    """Offline stand-in for the model, for tests, benchmarks and local runs.
 
+    Answers the example questions with canned SQL and anything else with a
+    simple park listing. ``latency`` seconds are slept per call to mimic a
+    real model round trip.
+    """
 
-def execute_insert(query: str, params: tuple) -> Optional[int]:
-    """Execute INSERT query and return last inserted ID"""
-    connection = get_db_connection()
-    if not connection:
-        return None
+    CANNED_SQL = {
+        "what are the top 5 most visited national parks": (
+            "SELECT Park_Name, State, Annual_Visitors FROM National_Park "
+            "ORDER BY Annual_Visitors DESC LIMIT 5"
+        ),
+        "show me all lodging options under $150 per night": (
+            "SELECT Lodging_Name, Lodging_Type, Price_Per_Night FROM Lodging "
+            "WHERE Price_Per_Night < 150 ORDER BY Price_Per_Night LIMIT 100"
+        ),
+        "which parks have the highest average ratings": (
+            "SELECT np.Park_Name, s.Average_Rating, s.Review_Count "
+            "FROM National_Park np JOIN Park_Rating_Summary s ON np.Park_ID = s.Park_ID "
+            "ORDER BY s.Average_Rating DESC LIMIT 10"
+        ),
+        "find all campgrounds in utah": (
+            "SELECT Lodging_Name, City, Price_Per_Night FROM Lodging "
+            "WHERE Lodging_Type = 'Campground' AND State = 'Utah' LIMIT 100"
+        ),
+        "what are the best parks to visit in summer": (
+            "SELECT Park_Name, State, Best_Time_To_Visit FROM National_Park "
+            "WHERE Best_Time_To_Visit LIKE '%Summer%' LIMIT 100"
+        ),
+        "show me reviews for yellowstone with ratings above 4": (
+            "SELECT pr.Rating, pr.Review_Text, pr.Visit_Date FROM Park_Review pr "
+            "JOIN National_Park np ON pr.Park_ID = np.Park_ID "
+            "WHERE np.Park_Name LIKE '%Yellowstone%' AND pr.Rating > 4 LIMIT 100"
+        ),
+    }
 
-    try:
-        cursor = connection.cursor()
-        cursor.execute(query, params)
-        connection.commit()
-        last_id = cursor.lastrowid
-        cursor.close()
-        connection.close()
-        return last_id
-    except Error as e:
-        st.error(f"❌ Insert error: {e}")
-        if connection:
-            connection.rollback()
-            connection.close()
-        return None
+    DEFAULT_SQL = "SELECT Park_Name, State FROM National_Park ORDER BY Park_Name LIMIT 100"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def _answer(self, messages: List[Dict[str, str]]) -> str:
+        self.calls += 1
+        prompt = messages[-1]["content"]
+        if messages[0]["content"] == PARKBOT_EXPLAIN_PROMPT:
+            return f"This query reads from the ParkPal database: {prompt}"
+        question = normalize_question(prompt.removeprefix("Generate SQL query for: "))
+        return self.CANNED_SQL.get(question, self.DEFAULT_SQL)
+
+    def complete(
+        self, messages: List[Dict[str, str]], max_tokens: int, temperature: float = 0.3
+    ) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._answer(messages)
+
+    def stream(
+        self, messages: List[Dict[str, str]], max_tokens: int, temperature: float = 0.3
+    ) -> Iterator[str]:
+        words = self._answer(messages).split(" ")
+        for i, word in enumerate(words):
+            if self.latency:
+                time.sleep(self.latency / len(words))
+            yield word if i == 0 else f" {word}"
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for cache lookups (case, spacing, end punctuation)"""
+    return " ".join(question.lower().split()).rstrip("?.! ")
+
+
+# Parts of a question that change its SQL however similar the rest is:
+# numbers, written as digits or words, and quoted text
+QUESTION_LITERAL_RE = re.compile(
+    r"""\d+(?:[.,]\d+)*|'[^']*'|"[^"]*"|\b(?:zero|one|two|three|four|five|six|seven|"""
+    r"""eight|nine|ten|eleven|twelve|thirteen|fourteen|fifteen|sixteen|seventeen|"""
+    r"""eighteen|nineteen|twenty|thirty|forty|fifty|sixty|seventy|eighty|ninety|"""
+    r"""hundred|thousand|million|dozen)\b"""
+)
 
 
-def execute_update(query: str, params: tuple) -> bool:
-    """Execute UPDATE query and return success status"""
-    connection = get_db_connection()
-    if not connection:
-        return False
+def question_literals(question: str) -> List[str]:
+    """The numbers and quoted text in a question, in order"""
+    return QUESTION_LITERAL_RE.findall(normalize_question(question))
 
-    try:
-        cursor = connection.cursor()
-        cursor.execute(query, params)
-        connection.commit()
-        cursor.close()
-        connection.close()
-        return True
-    except Error as e:
-        st.error(f"❌ Update error: {e}")
-        if connection:
-            connection.rollback()
-            connection.close()
-        return False
 
+class ParkBotCache:
+    """Persistent SQLite cache of ParkBot answers, shared by all sessions.
 
-def execute_delete(query: str, params: tuple) -> bool:
-    """Execute DELETE query and return success status"""
-    connection = get_db_connection()
-    if not connection:
-        return False
+    Entries are keyed on the normalized question and PARKBOT_SCHEMA_VERSION
+    and hold the generated SQL, its explanation and optionally the result
+    rows, with whether they were capped. Entries expire after ``ttl``
+    seconds (result rows after ``results_ttl``) and the least recently used
+    ones are evicted beyond ``max_entries``.
+    """
 
-    try:
-        cursor = connection.cursor()
-        cursor.execute(query, params)
-        connection.commit()
-        cursor.close()
-        connection.close()
-        return True
-    except Error as e:
-        st.error(f"❌ Delete error: {e}")
-        if connection:
-            connection.rollback()
-            connection.close()
-        return False
+    def __init__(
+        self,
+        path: str,
+        ttl: float = 86400,
+        max_entries: int = 5000,
+        results_ttl: float = 0,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.results_ttl = results_ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS parkbot_cache (
+                cache_key TEXT PRIMARY KEY,
+                question TEXT NOT NULL,
+                generated_sql TEXT,
+                explanation TEXT,
+                results_json TEXT,
+                results_at REAL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_parkbot_last_used ON parkbot_cache (last_used_at)"
+        )
+        self._db.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(question: str) -> str:
+        normalized = normalize_question(question)
+        return hashlib.sha256(
+            f"{PARKBOT_SCHEMA_VERSION}\n{normalized}".encode()
+        ).hexdigest()
+
+    def get(self, question: str) -> Optional[Dict[str, Any]]:
+        """Return the live cache entry for a question, if any"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                """
+                SELECT generated_sql, explanation, results_json, results_at
+                FROM parkbot_cache
+                WHERE cache_key = ? AND created_at > ?
+                """,
+                (self.key(question), now - self.ttl),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute(
+                "UPDATE parkbot_cache SET last_used_at = ? WHERE cache_key = ?",
+                (now, self.key(question)),
+            )
+            self._db.commit()
+
+        generated_sql, explanation, results_json, results_at = row
+        results = None
+        if results_json is not None and results_at > now - self.results_ttl:
+            results = json.loads(results_json)
+        return {"sql": generated_sql, "explanation": explanation, "results": results}
+
+    def put(self, question: str, **fields: Any) -> None:
+        """Store any of ``sql``, ``explanation`` and ``results`` for a question"""
+        now = time.time()
+        columns = {
+            "generated_sql": fields.get("sql"),
+            "explanation": fields.get("explanation"),
+        }
+        if "results" in fields and self.results_ttl > 0:
+            columns["results_json"] = json.dumps(fields["results"], default=str)
+            columns["results_at"] = now
+        columns = {name: value for name, value in columns.items() if value is not None}
+
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT INTO parkbot_cache (cache_key, question, created_at, last_used_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (cache_key) DO UPDATE SET last_used_at = excluded.last_used_at
+                """,
+                (self.key(question), normalize_question(question), now, now),
+            )
+            if columns:
+                assignments = ", ".join(f"{name} = ?" for name in columns)
+                self._db.execute(
+                    f"UPDATE parkbot_cache SET {assignments} WHERE cache_key = ?",
+                    (*columns.values(), self.key(question)),
+                )
+            self._evict()
+            self._db.commit()
 
+    def _evict(self) -> None:
+        self._db.execute(
+            "DELETE FROM parkbot_cache WHERE created_at <= ?",
+            (time.time() - self.ttl,),
+        )
+        (count,) = self._db.execute("SELECT COUNT(*) FROM parkbot_cache").fetchone()
+        if count > self.max_entries:
+            self._db.execute(
+                """
+                DELETE FROM parkbot_cache WHERE cache_key IN (
+                    SELECT cache_key FROM parkbot_cache
+                    ORDER BY last_used_at LIMIT ?
+                )
+                """,
+                (count - self.max_entries,),
+            )
 
-# ==================== DATA RETRIEVAL FUNCTIONS ====================
 
+class QuestionIndex:
+    """In-memory TF-IDF index over questions for offline similarity search.
 
-@st.cache_data(ttl=300)
-def get_all_parks() -> pd.DataFrame:
-    """Fetch all national parks"""
-    query = """
-        SELECT Park_ID, Park_Name, State, Region, Description, 
-               Wildlife_Information, Plant_Information, Area_Square_Miles,
-               Annual_Visitors, Best_Time_To_Visit, Entry_Fee, Official_Website,
-               Latitude, Longitude, Park_Activities_Events, Popular_Park_Trails,
-               Difficulty_Rating, Kid_Friendliness_Rating, Pet_Friendliness_Rating
-        FROM National_Park
-        ORDER BY Park_Name
+    Each question is represented by its words and the character trigrams
+    of those words (so "campground"/"campgrounds" still match), weighted by
+    TF-IDF and compared with cosine similarity. Candidates are gathered from
+    an inverted index over the query's rarer terms only (those in at most
+    ``max_df_ratio`` of the questions) and the best few are then re-scored
+    exactly against all of their terms.
     """
-    results = execute_query(query)
-    return pd.DataFrame(results) if results else pd.DataFrame()
 
+    def __init__(self, max_df_ratio: float = 0.05):
+        self.max_df_ratio = max_df_ratio
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._terms: Dict[int, Dict[str, int]] = {}
+        self._norms: Dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    @staticmethod
+    def terms(text: str) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for word in re.findall(r"[a-z0-9$]+", normalize_question(text)):
+            counts[word] = counts.get(word, 0) + 1
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                gram = f"#{padded[i : i + 3]}"
+                counts[gram] = counts.get(gram, 0) + 1
+        return counts
+
+    def _idf(self, term: str) -> float:
+        return math.log((len(self._terms) + 1) / (len(self._postings.get(term, ())) + 1)) + 1
+
+    def _norm(self, terms: Dict[str, int], idf: Callable[[str], float]) -> float:
+        return math.sqrt(sum((tf * idf(t)) ** 2 for t, tf in terms.items())) or 1.0
+
+    def add(self, doc_id: int, text: str, update_norm: bool = True) -> None:
+        """Add or replace a question (pass update_norm=False when bulk loading)"""
+        if doc_id in self._terms:
+            for term in self._terms[doc_id]:
+                self._postings[term].pop(doc_id, None)
+        terms = self.terms(text)
+        self._terms[doc_id] = terms
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        if update_norm:
+            self._norms[doc_id] = self._norm(terms, self._idf)
+
+    def rebuild_norms(self) -> None:
+        """Recompute every document norm with the current IDFs"""
+        idf = {term: self._idf(term) for term in self._postings}
+        for doc_id, terms in self._terms.items():
+            self._norms[doc_id] = self._norm(terms, idf.__getitem__)
+
+    def search(self, text: str, k: int = 3) -> List[Tuple[int, float]]:
+        """Return up to k (doc_id, cosine similarity) pairs, best first"""
+        query_terms = self.terms(text)
+        if not query_terms or not self._terms:
+            return []
+        idf = {term: self._idf(term) for term in query_terms}
+        max_df = max(10, self.max_df_ratio * len(self._terms))
+        scores: Dict[int, float] = {}
+        for term, query_tf in query_terms.items():
+            postings = self._postings.get(term)
+            if not postings or len(postings) > max_df:
+                continue
+            weight = query_tf * idf[term] ** 2
+            for doc_id, tf in postings.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf
+
+        candidates = heapq.nlargest(
+            max(k * 5, 20), scores, key=lambda doc_id: scores[doc_id] / self._norms[doc_id]
+        )
+        query_norm = self._norm(query_terms, idf.__getitem__)
+        exact = []
+        for doc_id in candidates:
+            doc_terms = self._terms[doc_id]
+            dot = sum(
+                query_tf * doc_terms[t] * idf[t] ** 2
+                for t, query_tf in query_terms.items()
+                if t in doc_terms
+            )
+            doc_norm = self._norm(doc_terms, self._idf)
+            exact.append((doc_id, min(dot / (query_norm * doc_norm), 1.0)))
+        return heapq.nlargest(k, exact, key=lambda item: item[1])
 
-@st.cache_data(ttl=300)
-def get_park_with_rating(park_id: int) -> Optional[Dict]:
-    """Get park details with average rating"""
-    query = """
-        SELECT np.*, 
-               COALESCE(AVG(pr.Rating), 0) as Avg_Rating,
-               COUNT(pr.Review_ID) as Review_Count
-        FROM National_Park np
-        LEFT JOIN Park_Review pr ON np.Park_ID = pr.Park_ID
-        WHERE np.Park_ID = %s
-        GROUP BY np.Park_ID
-    """
-    result = execute_query(query, (park_id,), fetch="one")
-    return result
 
+class QuestionHistory:
+    """Persistent log of answered ParkBot questions with similarity search.
 
-@st.cache_data(ttl=300)
-def get_lodging_by_park(park_id: int) -> pd.DataFrame:
-    """Get all lodging options for a specific park"""
-    query = """
-        SELECT Lodging_ID, Lodging_Name, Lodging_Type, Address, City, State,
-               Description, Amenities, Price_Per_Night, Contact_Phone, Contact_Email,
-               Distance_From_Park_Miles, Star_Rating
-        FROM Lodging
-        WHERE Park_ID = %s
-        ORDER BY Price_Per_Night
+    Stores each distinct question's validated SQL and execution stats in
+    SQLite next to the response cache, and keeps a QuestionIndex over them.
+    New rows written by other processes are picked up on the next lookup.
     """
-    results = execute_query(query, (park_id,))
-    return pd.DataFrame(results) if results else pd.DataFrame()
 
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS parkbot_history (
+                question_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question TEXT NOT NULL,
+                schema_version TEXT NOT NULL,
+                generated_sql TEXT NOT NULL,
+                row_count INTEGER,
+                execution_ms REAL,
+                times_asked INTEGER NOT NULL DEFAULT 1,
+                last_asked_at REAL NOT NULL,
+                UNIQUE (schema_version, question)
+            )
+            """
+        )
+        self._db.commit()
+        self.index = QuestionIndex()
+        self._questions: Dict[int, Tuple[str, str]] = {}
+        self._loaded_up_to = 0
+        self._sync(bulk=True)
+
+    def _sync(self, bulk: bool = False) -> None:
+        """Index history rows added since the last sync"""
+        rows = self._db.execute(
+            """
+            SELECT question_id, question, generated_sql FROM parkbot_history
+            WHERE question_id > ? AND schema_version = ?
+            ORDER BY question_id
+            """,
+            (self._loaded_up_to, PARKBOT_SCHEMA_VERSION),
+        ).fetchall()
+        for question_id, question, generated_sql in rows:
+            self._questions[question_id] = (question, generated_sql)
+            self.index.add(question_id, question, update_norm=not bulk)
+            self._loaded_up_to = question_id
+        if bulk:
+            self.index.rebuild_norms()
+
+    def similar(self, question: str, k: int = 3) -> List[Dict[str, Any]]:
+        """Return up to k past questions most similar to ``question``"""
+        with self._lock:
+            self._sync()
+            matches = self.index.search(question, k)
+            return [
+                {
+                    "question": self._questions[question_id][0],
+                    "sql": self._questions[question_id][1],
+                    "score": score,
+                }
+                for question_id, score in matches
+            ]
 
-@st.cache_data(ttl=60)
-def get_all_users() -> List[Dict]:
-    """Get all users for dropdown selection"""
-    query = "SELECT User_ID, First_Name, Last_Name, Email FROM User ORDER BY First_Name"
-    return execute_query(query) or []
+    def record(
+        self, question: str, generated_sql: str, row_count: int, execution_ms: float
+    ) -> None:
+        """Remember that ``generated_sql`` answered ``question`` successfully"""
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT INTO parkbot_history
+                    (question, schema_version, generated_sql, row_count,
+                     execution_ms, last_asked_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (schema_version, question) DO UPDATE SET
+                    generated_sql = excluded.generated_sql,
+                    row_count = excluded.row_count,
+                    execution_ms = excluded.execution_ms,
+                    times_asked = times_asked + 1,
+                    last_asked_at = excluded.last_asked_at
+                """,
+                (
+                    normalize_question(question),
+                    PARKBOT_SCHEMA_VERSION,
+                    generated_sql,
+                    row_count,
+                    execution_ms,
+                    time.time(),
+                ),
+            )
+            self._db.commit()
+            self._sync()
 
 
-@st.cache_data(ttl=60)
-def get_user_reservations(user_id: int, filter_status: str = "all") -> pd.DataFrame:
-    """Get reservations for a specific user"""
-    base_query = """
-        SELECT lr.Reservation_ID, lr.Confirmation_Number, lr.Check_In_Date, lr.Check_Out_Date,
-               lr.Number_Of_Guests, lr.Number_Of_Rooms, lr.Reservation_Status, lr.Total_Cost,
-               lr.Guest_Name, lr.Guest_Phone, lr.Guest_Email, lr.Created_At,
-               l.Lodging_Name, l.Lodging_Type, l.Price_Per_Night,
-               np.Park_Name, np.State
-        FROM Lodging_Reservation lr
-        JOIN Lodging l ON lr.Lodging_ID = l.Lodging_ID
-        JOIN National_Park np ON l.Park_ID = np.Park_ID
-        WHERE lr.User_ID = %s
+class ParkBot:
+    """Text-to-SQL assistant with response caching and request coalescing.
+
+    ``client`` is any object with ``complete(messages, max_tokens,
+    temperature)`` and ``stream(...)`` methods, so a StubModelClient can
+    stand in for OpenAI. Identical questions asked at the same time by
+    different sessions share a single model call. Explanations stream from
+    a background thread pool so they are generated while the query runs.
+
+    With a ``history``, a question that closely matches one answered before
+    (similarity >= ``reuse_threshold``, with the same numbers and quoted
+    text) reuses that SQL without calling the model, and near matches
+    (>= ``example_threshold``) are sent to the model as few-shot examples.
     """
 
-    if filter_status == "upcoming":
-        base_query += (
-            " AND lr.Check_In_Date >= CURDATE() AND lr.Reservation_Status = 'confirmed'"
+    def __init__(
+        self,
+        client,
+        cache: ParkBotCache,
+        max_workers: int = 8,
+        history: Optional[QuestionHistory] = None,
+        reuse_threshold: float = 0.95,
+        example_threshold: float = 0.4,
+    ):
+        self.client = client
+        self.cache = cache
+        self.history = history
+        self.reuse_threshold = reuse_threshold
+        self.example_threshold = example_threshold
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="parkbot"
         )
-    elif filter_status == "past":
-        base_query += " AND lr.Check_Out_Date < CURDATE()"
-    elif filter_status == "cancelled":
-        base_query += " AND lr.Reservation_Status = 'cancelled'"
 
-    base_query += " ORDER BY lr.Check_In_Date DESC"
+    def _coalesce(self, key: str, compute: Callable[[], Any]) -> Any:
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = compute()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+
+    def generate_sql(self, question: str) -> str:
+        """Return SQL for a question, from the cache or a single model call"""
+        cached = self.cache.get(question)
+        if cached and cached["sql"]:
+            return cached["sql"]
+
+        def compute():
+            examples = self.history.similar(question) if self.history else []
+
+            # A close match to a past question is answered with its SQL, unless
+            # a number or quoted value differs ("top 3" vs "top 5")
+            if (
+                examples
+                and examples[0]["score"] >= self.reuse_threshold
+                and question_literals(examples[0]["question"])
+                == question_literals(question)
+            ):
+                self.cache.put(question, sql=examples[0]["sql"])
+                return examples[0]["sql"]
+
+            messages = [{"role": "system", "content": PARKBOT_SYSTEM_PROMPT}]
+            for example in examples:
+                if example["score"] >= self.example_threshold:
+                    messages.append(
+                        {
+                            "role": "user",
+                            "content": f"Generate SQL query for: {example['question']}",
+                        }
+                    )
+                    messages.append({"role": "assistant", "content": example["sql"]})
+            messages.append(
+                {"role": "user", "content": f"Generate SQL query for: {question}"}
+            )
 
-    results = execute_query(base_query, (user_id,))
-    return pd.DataFrame(results) if results else pd.DataFrame()
+            generated_sql = self.client.complete(messages, max_tokens=500).strip()
 
+            # Remove markdown code blocks if present
+            generated_sql = re.sub(r"^```sql\s*", "", generated_sql)
+            generated_sql = re.sub(r"^```\s*", "", generated_sql)
+            generated_sql = re.sub(r"\s*```$", "", generated_sql)
+            generated_sql = generated_sql.strip()
 
-@st.cache_data(ttl=60)
-def get_all_reviews() -> pd.DataFrame:
-    """Get all park reviews with user and park information"""
-    query = """
-        SELECT pr.Review_ID, pr.Rating, pr.Review_Text, pr.Visit_Date, pr.Review_Date,
-               pr.Photo_URLs, pr.User_ID, pr.Park_ID,
-               u.First_Name, u.Last_Name, u.Email,
-               np.Park_Name, np.State
-        FROM Park_Review pr
-        JOIN User u ON pr.User_ID = u.User_ID
-        JOIN National_Park np ON pr.Park_ID = np.Park_ID
-        ORDER BY pr.Review_Date DESC
-    """
-    results = execute_query(query)
-    return pd.DataFrame(results) if results else pd.DataFrame()
+            # Only remember SQL that would be allowed to run
+            if validate_sql_safety(generated_sql):
+                self.cache.put(question, sql=generated_sql)
+            return generated_sql
 
+        return self._coalesce(f"sql:{self.cache.key(question)}", compute)
 
-@st.cache_data(ttl=60)
-def get_user_reviews(user_id: int) -> pd.DataFrame:
-    """Get reviews for a specific user"""
-    query = """
-        SELECT pr.Review_ID, pr.Rating, pr.Review_Text, pr.Visit_Date, pr.Review_Date,
-               pr.Photo_URLs, pr.Park_ID,
-               np.Park_Name, np.State
-        FROM Park_Review pr
-        JOIN National_Park np ON pr.Park_ID = np.Park_ID
-        WHERE pr.User_ID = %s
-        ORDER BY pr.Review_Date DESC
-    """
-    results = execute_query(query, (user_id,))
-    return pd.DataFrame(results) if results else pd.DataFrame()
+    def _explanation_tokens(self, question: str, generated_sql: str) -> Iterator[str]:
+        """Yield the explanation for a question's SQL, streaming it if uncached"""
+        cached = self.cache.get(question)
+        if cached and cached["sql"] == generated_sql and cached["explanation"]:
+            yield cached["explanation"]
+            return
 
+        key = f"explain:{self.cache.key(question)}"
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        # Another session is already asking the model; wait for its answer
+        if not owner:
+            yield future.result()
+            return
 
-# ==================== HELPER FUNCTIONS ====================
+        try:
+            pieces = []
+            for piece in self.client.stream(
+                [
+                    {"role": "system", "content": PARKBOT_EXPLAIN_PROMPT},
+                    {"role": "user", "content": generated_sql},
+                ],
+                max_tokens=200,
+            ):
+                pieces.append(piece)
+                yield piece
+            explanation = "".join(pieces)
+            if validate_sql_safety(generated_sql):
+                self.cache.put(question, sql=generated_sql, explanation=explanation)
+            future.set_result(explanation)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+
+    def explain_sql(self, question: str, generated_sql: str) -> str:
+        """Return a plain-language explanation of the SQL generated for a question"""
+        return "".join(self._explanation_tokens(question, generated_sql))
+
+    def start_explanation(self, question: str, generated_sql: str) -> Iterator[str]:
+        """Start explaining SQL in the background and return its token stream.
+
+        The model call begins immediately on the ParkBot thread pool; the
+        returned iterator yields tokens as they arrive (for st.write_stream)
+        and re-raises any error from the background call.
+        """
+        tokens: queue.Queue = queue.Queue()
+        done = object()
 
+        def produce():
+            try:
+                for piece in self._explanation_tokens(question, generated_sql):
+                    tokens.put(piece)
+            except BaseException as e:
+                tokens.put(e)
+            finally:
+                tokens.put(done)
+
+        self._executor.submit(produce)
+
+        def consume() -> Iterator[str]:
+            while True:
+                piece = tokens.get()
+                if piece is done:
+                    return
+                if isinstance(piece, BaseException):
+                    raise piece
+                yield piece
+
+        return consume()
+
+    def cached_results(self, question: str) -> Optional[Tuple[List[Dict], bool]]:
+        """Return cached (rows, truncated) for a question, if result caching is on"""
+        cached = self.cache.get(question)
+        results = cached["results"] if cached else None
+        # Entries written before the truncated flag was stored are misses
+        if not isinstance(results, dict):
+            return None
+        return results["rows"], results["truncated"]
+
+    def store_results(self, question: str, rows: List[Dict], truncated: bool) -> None:
+        self.cache.put(question, results={"rows": rows, "truncated": truncated})
+
+    def record_success(
+        self, question: str, generated_sql: str, row_count: int, execution_ms: float
+    ) -> None:
+        """Add a successfully executed question to the few-shot history"""
+        if self.history:
+            self.history.record(question, generated_sql, row_count, execution_ms)
+
+
+@st.cache_resource
+def get_parkbot() -> ParkBot:
+    """Return the process-wide ParkBot with its configured model client"""
+    if get_config("PARKBOT_MODEL_CLIENT", "openai") == "stub":
+        client = StubModelClient()
+    else:
+        client = OpenAIModelClient()
+    cache = ParkBotCache(
+        get_config("PARKBOT_CACHE_PATH", ".parkbot_cache.sqlite3"),
+        ttl=float(get_config("PARKBOT_CACHE_TTL", "86400")),
+        max_entries=int(get_config("PARKBOT_CACHE_MAX_ENTRIES", "5000")),
+        results_ttl=float(get_config("PARKBOT_CACHE_RESULTS_TTL", "0")),
+    )
+    history = QuestionHistory(get_config("PARKBOT_CACHE_PATH", ".parkbot_cache.sqlite3"))
+    return ParkBot(
+        client,
+        cache,
+        max_workers=int(get_config("PARKBOT_WORKERS", "8")),
+        history=history,
+        reuse_threshold=float(get_config("PARKBOT_REUSE_THRESHOLD", "0.95")),
+        example_threshold=float(get_config("PARKBOT_EXAMPLE_THRESHOLD", "0.4")),
+    )
 
-def generate_confirmation_number() -> str:
-    """Generate confirmation number in format RES-YYYYMMDD-NNNNNN"""
-    date_part = datetime.now().strftime("%Y%m%d")
-    # Get last reservation to determine next ID
-    query = "SELECT MAX(Reservation_ID) as max_id FROM Lodging_Reservation"
-    result = execute_query(query, fetch="one")
-    next_id = (result["max_id"] or 0) + 1 if result else 1
-    return f"RES-{date_part}-{next_id:06d}"
 
+# ==================== PAGE FUNCTIONS ====================
 
-def calculate_total_cost(
-    price_per_night: float, check_in: date, check_out: date, num_rooms: int
-) -> float:
-    """Calculate total cost for reservation"""
-    num_nights = (check_out - check_in).days
-    return price_per_night * num_nights * num_rooms
+# Lazy expanders (bodies built only while open) need a newer Streamlit
+_LAZY_EXPANDERS = "on_change" in inspect.signature(st.expander).parameters
 
 
-def display_star_rating(rating: float) -> str:
-    """Convert numeric rating to star display"""
-    full_stars = int(rating)
-    half_star = 1 if rating - full_stars >= 0.5 else 0
-    empty_stars = 5 - full_stars - half_star
-    return "⭐" * full_stars + "✨" * half_star + "☆" * empty_stars
+def fragments_enabled() -> bool:
+    """Whether page sections rerun on their own (PARKPAL_FRAGMENTS, default on)"""
+    return get_config("PARKPAL_FRAGMENTS", "true").lower() in ("1", "true", "yes")
 
 
-def validate_sql_safety(sql: str) -> bool:
-    """Check if SQL query is safe (SELECT only)"""
-    sql_upper = sql.upper().strip()
-    dangerous_keywords = [
-        "INSERT",
-        "UPDATE",
-        "DELETE",
-        "DROP",
-        "ALTER",
-        "CREATE",
-        "TRUNCATE",
-        "EXEC",
-        "EXECUTE",
-    ]
+def page_fragment(name: str):
+    """Make a page section an ``st.fragment`` when fragments are enabled.
 
-    # Must start with SELECT
-    if not sql_upper.startswith("SELECT"):
-        return False
+    A widget inside the section then reruns only the section. Those partial
+    reruns show up on the Diagnostics page as ``name``.
+    """
 
-    # Check for dangerous keywords
-    for keyword in dangerous_keywords:
-        if keyword in sql_upper:
-            return False
+    def decorator(func):
+        @functools.wraps(func)
+        def measured(*args, **kwargs):
+            if getattr(_rerun_cost, "page", None) is not None:
+                return func(*args, **kwargs)
+            with get_metrics().page_rerun(name):
+                return func(*args, **kwargs)
 
-    return True
+        fragment = st.fragment(measured)
 
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if fragments_enabled():
+                return fragment(*args, **kwargs)
+            return func(*args, **kwargs)
 
-# ==================== PAGE FUNCTIONS ====================
+        return wrapper
+
+    return decorator
+
+
+def rerun_fragment() -> None:
+    """Rerun the current page section, or the whole page without fragments.
+
+    A fragment can only rerun on its own from a fragment rerun, so a click
+    handled during a full rerun reruns the whole page.
+    """
+    if fragments_enabled():
+        try:
+            st.rerun(scope="fragment")
+        except StreamlitAPIException:
+            pass
+    st.rerun()
+
+
+def lazy_expander(label: str, key: str):
+    """An expander and whether its body needs to be built.
+
+    With fragments enabled the body is only needed while the expander is
+    open; opening it reruns the enclosing fragment.
+    """
+    if fragments_enabled() and _LAZY_EXPANDERS:
+        expander = st.expander(label, key=key, on_change="rerun")
+        return expander, bool(expander.open)
+    return st.expander(label), True
+
+
+def paginate(total: int, key: str) -> Tuple[int, int]:
+    """Start and end of the slice of a list to show, with a page picker.
+
+    Shows LIST_PAGE_SIZE items per page (20); 0 shows the whole list.
+    """
+    page_size = int(get_config("LIST_PAGE_SIZE", "20"))
+    if page_size <= 0 or total <= page_size:
+        return 0, total
+    pages = math.ceil(total / page_size)
+    col1, col2 = st.columns([1, 4])
+    with col1:
+        page = st.number_input(
+            "Page", min_value=1, max_value=pages, value=1, step=1, key=key
+        )
+    start = (int(page) - 1) * page_size
+    end = min(start + page_size, total)
+    with col2:
+        st.caption(f"Page {int(page)} of {pages}: showing {start + 1}-{end} of {total}")
+    return start, end
 
 
 def home_page():
@@ -429,17 +5136,11 @@ def home_page():
             total_visitors = parks_df["Annual_Visitors"].sum()
             st.metric("👥 Annual Visitors", f"{total_visitors/1000000:.1f}M")
 
-    query_lodging = "SELECT COUNT(*) as count FROM Lodging"
-    lodging_count = execute_query(query_lodging, fetch="one")
-    if lodging_count:
-        with col3:
-            st.metric("🏨 Lodging Options", lodging_count["count"])
-
-    query_reviews = "SELECT COUNT(*) as count FROM Park_Review"
-    review_count = execute_query(query_reviews, fetch="one")
-    if review_count:
-        with col4:
-            st.metric("💬 Reviews", review_count["count"])
+    totals = get_park_aggregates().totals()
+    with col3:
+        st.metric("🏨 Lodging Options", totals["lodging"])
+    with col4:
+        st.metric("💬 Reviews", totals["reviews"])
 
     st.markdown("---")
     st.markdown(
@@ -465,141 +5166,175 @@ def browse_parks_page():
     tab1, tab2 = st.tabs(["📋 Park Directory", "📊 Analytics"])
 
     with tab1:
-        parks_df = get_all_parks()
+        park_directory()
 
-        if parks_df.empty:
-            st.warning("No parks found in database.")
-            return
-
-        # Filters
-        st.subheader("Filters")
-        col1, col2, col3 = st.columns(3)
+    with tab2:
+        park_analytics()
 
-        with col1:
-            states = ["All"] + sorted(parks_df["State"].unique().tolist())
-            selected_state = st.selectbox("State", states)
 
-        with col2:
-            regions = ["All"] + sorted(parks_df["Region"].dropna().unique().tolist())
-            selected_region = st.selectbox("Region", regions)
+@page_fragment("🏞️ Browse Parks › directory")
+def park_directory():
+    """Park search, filters and the paged park list"""
+    catalog = get_park_catalog_source().current()
 
-        with col3:
-            seasons = ["All"] + sorted(
-                parks_df["Best_Time_To_Visit"].dropna().unique().tolist()
-            )
-            selected_season = st.selectbox("Best Time to Visit", seasons)
+    if catalog is None:
+        st.warning("No parks found in database.")
+        return
 
-        # Apply filters
-        filtered_df = parks_df.copy()
-        if selected_state != "All":
-            filtered_df = filtered_df[
-                filtered_df["State"].str.contains(selected_state, na=False)
-            ]
-        if selected_region != "All":
-            filtered_df = filtered_df[filtered_df["Region"] == selected_region]
-        if selected_season != "All":
-            filtered_df = filtered_df[
-                filtered_df["Best_Time_To_Visit"] == selected_season
-            ]
+    search_query = st.text_input(
+        "🔎 Search parks",
+        placeholder="Try slot canyons, bison or kayaking",
+        help="Searches park names, wildlife, plants, trails and activities",
+    )
 
-        st.markdown(f"### Showing {len(filtered_df)} parks")
-
-        # Display parks
-        for idx, park in filtered_df.iterrows():
-            with st.expander(f"🏔️ {park['Park_Name']} - {park['State']}"):
-                col1, col2 = st.columns([2, 1])
-
-                with col1:
-                    # Get average rating
-                    park_detail = get_park_with_rating(park["Park_ID"])
-                    if park_detail:
-                        avg_rating = park_detail["Avg_Rating"]
-                        review_count = park_detail["Review_Count"]
-                        st.markdown(
-                            f"**Rating:** {display_star_rating(avg_rating)} ({avg_rating:.1f}/5.0 from {review_count} reviews)"
-                        )
+    # Filters
+    st.subheader("Filters")
+    col1, col2, col3 = st.columns(3)
 
-                    st.markdown(f"**Region:** {park['Region']}")
-                    st.markdown(f"**Description:** {park['Description']}")
-                    st.markdown(f"**Best Time to Visit:** {park['Best_Time_To_Visit']}")
-                    st.markdown(
-                        f"**Wildlife:** {park['Wildlife_Information'][:200]}..."
-                    )
-                    st.markdown(f"**Popular Trails:** {park['Popular_Park_Trails']}")
-
-                with col2:
-                    st.metric("Annual Visitors", f"{park['Annual_Visitors']:,}")
-                    st.metric("Area (sq mi)", f"{park['Area_Square_Miles']:,.2f}")
-                    st.metric("Entry Fee", f"${park['Entry_Fee']:.2f}")
-                    st.metric("Difficulty", park["Difficulty_Rating"])
-                    st.metric("Kid Friendly", f"{park['Kid_Friendliness_Rating']}/5")
-
-                    if park["Official_Website"]:
-                        st.markdown(
-                            f"[🔗 Official Website]({park['Official_Website']})"
-                        )
+    with col1:
+        selected_state = st.selectbox("State", ["All"] + catalog.values("State"))
 
-    with tab2:
-        st.subheader("📊 Park Visitor Analytics")
+    with col2:
+        selected_region = st.selectbox("Region", ["All"] + catalog.values("Region"))
 
-        parks_df = get_all_parks()
-        if parks_df.empty:
-            st.warning("No data available for analytics.")
-            return
+    with col3:
+        selected_season = st.selectbox(
+            "Best Time to Visit", ["All"] + catalog.values("Best_Time_To_Visit")
+        )
 
-        # Region filter for analytics
-        regions_for_filter = ["All Regions"] + sorted(
-            parks_df["Region"].dropna().unique().tolist()
+    # Search (best match first) and filters narrow the catalog's row positions
+    ranked = search_parks(search_query, catalog) if search_query.strip() else None
+    filters = {
+        column: value
+        for column, value in (
+            ("State", selected_state),
+            ("Region", selected_region),
+            ("Best_Time_To_Visit", selected_season),
         )
-        selected_region_analytics = st.selectbox(
-            "Filter by Region", regions_for_filter, key="analytics_region"
+        if value != "All"
+    }
+    positions = catalog.select(filters, ranked)
+
+    if search_query.strip():
+        st.markdown(
+            f"### Showing {len(positions)} parks matching "
+            f"“{search_query.strip()}”"
         )
+    else:
+        st.markdown(f"### Showing {len(positions)} parks")
 
-        # Apply region filter
-        if selected_region_analytics != "All Regions":
-            parks_for_viz = parks_df[
-                parks_df["Region"] == selected_region_analytics
-            ].copy()
-        else:
-            parks_for_viz = parks_df.copy()
+    # Only the page being shown is materialized, rated and rendered
+    start, end = paginate(
+        len(positions),
+        key=f"directory_page:{search_query.strip()}:{'|'.join(filters.values())}",
+    )
+    page_df = with_park_ratings(catalog.rows(positions[start:end]))
+    if ranked is not None:
+        page_df["Matched_In"] = matched_fields(search_query, page_df)
+    for _, park in page_df.iterrows():
+        park_card(park)
+
+
+@page_fragment("🏞️ Browse Parks › park")
+def park_card(park: pd.Series):
+    """One park's expander; its details are built only while it is open"""
+    expander, is_open = lazy_expander(
+        f"🏔️ {park['Park_Name']} - {park['State']}", key=f"park_{park['Park_ID']}"
+    )
+    if not is_open:
+        return
+    with expander:
+        if park.get("Matched_In"):
+            st.caption(f"🔎 Matched in: {park['Matched_In']}")
+        col1, col2 = st.columns([2, 1])
 
-        # Top 20 most visited parks
-        top_parks = parks_for_viz.nlargest(20, "Annual_Visitors")
+        with col1:
+            # Average rating is joined on by with_park_ratings()
+            avg_rating = float(park["Avg_Rating"])
+            review_count = int(park["Review_Count"])
+            st.markdown(
+                f"**Rating:** {display_star_rating(avg_rating)} ({avg_rating:.1f}/5.0 from {review_count} reviews)"
+            )
 
-        # Create visualization
-        fig = px.bar(
-            top_parks,
-            x="Park_Name",
-            y="Annual_Visitors",
-            color="Region",
-            title=f"Top 20 Most Visited National Parks ({selected_region_analytics})",
-            labels={"Annual_Visitors": "Annual Visitors", "Park_Name": "Park"},
-            hover_data=["State", "Best_Time_To_Visit"],
-            color_discrete_sequence=px.colors.qualitative.Set2,
-        )
+            st.markdown(f"**Region:** {park['Region']}")
+            st.markdown(f"**Description:** {park['Description']}")
+            st.markdown(f"**Best Time to Visit:** {park['Best_Time_To_Visit']}")
+            st.markdown(f"**Wildlife:** {park['Wildlife_Information'][:200]}...")
+            st.markdown(f"**Popular Trails:** {park['Popular_Park_Trails']}")
 
-        fig.update_layout(
-            xaxis_tickangle=-45,
-            height=600,
-            showlegend=True,
-            plot_bgcolor="#FAF8F3",
-            paper_bgcolor="#FAF8F3",
-        )
+        with col2:
+            st.metric("Annual Visitors", f"{park['Annual_Visitors']:,}")
+            st.metric("Area (sq mi)", f"{park['Area_Square_Miles']:,.2f}")
+            st.metric("Entry Fee", f"${park['Entry_Fee']:.2f}")
+            st.metric("Difficulty", park["Difficulty_Rating"])
+            st.metric("Kid Friendly", f"{park['Kid_Friendliness_Rating']}/5")
 
-        st.plotly_chart(fig, use_container_width=True)
+            if park["Official_Website"]:
+                st.markdown(f"[🔗 Official Website]({park['Official_Website']})")
 
-        # Seasonal distribution
-        st.subheader("Best Time to Visit Distribution")
-        season_counts = parks_for_viz["Best_Time_To_Visit"].value_counts()
 
-        fig2 = px.pie(
-            values=season_counts.values,
-            names=season_counts.index,
-            title="Parks by Best Time to Visit",
-            color_discrete_sequence=px.colors.qualitative.G10,
-        )
-        fig2.update_layout(plot_bgcolor="#FAF8F3", paper_bgcolor="#FAF8F3")
-        st.plotly_chart(fig2, use_container_width=True)
+@page_fragment("🏞️ Browse Parks › analytics")
+def park_analytics():
+    """Visitor analytics for all parks or one region"""
+    st.subheader("📊 Park Visitor Analytics")
+
+    catalog = get_park_catalog_source().current()
+    if catalog is None:
+        st.warning("No data available for analytics.")
+        return
+
+    # Region filter for analytics
+    regions_for_filter = ["All Regions"] + catalog.values("Region")
+    selected_region_analytics = st.selectbox(
+        "Filter by Region", regions_for_filter, key="analytics_region"
+    )
+
+    # Apply region filter
+    if selected_region_analytics != "All Regions":
+        positions = catalog.select({"Region": selected_region_analytics})
+    else:
+        positions = catalog.select({})
+
+    # Top 20 most visited parks
+    top_parks = catalog.rows(
+        catalog.largest("Annual_Visitors", 20, positions),
+        ["Park_Name", "Annual_Visitors", "Region", "State", "Best_Time_To_Visit"],
+    )
+
+    # Create visualization
+    fig = px.bar(
+        top_parks,
+        x="Park_Name",
+        y="Annual_Visitors",
+        color="Region",
+        title=f"Top 20 Most Visited National Parks ({selected_region_analytics})",
+        labels={"Annual_Visitors": "Annual Visitors", "Park_Name": "Park"},
+        hover_data=["State", "Best_Time_To_Visit"],
+        color_discrete_sequence=px.colors.qualitative.Set2,
+    )
+
+    fig.update_layout(
+        xaxis_tickangle=-45,
+        height=600,
+        showlegend=True,
+        plot_bgcolor="#FAF8F3",
+        paper_bgcolor="#FAF8F3",
+    )
+
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Seasonal distribution
+    st.subheader("Best Time to Visit Distribution")
+    season_counts = catalog.value_counts("Best_Time_To_Visit", positions)
+
+    fig2 = px.pie(
+        values=season_counts.values,
+        names=season_counts.index,
+        title="Parks by Best Time to Visit",
+        color_discrete_sequence=px.colors.qualitative.G10,
+    )
+    fig2.update_layout(plot_bgcolor="#FAF8F3", paper_bgcolor="#FAF8F3")
+    st.plotly_chart(fig2, use_container_width=True)
 
 
 def make_reservation_page():
@@ -618,27 +5353,139 @@ def make_reservation_page():
     """
     parks_result = execute_query(query)
 
-    if not parks_result or len(parks_result) == 0:
-        st.error("No parks with lodging available.")
+    if not parks_result or len(parks_result) == 0:
+        st.error("No parks with lodging available.")
+        return
+
+    find_by = st.radio(
+        "Find parks", ["By name", "Nearest to a location"], horizontal=True
+    )
+    origin = None
+    nearby_lodging = None
+    if find_by == "Nearest to a location":
+        col1, col2 = st.columns(2)
+        with col1:
+            origin_lat = st.number_input(
+                "Latitude",
+                min_value=-90.0,
+                max_value=90.0,
+                value=39.8283,
+                format="%.4f",
+            )
+        with col2:
+            origin_lon = st.number_input(
+                "Longitude",
+                min_value=-180.0,
+                max_value=180.0,
+                value=-98.5795,
+                format="%.4f",
+            )
+        origin = (origin_lat, origin_lon)
+        radius = st.number_input(
+            "Lodging within (miles)",
+            min_value=0,
+            max_value=5000,
+            value=0,
+            step=25,
+            help="Only offer parks and lodging this close to the location; 0 for any",
+        )
+
+        # Parks with lodging, nearest first
+        with_lodging = {row["Park_ID"]: row for row in parks_result}
+        if radius:
+            nearby_lodging = lodging_within(origin_lat, origin_lon, radius)
+            if nearby_lodging.empty:
+                st.warning(f"No lodging within {radius:,} miles of this location.")
+                return
+            lodging_counts = nearby_lodging["Park_ID"].value_counts()
+            with_lodging = {
+                park_id: row
+                for park_id, row in with_lodging.items()
+                if park_id in lodging_counts.index
+            }
+        nearby = nearest_parks(origin_lat, origin_lon, k=len(get_park_catalog()))
+        park_options = {
+            f"{p['Park_Name']} ({p['State']}) - {p['Distance_Miles']:,.0f} mi"
+            + (
+                f" - {lodging_counts[p['Park_ID']]} lodging(s) within {radius:,} mi"
+                if radius
+                else ""
+            ): p["Park_ID"]
+            for _, p in nearby.iterrows()
+            if p["Park_ID"] in with_lodging
+        }
+        if not park_options:
+            st.error("No parks with lodging have a location.")
+            return
+    else:
+        park_options = {
+            f"{row['Park_Name']} ({row['State']})": row["Park_ID"]
+            for row in parks_result
+        }
+    selected_park_name = st.selectbox("Choose a park", list(park_options.keys()))
+    selected_park_id = park_options[selected_park_name]
+
+    # Step 2: Choose dates, so only lodging with rooms free is offered
+    st.subheader("Step 2: Choose Your Dates")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        check_in = st.date_input("Check-in Date", min_value=date.today())
+    with col2:
+        check_out = st.date_input(
+            "Check-out Date",
+            value=check_in + timedelta(days=1),
+            min_value=check_in + timedelta(days=1),
+        )
+    with col3:
+        num_rooms = st.number_input(
+            "Number of Rooms", min_value=1, max_value=10, value=1
+        )
+
+    if check_out <= check_in:
+        st.error("❌ Check-out date must be after check-in date")
         return
 
-    park_options = {
-        f"{row['Park_Name']} ({row['State']})": row["Park_ID"]
-        for row in parks_result
-    }
-    selected_park_name = st.selectbox("Choose a park", list(park_options.keys()))
-    selected_park_id = park_options[selected_park_name]
+    # Step 3: View and Select Lodging
+    st.subheader("Step 3: Select Lodging")
+    lodging_df = get_available_lodging(
+        selected_park_id, check_in, check_out, int(num_rooms)
+    )
 
-    # Step 2: View and Select Lodging
-    st.subheader("Step 2: Select Lodging")
-    lodging_df = get_lodging_by_park(selected_park_id)
+    if nearby_lodging is not None:
+        lodging_df = lodging_df[
+            lodging_df["Lodging_ID"].isin(nearby_lodging["Lodging_ID"])
+        ]
 
     if lodging_df.empty:
-        st.warning("No lodging options available for this park.")
+        within = f" within {radius:,} miles" if nearby_lodging is not None else ""
+        st.warning(
+            f"No lodging near this park{within} has {num_rooms} room(s) free "
+            "for these dates."
+        )
         return
 
+    # Distances from the chosen location, or else from the park; lodging
+    # that is not geocoded yet is placed at the park
+    park = get_park(selected_park_id) or {}
+    lodging_df = lodging_df.assign(
+        Latitude=pd.to_numeric(lodging_df["Latitude"], errors="coerce"),
+        Longitude=pd.to_numeric(lodging_df["Longitude"], errors="coerce"),
+    )
+    reference = origin
+    if park.get("Latitude") is not None and park.get("Longitude") is not None:
+        park_location = (float(park["Latitude"]), float(park["Longitude"]))
+        lodging_df["Latitude"] = lodging_df["Latitude"].fillna(park_location[0])
+        lodging_df["Longitude"] = lodging_df["Longitude"].fillna(park_location[1])
+        reference = reference or park_location
+    has_locations = reference is not None and lodging_df["Latitude"].notna().all()
+    if has_locations:
+        lodging_df["Distance_Miles"] = haversine_miles(
+            *reference, lodging_df["Latitude"], lodging_df["Longitude"]
+        )
+    distance_label = "your location" if origin else "the park"
+
     # Lodging filters
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     with col1:
         lodging_types = ["All Types"] + sorted(
             lodging_df["Lodging_Type"].unique().tolist()
@@ -651,6 +5498,12 @@ def make_reservation_page():
             "Max Price Per Night", 0, int(max_price), int(max_price)
         )
 
+    with col3:
+        sort_options = ["Price: low to high", "Star rating"]
+        if has_locations:
+            sort_options.insert(1, f"Distance from {distance_label}")
+        sort_by = st.selectbox("Sort by", sort_options)
+
     # Apply filters
     filtered_lodging = lodging_df.copy()
     if selected_type != "All Types":
@@ -661,16 +5514,48 @@ def make_reservation_page():
         filtered_lodging["Price_Per_Night"] <= price_range
     ]
 
+    if sort_by.startswith("Distance"):
+        filtered_lodging = filtered_lodging.sort_values("Distance_Miles")
+    elif sort_by == "Star rating":
+        filtered_lodging = filtered_lodging.sort_values("Star_Rating", ascending=False)
+    else:
+        filtered_lodging = filtered_lodging.sort_values("Price_Per_Night")
+
     # Display lodging options
     if filtered_lodging.empty:
         st.warning("No lodging matches your filters.")
         return
 
     lodging_display = filtered_lodging.apply(
-        lambda x: f"{x['Lodging_Name']} - {x['Lodging_Type']} - ${x['Price_Per_Night']:.2f}/night - {display_star_rating(x['Star_Rating'] or 0)}",
+        lambda x: f"{x['Lodging_Name']} - {x['Lodging_Type']} - ${x['Price_Per_Night']:.2f}/night - {display_star_rating(x['Star_Rating'] or 0)} - {x['Rooms_Available']} room(s) left"
+        + (f" - {x['Distance_Miles']:.1f} mi" if has_locations else ""),
         axis=1,
     )
 
+    if has_locations:
+        with st.expander("🗺️ Map"):
+            points = filtered_lodging[["Latitude", "Longitude"]].assign(
+                color="#2E7D32", size=120
+            )
+            marker = pd.DataFrame(
+                {
+                    "Latitude": [reference[0]],
+                    "Longitude": [reference[1]],
+                    "color": ["#C62828"],
+                    "size": [400],
+                }
+            )
+            st.map(
+                pd.concat([points, marker], ignore_index=True),
+                latitude="Latitude",
+                longitude="Longitude",
+                color="color",
+                size="size",
+            )
+            st.caption(
+                f"🟢 Lodging with rooms free · 🔴 {distance_label.capitalize()}"
+            )
+
     selected_lodging_idx = st.selectbox(
         "Choose lodging",
         range(len(filtered_lodging)),
@@ -690,12 +5575,22 @@ def make_reservation_page():
         st.write(
             f"**Distance from Park:** {selected_lodging['Distance_From_Park_Miles']} miles"
         )
+        if origin and has_locations:
+            st.write(
+                f"**Distance from your location:** "
+                f"{selected_lodging['Distance_Miles']:,.1f} miles"
+            )
         st.write(
             f"**Contact:** {selected_lodging['Contact_Phone']} | {selected_lodging['Contact_Email']}"
         )
 
-    # Step 3: Reservation Form
-    st.subheader("Step 3: Complete Your Reservation")
+    # Step 4: Reservation Form
+    st.subheader("Step 4: Complete Your Reservation")
+
+    total_cost = calculate_total_cost(
+        selected_lodging["Price_Per_Night"], check_in, check_out, num_rooms
+    )
+    num_nights = (check_out - check_in).days
 
     with st.form("reservation_form"):
         col1, col2 = st.columns(2)
@@ -716,16 +5611,14 @@ def make_reservation_page():
                 user_options.get(selected_user_name) if selected_user_name else None
             )
 
-            check_in = st.date_input("Check-in Date", min_value=date.today())
-            check_out = st.date_input(
-                "Check-out Date", min_value=date.today() + timedelta(days=1)
-            )
-
             num_guests = st.number_input(
                 "Number of Guests", min_value=1, max_value=20, value=2
             )
-            num_rooms = st.number_input(
-                "Number of Rooms", min_value=1, max_value=10, value=1
+
+            st.metric(
+                "Total Cost",
+                f"${total_cost:.2f}",
+                help=f"{num_nights} nights × {num_rooms} room(s) × ${selected_lodging['Price_Per_Night']:.2f}/night",
             )
 
         with col2:
@@ -733,25 +5626,11 @@ def make_reservation_page():
             guest_phone = st.text_input("Guest Phone", placeholder="123-456-7890")
             guest_email = st.text_input("Guest Email", placeholder="guest@example.com")
 
-            # Calculate and display cost
-            if check_out > check_in:
-                total_cost = calculate_total_cost(
-                    selected_lodging["Price_Per_Night"], check_in, check_out, num_rooms
-                )
-                num_nights = (check_out - check_in).days
-                st.metric(
-                    "Total Cost",
-                    f"${total_cost:.2f}",
-                    help=f"{num_nights} nights × {num_rooms} room(s) × ${selected_lodging['Price_Per_Night']:.2f}/night",
-                )
-
         submitted = st.form_submit_button("🎯 Confirm Reservation")
 
     if submitted:
         # Validation
         errors = []
-        if check_out <= check_in:
-            errors.append("Check-out date must be after check-in date")
         if check_in < date.today():
             errors.append("Check-in date cannot be in the past")
         if not guest_name:
@@ -765,40 +5644,205 @@ def make_reservation_page():
             for error in errors:
                 st.error(f"❌ {error}")
         else:
-            # Create reservation
+            # Create reservation (books the rooms in the same transaction)
             confirmation_number = generate_confirmation_number()
 
-            insert_query = """
-                INSERT INTO Lodging_Reservation 
-                (User_ID, Lodging_ID, Check_In_Date, Check_Out_Date, Number_Of_Guests, 
-                 Number_Of_Rooms, Guest_Name, Guest_Phone, Guest_Email, Confirmation_Number, 
-                 Reservation_Status, Total_Cost)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-
-            params = (
-                int(selected_user_id) if selected_user_id else None,
-                int(selected_lodging["Lodging_ID"]),
-                check_in,
-                check_out,
-                int(num_guests),
-                int(num_rooms),
-                guest_name,
-                guest_phone,
-                guest_email,
-                confirmation_number,
-                "confirmed",
-                float(total_cost),
+            reservation_id = confirmation_number and create_reservation(
+                {
+                    "User_ID": int(selected_user_id) if selected_user_id else None,
+                    "Lodging_ID": int(selected_lodging["Lodging_ID"]),
+                    "Check_In_Date": check_in,
+                    "Check_Out_Date": check_out,
+                    "Number_Of_Guests": int(num_guests),
+                    "Number_Of_Rooms": int(num_rooms),
+                    "Guest_Name": guest_name,
+                    "Guest_Phone": guest_phone,
+                    "Guest_Email": guest_email,
+                    "Confirmation_Number": confirmation_number,
+                    "Reservation_Status": "confirmed",
+                    "Total_Cost": float(total_cost),
+                }
             )
 
-            reservation_id = execute_insert(insert_query, params)
-
             if reservation_id:
                 st.success(f"✅ Reservation created successfully!")
                 st.balloons()
                 st.info(f"**Confirmation Number:** {confirmation_number}")
                 st.info(f"**Total Cost:** ${total_cost:.2f}")
-                get_user_reservations.clear()  # Clear cache
+
+
+def trip_planner_page():
+    """Display the multi-park road trip planner"""
+    st.title("🗺️ Trip Planner")
+    st.markdown(
+        "Pick the parks you want to see and your travel dates; ParkPal orders "
+        "them into a short driving route and finds lodging with rooms free at "
+        "each stop."
+    )
+
+    parks_df = get_park_catalog()
+    if parks_df.empty:
+        st.error("No parks available.")
+        return
+    located = parks_df[parks_df["Latitude"].notna() & parks_df["Longitude"].notna()]
+    park_options = {
+        f"{p['Park_Name']} ({p['State']})": p["Park_ID"] for _, p in located.iterrows()
+    }
+
+    with st.form("trip_form"):
+        selected_parks = st.multiselect("Parks to visit", list(park_options.keys()))
+
+        st.markdown("**Starting point**")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            start_lat = st.number_input(
+                "Latitude",
+                min_value=-90.0,
+                max_value=90.0,
+                value=39.8283,
+                format="%.4f",
+            )
+        with col2:
+            start_lon = st.number_input(
+                "Longitude",
+                min_value=-180.0,
+                max_value=180.0,
+                value=-98.5795,
+                format="%.4f",
+            )
+        with col3:
+            round_trip = st.checkbox("Return to the starting point", value=True)
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            start_date = st.date_input("Leave on", min_value=date.today())
+        with col2:
+            end_date = st.date_input(
+                "Home by", value=date.today() + timedelta(days=14)
+            )
+        with col3:
+            num_rooms = st.number_input(
+                "Number of Rooms", min_value=1, max_value=10, value=1
+            )
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            nights_per_park = st.number_input(
+                "Nights at each park (at least)", min_value=1, max_value=14, value=2
+            )
+        with col2:
+            max_drive_hours = st.slider("Max driving hours per day", 2, 14, 8)
+        with col3:
+            average_mph = st.slider("Average driving speed (mph)", 30, 75, 55)
+
+        submitted = st.form_submit_button("🧭 Plan Trip")
+
+    if submitted:
+        if not selected_parks:
+            st.error("❌ Choose at least one park")
+            return
+        if end_date <= start_date:
+            st.error("❌ The trip must end after it starts")
+            return
+        st.session_state["trip_plan"] = plan_itinerary(
+            [park_options[name] for name in selected_parks],
+            (start_lat, start_lon),
+            start_date,
+            end_date,
+            nights_per_park=int(nights_per_park),
+            num_rooms=int(num_rooms),
+            round_trip=round_trip,
+            max_drive_hours=float(max_drive_hours),
+            average_mph=float(average_mph),
+            parks_df=parks_df,
+        )
+        st.session_state["trip_start"] = (start_lat, start_lon)
+
+    plan = st.session_state.get("trip_plan")
+    if not plan:
+        st.info("Choose parks and dates, then plan your trip.")
+        return
+    stops = plan["stops"]
+    start = st.session_state["trip_start"]
+
+    if not plan["fits"]:
+        st.warning(
+            f"This route needs {plan['nights_needed']} nights but your dates "
+            f"allow {plan['nights_available']}; you would be home on "
+            f"{plan['end_date']:%b %d, %Y}. Drop a park, stay fewer nights or "
+            "extend your dates."
+        )
+    if plan["unlodged"]:
+        st.warning(
+            "No lodging has enough rooms free for your nights at: "
+            + ", ".join(plan["unlodged"])
+        )
+    if plan["skipped"]:
+        st.warning("Left out (no location on file): " + ", ".join(plan["skipped"]))
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Parks", len(stops))
+    with col2:
+        st.metric(
+            "Driving",
+            f"{plan['total_miles']:,.0f} mi",
+            help=(
+                f"About {ROAD_DISTANCE_FACTOR:g}× the straight-line distance"
+                + (
+                    f", including {plan['return_miles']:,.0f} mi back home"
+                    if plan["return_miles"]
+                    else ""
+                )
+            ),
+        )
+    with col3:
+        st.metric("Driving Time", f"{plan['drive_hours']:,.1f} h")
+    with col4:
+        st.metric("Lodging Cost", f"${plan['lodging_cost']:,.2f}")
+
+    if stops:
+        itinerary = pd.DataFrame(
+            {
+                "Stop": range(1, len(stops) + 1),
+                "Park": [f"{s['Park_Name']} ({s['State']})" for s in stops],
+                "Drive (mi)": [round(s["Drive_Miles"]) for s in stops],
+                "Nights on Road": [s["Nights_On_Road"] for s in stops],
+                "Check-in": [s["Check_In"] for s in stops],
+                "Check-out": [s["Check_Out"] for s in stops],
+                "Nights": [s["Nights"] for s in stops],
+                "Lodging": [s["Lodging_Name"] or "—" for s in stops],
+                "Cost": [s["Lodging_Cost"] for s in stops],
+            }
+        )
+        st.dataframe(itinerary.round(2), use_container_width=True, hide_index=True)
+
+        route_lats = [start[0]] + [s["Latitude"] for s in stops]
+        route_lons = [start[1]] + [s["Longitude"] for s in stops]
+        labels = ["Start"] + [str(n) for n in range(1, len(stops) + 1)]
+        if plan["return_miles"]:
+            route_lats.append(start[0])
+            route_lons.append(start[1])
+            labels.append("")
+        fig = go.Figure(
+            go.Scattergeo(
+                lat=route_lats,
+                lon=route_lons,
+                mode="lines+markers+text",
+                text=labels,
+                textposition="top center",
+                line={"color": "#2E7D32", "width": 2},
+                marker={"size": 9, "color": "#C62828"},
+            )
+        )
+        fig.update_geos(fitbounds="locations", showland=True, landcolor="#EDE8DC")
+        fig.update_layout(
+            height=500,
+            margin={"l": 0, "r": 0, "t": 0, "b": 0},
+            paper_bgcolor="#FAF8F3",
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption("Book each stay from 🏕️ Make Reservation.")
 
 
 def my_reservations_page():
@@ -830,7 +5874,13 @@ def my_reservations_page():
         "Cancelled": "cancelled",
     }
 
-    reservations_df = get_user_reservations(selected_user_id, filter_map[filter_option])
+    reservation_list(selected_user_id, filter_map[filter_option])
+
+
+@page_fragment("📅 My Reservations › list")
+def reservation_list(user_id: int, filter_status: str):
+    """The paged list of a user's reservations"""
+    reservations_df = get_user_reservations(user_id, filter_status)
 
     if reservations_df.empty:
         st.info("No reservations found.")
@@ -839,168 +5889,167 @@ def my_reservations_page():
     st.markdown(f"### Found {len(reservations_df)} reservation(s)")
 
     # Display reservations
-    for idx, reservation in reservations_df.iterrows():
-        status_emoji = {"confirmed": "✅", "pending": "⏳", "cancelled": "❌"}.get(
-            reservation["Reservation_Status"], "❓"
-        )
+    start, end = paginate(
+        len(reservations_df), key=f"reservations_page:{user_id}:{filter_status}"
+    )
+    for _, reservation in reservations_df.iloc[start:end].iterrows():
+        reservation_card(reservation)
 
-        with st.expander(
-            f"{status_emoji} {reservation['Park_Name']} - {reservation['Lodging_Name']} (#{reservation['Confirmation_Number']})"
-        ):
-            col1, col2, col3 = st.columns(3)
-
-            with col1:
-                st.markdown("**Reservation Details**")
-                st.write(f"Confirmation: {reservation['Confirmation_Number']}")
-                st.write(f"Status: {reservation['Reservation_Status'].title()}")
-                st.write(f"Created: {reservation['Created_At'].strftime('%Y-%m-%d')}")
-                st.write(f"Total Cost: ${reservation['Total_Cost']:.2f}")
-
-            with col2:
-                st.markdown("**Stay Information**")
-                st.write(f"Check-in: {reservation['Check_In_Date']}")
-                st.write(f"Check-out: {reservation['Check_Out_Date']}")
-                st.write(f"Guests: {reservation['Number_Of_Guests']}")
-                st.write(f"Rooms: {reservation['Number_Of_Rooms']}")
-
-            with col3:
-                st.markdown("**Guest Information**")
-                st.write(f"Name: {reservation['Guest_Name']}")
-                st.write(f"Phone: {reservation['Guest_Phone']}")
-                st.write(f"Email: {reservation['Guest_Email']}")
-
-            st.markdown("---")
-
-            # Action buttons
-            if reservation["Reservation_Status"] == "confirmed":
-                col_edit, col_cancel = st.columns(2)
-
-                with col_edit:
-                    if st.button(
-                        f"✏️ Edit", key=f"edit_{reservation['Reservation_ID']}"
-                    ):
-                        st.session_state[f'editing_{reservation["Reservation_ID"]}'] = (
-                            True
-                        )
 
-                with col_cancel:
-                    if st.button(
-                        f"❌ Cancel", key=f"cancel_{reservation['Reservation_ID']}"
-                    ):
-                        st.session_state[
-                            f'confirming_cancel_{reservation["Reservation_ID"]}'
-                        ] = True
+@page_fragment("📅 My Reservations › reservation")
+def reservation_card(reservation: pd.Series):
+    """One reservation's expander with its edit and cancel actions.
 
-                # Edit form
-                if st.session_state.get(
-                    f'editing_{reservation["Reservation_ID"]}', False
-                ):
-                    with st.form(f"edit_form_{reservation['Reservation_ID']}"):
-                        st.subheader("Edit Reservation")
+    The details and actions are built only while it is open, and clicking
+    them reruns just this reservation.
+    """
+    status_emoji = {"confirmed": "✅", "pending": "⏳", "cancelled": "❌"}.get(
+        reservation["Reservation_Status"], "❓"
+    )
+    expander, is_open = lazy_expander(
+        f"{status_emoji} {reservation['Park_Name']} - {reservation['Lodging_Name']} (#{reservation['Confirmation_Number']})",
+        key=f"reservation_{reservation['Reservation_ID']}",
+    )
+    if not is_open:
+        return
+    with expander:
+        col1, col2, col3 = st.columns(3)
 
-                        new_check_in = st.date_input(
-                            "New Check-in", value=reservation["Check_In_Date"]
-                        )
-                        new_check_out = st.date_input(
-                            "New Check-out", value=reservation["Check_Out_Date"]
-                        )
-                        new_guests = st.number_input(
-                            "Guests", value=int(reservation["Number_Of_Guests"])
-                        )
-                        new_rooms = st.number_input(
-                            "Rooms", value=int(reservation["Number_Of_Rooms"])
-                        )
+        with col1:
+            st.markdown("**Reservation Details**")
+            st.write(f"Confirmation: {reservation['Confirmation_Number']}")
+            st.write(f"Status: {reservation['Reservation_Status'].title()}")
+            st.write(f"Created: {reservation['Created_At'].strftime('%Y-%m-%d')}")
+            st.write(f"Total Cost: ${reservation['Total_Cost']:.2f}")
 
-                        col_save, col_cancel_edit = st.columns(2)
-                        with col_save:
-                            save_edit = st.form_submit_button("💾 Save Changes")
-                        with col_cancel_edit:
-                            cancel_edit = st.form_submit_button("❌ Cancel Edit")
-
-                        if save_edit:
-                            # Validation
-                            if new_check_out <= new_check_in:
-                                st.error("Check-out must be after check-in")
-                            elif new_check_in < date.today():
-                                st.error("Check-in cannot be in the past")
-                            else:
-                                # Recalculate cost
-                                new_total = calculate_total_cost(
-                                    reservation["Price_Per_Night"],
-                                    new_check_in,
-                                    new_check_out,
-                                    new_rooms,
-                                )
+        with col2:
+            st.markdown("**Stay Information**")
+            st.write(f"Check-in: {reservation['Check_In_Date']}")
+            st.write(f"Check-out: {reservation['Check_Out_Date']}")
+            st.write(f"Guests: {reservation['Number_Of_Guests']}")
+            st.write(f"Rooms: {reservation['Number_Of_Rooms']}")
 
-                                update_query = """
-                                    UPDATE Lodging_Reservation
-                                    SET Check_In_Date = %s, Check_Out_Date = %s,
-                                        Number_Of_Guests = %s, Number_Of_Rooms = %s,
-                                        Total_Cost = %s
-                                    WHERE Reservation_ID = %s
-                                """
-
-                                if execute_update(
-                                    update_query,
-                                    (
-                                        new_check_in,
-                                        new_check_out,
-                                        new_guests,
-                                        new_rooms,
-                                        new_total,
-                                        reservation["Reservation_ID"],
-                                    ),
-                                ):
-                                    st.success("✅ Reservation updated successfully!")
-                                    st.session_state[
-                                        f'editing_{reservation["Reservation_ID"]}'
-                                    ] = False
-                                    get_user_reservations.clear()
-                                    st.rerun()
+        with col3:
+            st.markdown("**Guest Information**")
+            st.write(f"Name: {reservation['Guest_Name']}")
+            st.write(f"Phone: {reservation['Guest_Phone']}")
+            st.write(f"Email: {reservation['Guest_Email']}")
 
-                        if cancel_edit:
-                            st.session_state[
-                                f'editing_{reservation["Reservation_ID"]}'
-                            ] = False
-                            st.rerun()
+        st.markdown("---")
+
+        # Action buttons
+        if reservation["Reservation_Status"] == "confirmed":
+            col_edit, col_cancel = st.columns(2)
 
-                # Cancel confirmation
-                if st.session_state.get(
-                    f'confirming_cancel_{reservation["Reservation_ID"]}', False
+            with col_edit:
+                if st.button(
+                    f"✏️ Edit", key=f"edit_{reservation['Reservation_ID']}"
                 ):
-                    st.warning("⚠️ Are you sure you want to delete this reservation?")
-                    col_yes, col_no = st.columns(2)
+                    st.session_state[f'editing_{reservation["Reservation_ID"]}'] = (
+                        True
+                    )
 
-                    with col_yes:
-                        if st.button(
-                            "Yes, Delete",
-                            key=f"yes_cancel_{reservation['Reservation_ID']}",
-                        ):
-                            delete_query = """
-                                DELETE FROM Lodging_Reservation
-                                WHERE Reservation_ID = %s
-                            """
+            with col_cancel:
+                if st.button(
+                    f"❌ Cancel", key=f"cancel_{reservation['Reservation_ID']}"
+                ):
+                    st.session_state[
+                        f'confirming_cancel_{reservation["Reservation_ID"]}'
+                    ] = True
+
+            # Edit form
+            if st.session_state.get(
+                f'editing_{reservation["Reservation_ID"]}', False
+            ):
+                with st.form(f"edit_form_{reservation['Reservation_ID']}"):
+                    st.subheader("Edit Reservation")
+
+                    new_check_in = st.date_input(
+                        "New Check-in", value=reservation["Check_In_Date"]
+                    )
+                    new_check_out = st.date_input(
+                        "New Check-out", value=reservation["Check_Out_Date"]
+                    )
+                    new_guests = st.number_input(
+                        "Guests", value=int(reservation["Number_Of_Guests"])
+                    )
+                    new_rooms = st.number_input(
+                        "Rooms", value=int(reservation["Number_Of_Rooms"])
+                    )
+
+                    col_save, col_cancel_edit = st.columns(2)
+                    with col_save:
+                        save_edit = st.form_submit_button("💾 Save Changes")
+                    with col_cancel_edit:
+                        cancel_edit = st.form_submit_button("❌ Cancel Edit")
+
+                    if save_edit:
+                        # Validation
+                        if new_check_out <= new_check_in:
+                            st.error("Check-out must be after check-in")
+                        elif new_check_in < date.today():
+                            st.error("Check-in cannot be in the past")
+                        else:
+                            # Recalculate cost
+                            new_total = calculate_total_cost(
+                                reservation["Price_Per_Night"],
+                                new_check_in,
+                                new_check_out,
+                                new_rooms,
+                            )
 
-                            if execute_delete(
-                                delete_query, (reservation["Reservation_ID"],)
+                            if update_reservation(
+                                int(reservation["Reservation_ID"]),
+                                new_check_in,
+                                new_check_out,
+                                int(new_guests),
+                                int(new_rooms),
+                                float(new_total),
                             ):
-                                st.success("✅ Reservation deleted")
+                                st.success("✅ Reservation updated successfully!")
                                 st.session_state[
-                                    f'confirming_cancel_{reservation["Reservation_ID"]}'
+                                    f'editing_{reservation["Reservation_ID"]}'
                                 ] = False
-                                get_user_reservations.clear()
+                                # The list changed, so rerun the whole page
                                 st.rerun()
 
-                    with col_no:
-                        if st.button(
-                            "No, Keep It",
-                            key=f"no_cancel_{reservation['Reservation_ID']}",
+                    if cancel_edit:
+                        st.session_state[
+                            f'editing_{reservation["Reservation_ID"]}'
+                        ] = False
+                        rerun_fragment()
+
+            # Cancel confirmation
+            if st.session_state.get(
+                f'confirming_cancel_{reservation["Reservation_ID"]}', False
+            ):
+                st.warning("⚠️ Are you sure you want to delete this reservation?")
+                col_yes, col_no = st.columns(2)
+
+                with col_yes:
+                    if st.button(
+                        "Yes, Delete",
+                        key=f"yes_cancel_{reservation['Reservation_ID']}",
+                    ):
+                        if delete_reservation(
+                            int(reservation["Reservation_ID"])
                         ):
+                            st.success("✅ Reservation deleted")
                             st.session_state[
                                 f'confirming_cancel_{reservation["Reservation_ID"]}'
                             ] = False
                             st.rerun()
 
+                with col_no:
+                    if st.button(
+                        "No, Keep It",
+                        key=f"no_cancel_{reservation['Reservation_ID']}",
+                    ):
+                        st.session_state[
+                            f'confirming_cancel_{reservation["Reservation_ID"]}'
+                        ] = False
+                        rerun_fragment()
+
 
 def reviews_page():
     """Display and manage park reviews"""
@@ -1011,17 +6060,18 @@ def reviews_page():
     with tab1:
         st.subheader("All Park Reviews")
 
-        reviews_df = get_all_reviews()
-
-        if reviews_df.empty:
-            st.info("No reviews yet. Be the first to share your experience!")
-            return
+        parks_df = get_all_parks()
+        park_ids_by_name = (
+            dict(zip(parks_df["Park_Name"], parks_df["Park_ID"]))
+            if not parks_df.empty
+            else {}
+        )
 
         # Filters
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            parks = ["All Parks"] + sorted(reviews_df["Park_Name"].unique().tolist())
+            parks = ["All Parks"] + sorted(park_ids_by_name.keys())
             selected_park_filter = st.selectbox("Filter by Park", parks)
 
         with col2:
@@ -1036,51 +6086,97 @@ def reviews_page():
             selected_rating = st.selectbox("Filter by Rating", ratings)
 
         with col3:
-            sort_options = ["Most Recent", "Highest Rated", "Lowest Rated"]
-            sort_by = st.selectbox("Sort by", sort_options)
+            sort_options = {
+                "Most Recent": "recent",
+                "Highest Rated": "highest",
+                "Lowest Rated": "lowest",
+            }
+            sort_by = st.selectbox("Sort by", list(sort_options.keys()))
 
-        # Apply filters
-        filtered_reviews = reviews_df.copy()
+        park_filter = (
+            int(park_ids_by_name[selected_park_filter])
+            if selected_park_filter != "All Parks"
+            else None
+        )
+        rating_filter = (
+            int(selected_rating.split()[0])
+            if selected_rating != "All Ratings"
+            else None
+        )
+        sort_key = sort_options[sort_by]
+
+        # Start from the first page whenever the filters or sort change
+        filter_signature = (park_filter, rating_filter, sort_key)
+        if st.session_state.get("reviews_filter_signature") != filter_signature:
+            st.session_state["reviews_filter_signature"] = filter_signature
+            st.session_state["reviews_cursor"] = (None, None)
+            st.session_state["reviews_page_number"] = 1
+
+        after, before = st.session_state["reviews_cursor"]
+        page_df, has_more = get_reviews_page(
+            park_filter, rating_filter, sort_key, after=after, before=before
+        )
 
-        if selected_park_filter != "All Parks":
-            filtered_reviews = filtered_reviews[
-                filtered_reviews["Park_Name"] == selected_park_filter
-            ]
+        if page_df.empty:
+            if after is None and before is None:
+                st.info("No reviews yet. Be the first to share your experience!")
+            else:
+                st.info("No more reviews.")
+        else:
+            page_number = st.session_state["reviews_page_number"]
+            st.markdown(f"### Page {page_number}")
 
-        if selected_rating != "All Ratings":
-            rating_value = int(selected_rating.split()[0])
-            filtered_reviews = filtered_reviews[
-                filtered_reviews["Rating"] == rating_value
-            ]
+            # Display reviews
+            for idx, review in page_df.iterrows():
+                with st.container():
+                    st.markdown(f"#### {review['Park_Name']}, {review['State']}")
+                    st.markdown(
+                        f"{display_star_rating(review['Rating'])} by **{review['First_Name']} {review['Last_Name']}**"
+                    )
+                    st.markdown(
+                        f"Visited: {review['Visit_Date']} | Reviewed: {review['Review_Date'].strftime('%Y-%m-%d')}"
+                    )
 
-        # Apply sorting
-        if sort_by == "Most Recent":
-            filtered_reviews = filtered_reviews.sort_values(
-                "Review_Date", ascending=False
-            )
-        elif sort_by == "Highest Rated":
-            filtered_reviews = filtered_reviews.sort_values("Rating", ascending=False)
-        elif sort_by == "Lowest Rated":
-            filtered_reviews = filtered_reviews.sort_values("Rating", ascending=True)
+                    if review["Is_Truncated"]:
+                        # Full text is only fetched once the reader asks for it
+                        if st.toggle(
+                            "Read full review", key=f"expand_review_{review['Review_ID']}"
+                        ):
+                            st.markdown(f"_{get_review_text(int(review['Review_ID']))}_")
+                        else:
+                            st.markdown(f"_{review['Review_Preview']}…_")
+                    else:
+                        st.markdown(f"_{review['Review_Preview']}_")
 
-        st.markdown(f"### Showing {len(filtered_reviews)} review(s)")
+                    if review["Photo_URLs"]:
+                        st.caption(f"📸 Photos: {review['Photo_URLs']}")
 
-        # Display reviews
-        for idx, review in filtered_reviews.iterrows():
-            with st.container():
-                st.markdown(f"#### {review['Park_Name']}, {review['State']}")
-                st.markdown(
-                    f"{display_star_rating(review['Rating'])} by **{review['First_Name']} {review['Last_Name']}**"
-                )
-                st.markdown(
-                    f"Visited: {review['Visit_Date']} | Reviewed: {review['Review_Date'].strftime('%Y-%m-%d')}"
-                )
-                st.markdown(f"_{review['Review_Text']}_")
+                    st.markdown("---")
 
-                if review["Photo_URLs"]:
-                    st.caption(f"📸 Photos: {review['Photo_URLs']}")
+            # Page navigation: remember the seek keys of the first and last rows
+            def review_page_key(row):
+                if sort_key == "recent":
+                    return (row["Review_Date"].to_pydatetime(), int(row["Review_ID"]))
+                return (int(row["Rating"]), int(row["Review_ID"]))
 
-                st.markdown("---")
+            first_key = review_page_key(page_df.iloc[0])
+            last_key = review_page_key(page_df.iloc[-1])
+            has_previous = has_more if before is not None else after is not None
+            has_next = has_more if before is None else True
+
+            col_prev, col_next = st.columns(2)
+            with col_prev:
+                if st.button(
+                    "⬅️ Previous", key="reviews_prev", disabled=not has_previous
+                ):
+                    st.session_state["reviews_cursor"] = (None, first_key)
+                    st.session_state["reviews_page_number"] = page_number - 1
+                    st.rerun()
+            with col_next:
+                if st.button("Next ➡️", key="reviews_next", disabled=not has_next):
+                    st.session_state["reviews_cursor"] = (last_key, None)
+                    st.session_state["reviews_page_number"] = page_number + 1
+                    st.rerun()
 
     with tab2:
         st.subheader("My Reviews")
@@ -1148,12 +6244,16 @@ def reviews_page():
                         photo_urls or None,
                     )
 
-                    review_id = execute_insert(insert_query, params)
+                    review_id = execute_insert(
+                        insert_query,
+                        params,
+                        invalidates=review_tags(
+                            None, selected_user_id, selected_park_id
+                        ),
+                    )
 
                     if review_id:
                         st.success("✅ Review submitted successfully!")
-                        get_all_reviews.clear()
-                        get_user_reviews.clear()
 
         # Display user's reviews
         st.markdown("### Your Reviews")
@@ -1247,13 +6347,16 @@ def reviews_page():
                                             new_photos or None,
                                             review["Review_ID"],
                                         ),
+                                        invalidates=review_tags(
+                                            int(review["Review_ID"]),
+                                            selected_user_id,
+                                            int(review["Park_ID"]),
+                                        ),
                                     ):
                                         st.success("✅ Review updated!")
                                         st.session_state[
                                             f'editing_review_{review["Review_ID"]}'
                                         ] = False
-                                        get_all_reviews.clear()
-                                        get_user_reviews.clear()
                                         st.rerun()
 
                             if cancel_edit:
@@ -1278,13 +6381,19 @@ def reviews_page():
                                     "DELETE FROM Park_Review WHERE Review_ID = %s"
                                 )
 
-                                if execute_delete(delete_query, (review["Review_ID"],)):
+                                if execute_delete(
+                                    delete_query,
+                                    (review["Review_ID"],),
+                                    invalidates=review_tags(
+                                        int(review["Review_ID"]),
+                                        selected_user_id,
+                                        int(review["Park_ID"]),
+                                    ),
+                                ):
                                     st.success("✅ Review deleted")
                                     st.session_state[
                                         f'deleting_review_{review["Review_ID"]}'
                                     ] = False
-                                    get_all_reviews.clear()
-                                    get_user_reviews.clear()
                                     st.rerun()
 
                         with col_no:
@@ -1312,16 +6421,7 @@ def parkbot_page():
     # Example question buttons
     col1, col2 = st.columns(2)
 
-    example_questions = [
-        "What are the top 5 most visited national parks?",
-        "Show me all lodging options under $150 per night",
-        "Which parks have the highest average ratings?",
-        "Find all campgrounds in Utah",
-        "What are the best parks to visit in summer?",
-        "Show me reviews for Yellowstone with ratings above 4",
-    ]
-
-    for i, question in enumerate(example_questions):
+    for i, question in enumerate(PARKBOT_EXAMPLE_QUESTIONS):
         col = col1 if i % 2 == 0 else col2
         with col:
             if st.button(f"📌 {question}", key=f"example_{i}"):
@@ -1341,45 +6441,10 @@ def parkbot_page():
 
         with st.spinner("Thinking..."):
             try:
-                # Create system prompt with schema
-                system_prompt = """
-You are a helpful SQL query generator for the ParkPal database.
-
-Database schema:
-- National_Park: Park_ID, Park_Name, State, Region, Description, Annual_Visitors, Best_Time_To_Visit, Entry_Fee, Difficulty_Rating, Kid_Friendliness_Rating, Pet_Friendliness_Rating, and more
-- Lodging: Lodging_ID, Park_ID, Lodging_Name, Lodging_Type, Price_Per_Night, Distance_From_Park_Miles, Star_Rating, Amenities, and more
-- Park_Review: Review_ID, User_ID, Park_ID, Rating, Review_Text, Visit_Date, Review_Date
-- Lodging_Reservation: Reservation_ID, User_ID, Lodging_ID, Check_In_Date, Check_Out_Date, Reservation_Status, Total_Cost
-- User: User_ID, First_Name, Last_Name, Email
-
-Generate ONLY SELECT queries. Never use INSERT, UPDATE, DELETE, DROP, or other modifying commands.
-Return valid MySQL syntax. Join tables when needed for better results.
-Limit results to 100 rows maximum.
+                parkbot = get_parkbot()
 
-Return only the SQL query without explanation or markdown formatting.
-"""
-
-                # Call OpenAI API
-                response = openai.chat.completions.create(
-                    model="gpt-4-turbo-preview",
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {
-                            "role": "user",
-                            "content": f"Generate SQL query for: {user_question}",
-                        },
-                    ],
-                    temperature=0.3,
-                    max_tokens=500,
-                )
-
-                generated_sql = response.choices[0].message.content.strip()
-
-                # Remove markdown code blocks if present
-                generated_sql = re.sub(r"^```sql\s*", "", generated_sql)
-                generated_sql = re.sub(r"^```\s*", "", generated_sql)
-                generated_sql = re.sub(r"\s*```$", "", generated_sql)
-                generated_sql = generated_sql.strip()
+                # Generate SQL (served from the ParkBot cache when possible)
+                generated_sql = parkbot.generate_sql(user_question)
 
                 # Display the question
                 st.markdown("### Your Question:")
@@ -1390,74 +6455,204 @@ Return only the SQL query without explanation or markdown formatting.
                 st.code(generated_sql, language="sql")
 
                 # Validate SQL safety
-                if not validate_sql_safety(generated_sql):
-                    st.error(
-                        "❌ Query rejected: Only SELECT statements are allowed for safety reasons."
-                    )
+                rejection = check_sql_safety(generated_sql)
+                if rejection:
+                    st.error(f"❌ Query rejected for safety reasons: {rejection}")
                     return
 
+                # Explain the SQL while it runs: the explanation is generated
+                # on a background thread and streamed in below the results
+                explanation_stream = parkbot.start_explanation(
+                    user_question, generated_sql
+                )
+
                 # Execute the query
                 with st.spinner("Executing query..."):
-                    results = execute_query(generated_sql)
+                    cached = parkbot.cached_results(user_question)
+                    results, truncated = cached if cached else (None, False)
+                    if cached is None:
+                        started = time.perf_counter()
+                        guarded = execute_guarded_query(generated_sql)
+                        execution_ms = (time.perf_counter() - started) * 1000
+                        results, truncated = guarded if guarded else (None, False)
+                        if results is not None:
+                            parkbot.store_results(user_question, results, truncated)
+                            parkbot.record_success(
+                                user_question, generated_sql, len(results), execution_ms
+                            )
 
-                    if results is None:
-                        st.error(
-                            "Query execution failed. Please check the generated SQL."
+                if results is None:
+                    st.error("Query execution failed. Please check the generated SQL.")
+                elif len(results) == 0:
+                    st.warning("No results found.")
+                else:
+                    st.markdown("### Results:")
+                    results_df = pd.DataFrame(results)
+                    st.dataframe(results_df, use_container_width=True)
+                    if truncated:
+                        st.caption(
+                            f"Showing the first {len(results_df)} rows (results capped)"
                         )
-                    elif len(results) == 0:
-                        st.warning("No results found.")
                     else:
-                        st.markdown("### Results:")
-                        results_df = pd.DataFrame(results)
-                        st.dataframe(results_df, use_container_width=True)
                         st.caption(f"Showing {len(results_df)} rows")
 
-                        # Get explanation
-                        explanation_response = openai.chat.completions.create(
-                            model="gpt-4-turbo-preview",
-                            messages=[
-                                {
-                                    "role": "system",
-                                    "content": "Explain what this SQL query does in simple terms.",
-                                },
-                                {"role": "user", "content": generated_sql},
-                            ],
-                            temperature=0.3,
-                            max_tokens=200,
-                        )
-
-                        explanation = explanation_response.choices[0].message.content
-
-                        st.markdown("### Explanation:")
-                        st.success(explanation)
+                st.markdown("### Explanation:")
+                with st.container(border=True):
+                    st.write_stream(explanation_stream)
 
             except Exception as e:
                 st.error(f"❌ Error: {str(e)}")
                 st.caption("Please try rephrasing your question or contact support.")
 
 
+def diagnostics_page():
+    """Admin-only view of where time goes: queries, pages, caches and model calls"""
+    st.title("🩺 Diagnostics")
+    metrics = get_metrics()
+    st.caption(
+        "Collected by this app process since "
+        f"{datetime.fromtimestamp(metrics.started_at):%Y-%m-%d %H:%M:%S}"
+    )
+
+    queries = metrics.query_report()
+    pages = metrics.page_report()
+    loaders = metrics.cache_report()
+    model_calls = metrics.model_report()
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("SQL statements", f"{sum(q['Calls'] for q in queries):,}")
+    with col2:
+        st.metric("SQL time", f"{sum(q['Total ms'] for q in queries) / 1000:,.1f} s")
+    with col3:
+        hits = sum(row["Hits"] for row in loaders)
+        lookups = hits + sum(row["Misses"] for row in loaders)
+        st.metric("Cache hit rate", f"{hits / lookups:.0%}" if lookups else "–")
+    with col4:
+        st.metric("Model calls", f"{sum(m['Calls'] for m in model_calls):,}")
+
+    st.markdown("### Page Rerun Cost")
+    st.caption(
+        "Average per rerun. Other = pandas, widgets and rendering; model calls "
+        "made on background threads show up there too."
+    )
+    if pages:
+        st.dataframe(
+            pd.DataFrame(pages).round(1), use_container_width=True, hide_index=True
+        )
+    else:
+        st.info("No page reruns recorded yet.")
+
+    st.markdown("### Slowest Queries")
+    slowest = metrics.slowest_queries()
+    if slowest:
+        st.dataframe(
+            pd.DataFrame(slowest).round(1), use_container_width=True, hide_index=True
+        )
+    else:
+        st.info("No queries recorded yet.")
+
+    st.markdown("### Queries by Total Time")
+    if queries:
+        st.dataframe(
+            pd.DataFrame(queries).round(2), use_container_width=True, hide_index=True
+        )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### Cached Loaders")
+        if loaders:
+            st.dataframe(
+                pd.DataFrame(loaders).round(2),
+                use_container_width=True,
+                hide_index=True,
+            )
+    with col2:
+        st.markdown("### Connection Checkout")
+        pools = metrics.pool_report()
+        if pools:
+            st.dataframe(
+                pd.DataFrame(pools).round(2), use_container_width=True, hide_index=True
+            )
+        st.markdown("### Model Calls")
+        if model_calls:
+            st.dataframe(
+                pd.DataFrame(model_calls).round(1),
+                use_container_width=True,
+                hide_index=True,
+            )
+
+    st.markdown("---")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "⬇️ Prometheus metrics",
+            metrics.prometheus_text(),
+            file_name="parkpal_metrics.txt",
+            mime="text/plain",
+        )
+    with col2:
+        if st.button("🧹 Reset metrics"):
+            metrics.reset()
+            st.rerun()
+
+
+def is_admin() -> bool:
+    """Whether this session unlocked admin pages with ADMIN_TOKEN.
+
+    The token is entered in the sidebar; admin pages are hidden when
+    ADMIN_TOKEN is not configured. An ``?admin=`` URL parameter is ignored
+    and removed, so the secret does not stay in the address bar or history.
+    """
+    admin_token = get_config("ADMIN_TOKEN")
+    if not admin_token:
+        return False
+    if "admin" in st.query_params:
+        del st.query_params["admin"]
+    if not st.session_state.get("is_admin"):
+        with st.sidebar.expander("🔐 Admin"):
+            supplied = st.text_input("Admin token", type="password")
+        st.session_state["is_admin"] = bool(supplied) and hmac.compare_digest(
+            supplied.encode(), str(admin_token).encode()
+        )
+    return st.session_state["is_admin"]
+
+
 # ==================== MAIN APP ====================
 
 
 def main():
     """Main application"""
 
+    # After "Refresh Data", this run reloads (and re-caches) what it reads
+    _cache_refresh.active = st.session_state.pop("refresh_data", False)
+
+    if get_config("CACHE_WARMUP", "false").lower() in ("1", "true", "yes"):
+        start_cache_warmup()
+    if get_config("METRICS_PORT"):
+        start_metrics_server(
+            int(get_config("METRICS_PORT")), get_config("METRICS_HOST", "127.0.0.1")
+        )
+
     # Sidebar navigation
     st.sidebar.title("🏞️ ParkPal Navigation")
     st.sidebar.markdown("---")
-
-    page = st.sidebar.radio(
-        "Go to",
-        [
-            "🏠 Home",
-            "🏞️ Browse Parks",
-            "🏕️ Make Reservation",
-            "📅 My Reservations",
-            "⭐ Reviews",
-            "🤖 ParkBot",
-        ],
-        label_visibility="collapsed",
-    )
+    if _cache_refresh.active:
+        st.sidebar.success("✅ Data refreshed.")
+
+    pages = [
+        "🏠 Home",
+        "🏞️ Browse Parks",
+        "🏕️ Make Reservation",
+        "🗺️ Trip Planner",
+        "📅 My Reservations",
+        "⭐ Reviews",
+        "🤖 ParkBot",
+    ]
+    admin = is_admin()
+    if admin:
+        pages.append("🩺 Diagnostics")
+    page = st.sidebar.radio("Go to", pages, label_visibility="collapsed")
 
     st.sidebar.markdown("---")
     st.sidebar.markdown("### About ParkPal")
@@ -1472,27 +6667,89 @@ def main():
     """
     )
 
-    # Cache refresh button
+    # Connection pool usage (for sizing DB_POOL_SIZE)
+    st.sidebar.markdown("---")
+    with st.sidebar.expander("📈 System Stats"):
+        pool_stats = get_connection_pool().stats()
+        st.caption(
+            f"**Connection pool:** {pool_stats['in_use']}/{pool_stats['size']} in use, "
+            f"{pool_stats['idle']} idle"
+        )
+        st.caption(
+            f"Checkouts: {pool_stats['checkouts']:,} | "
+            f"Avg wait: {pool_stats['wait_seconds_avg'] * 1000:.1f} ms | "
+            f"Max wait: {pool_stats['wait_seconds_max'] * 1000:.1f} ms | "
+            f"Timeouts: {pool_stats['timeouts']}"
+        )
+        st.caption(
+            f"Connections opened: {pool_stats['connections_created']} | "
+            f"Discarded: {pool_stats['connections_discarded']} | "
+            f"Stale reconnects: {pool_stats['stale_reconnects']}"
+        )
+        cache_stats = get_query_cache().stats()
+        entries = (
+            f"{cache_stats['entries']:,}/{cache_stats['max_entries']:,} entries, "
+            if cache_stats["entries"] is not None
+            else ""
+        )
+        st.caption(
+            f"**Query cache ({cache_stats['backend']}):** {entries}"
+            f"{cache_stats['hit_rate']:.0%} hit rate"
+        )
+        st.caption(
+            " | ".join(
+                f"{label}: {cache_stats[stat]:,}"
+                for label, stat in [
+                    ("Hits", "hits"),
+                    ("Misses", "misses"),
+                    ("Evictions", "evictions"),
+                    ("Expired", "expirations"),
+                    ("Invalidated", "invalidations"),
+                    ("Served stale", "stale_hits"),
+                    ("Background refreshes", "refreshes"),
+                    ("Backend errors", "errors"),
+                ]
+                if cache_stats[stat] is not None
+            )
+        )
+        feed_stats = get_park_aggregates().stats()
+        st.caption(
+            f"**Change feed:** applied {feed_stats['changes_applied']:,} changes "
+            f"(up to #{feed_stats['high_water']:,}), "
+            f"{feed_stats['pending_gaps']} pending, {feed_stats['reloads']} full loads"
+        )
+
+    # Cache refresh button: reloads only the data this session looks at
     st.sidebar.markdown("---")
     if st.sidebar.button("🔄 Refresh Data"):
-        st.cache_data.clear()
-        st.success("✅ Cache cleared! Data refreshed.")
+        st.session_state["refresh_data"] = True
         st.rerun()
 
-    # Route to pages
-    if page == "🏠 Home":
-        home_page()
-    elif page == "🏞️ Browse Parks":
-        browse_parks_page()
-    elif page == "🏕️ Make Reservation":
-        make_reservation_page()
-    elif page == "📅 My Reservations":
-        my_reservations_page()
-    elif page == "⭐ Reviews":
-        reviews_page()
-    elif page == "🤖 ParkBot":
-        parkbot_page()
+    # Route to pages, timing each rerun for the Diagnostics page
+    mode = profile_mode(admin)
+    with get_metrics().page_rerun(page), profile_rerun(page, mode) as profile:
+        if page == "🏠 Home":
+            home_page()
+        elif page == "🏞️ Browse Parks":
+            browse_parks_page()
+        elif page == "🏕️ Make Reservation":
+            make_reservation_page()
+        elif page == "🗺️ Trip Planner":
+            trip_planner_page()
+        elif page == "📅 My Reservations":
+            my_reservations_page()
+        elif page == "⭐ Reviews":
+            reviews_page()
+        elif page == "🤖 ParkBot":
+            parkbot_page()
+        elif page == "🩺 Diagnostics":
+            diagnostics_page()
+    show_rerun_profile(profile)
 
 
 if __name__ == "__main__":
-    main()
+    if "--warm-cache" in sys.argv:
+        # Deploy step for shared cache backends: python parkpal_app.py --warm-cache
+        warm_cache()
+    else:
+        main()